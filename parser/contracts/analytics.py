@@ -0,0 +1,202 @@
+"""Corpus analytics: status counts, uploads per day, score histograms and gaps.
+
+Status counts are read from the status index and uploads per day are
+aggregated over the ``uploaded_at`` range of the window. Score histograms and
+gap counts come from ``contract_daily_rollups``: one document per UTC upload
+day, incremented with a single upsert whenever a parse finishes and adjusted
+whenever a rescore changes a score or its gaps, so a dashboard reads one
+document per day in its window however large the corpus grows. Keying by the
+upload day, which never changes, means a rescore moves counts between bins,
+never between days. Rollups count parses, not uploads: deduplicated re-uploads
+are not parsed and do not appear in them. ``manage.py rebuild_rollups``
+recomputes them from the stored contracts.
+"""
+import logging
+from datetime import timedelta
+
+from django.utils import timezone
+from pymongo import UpdateOne
+from pymongo.errors import PyMongoError
+
+from . import pagination, repository, scoring
+from .models import Contract
+from .mongo import get_collection, get_database
+
+logger = logging.getLogger(__name__)
+
+ROLLUPS_COLLECTION = "contract_daily_rollups"
+
+HISTOGRAM_BIN = 10
+
+# Gap labels contain dots, which Mongo reads as paths in update keys, so
+# rollups count gaps under "section:field" codes.
+GAP_CODES = {label: f"{section}:{field}" for label, (section, field) in zip(scoring.GAP_LABELS, scoring.FIELD_COLUMNS)}
+GAP_LABELS = {code: label for label, code in GAP_CODES.items()}
+
+
+def _rollups():
+    return get_database()[ROLLUPS_COLLECTION]
+
+
+def day_key(moment) -> str:
+    return timezone.localtime(moment, timezone.utc).date().isoformat()
+
+
+def histogram_bin(score: int) -> str:
+    # The top bin is closed so a perfect 100 lands in 90-100.
+    return str(min(int(score or 0) // HISTOGRAM_BIN * HISTOGRAM_BIN, 100 - HISTOGRAM_BIN))
+
+
+def rollup_increments(status: str, score, gaps) -> dict:
+    """``$inc`` document recording one finished parse."""
+    if status == Contract.STATUS_FAILED:
+        return {"failed": 1}
+    increments = {"completed": 1, "score_total": int(score or 0), f"scores.{histogram_bin(score)}": 1}
+    for gap in gaps or ():
+        code = GAP_CODES.get(gap)
+        if code is not None:
+            increments[f"gaps.{code}"] = 1
+    return increments
+
+
+def rescore_increments(old_score, old_gaps, score, gaps) -> dict:
+    """``$inc`` document moving one completed contract to its new score and gaps."""
+    increments = {}
+    for sign, values in ((-1, (old_score, old_gaps)), (1, (score, gaps))):
+        for path, value in rollup_increments(Contract.STATUS_COMPLETED, *values).items():
+            increments[path] = increments.get(path, 0) + sign * value
+    return {path: value for path, value in increments.items() if value}
+
+
+def record_parse(contract: Contract) -> None:
+    """Add a finished (completed or failed) parse to its upload day's rollup."""
+    if contract.status not in (Contract.STATUS_COMPLETED, Contract.STATUS_FAILED):
+        return
+    try:
+        _rollups().update_one(
+            {"_id": day_key(contract.uploaded_at)},
+            {"$inc": rollup_increments(contract.status, contract.score, contract.gaps)},
+            upsert=True,
+        )
+    except PyMongoError:
+        # Analytics must never fail a parse; rebuild_rollups repairs drift.
+        logger.warning("Could not update analytics rollup for contract %s", contract.pk, exc_info=True)
+
+
+def record_rescores(changes) -> None:
+    """Apply rescored contracts to the rollups.
+
+    ``changes`` yields ``(uploaded_at, old_score, old_gaps, score, gaps)`` for
+    completed contracts that are not duplicates.
+    """
+    days = {}
+    for uploaded_at, *scores in changes:
+        day = days.setdefault(day_key(uploaded_at), {})
+        for path, value in rescore_increments(*scores).items():
+            day[path] = day.get(path, 0) + value
+    updates = []
+    for key, increments in days.items():
+        increments = {path: value for path, value in increments.items() if value}
+        if increments:
+            updates.append(UpdateOne({"_id": key}, {"$inc": increments}, upsert=True))
+    if not updates:
+        return
+    try:
+        _rollups().bulk_write(updates, ordered=False)
+    except PyMongoError:
+        logger.warning("Could not apply rescores to the analytics rollups", exc_info=True)
+
+
+def status_counts() -> dict:
+    """Contracts per status, each counted over its range of the status index.
+
+    The counts read index keys only, never documents; a ``$group`` over the
+    collection would fetch every document on each dashboard request.
+    """
+    collection = get_collection(Contract)
+    counts = {}
+    for status, _ in Contract.STATUS_CHOICES:
+        query = {"status": status}
+        count = collection.count_documents(query, hint=pagination.index_for(query))
+        if count:
+            counts[status] = count
+    return counts
+
+
+def uploads_by_day(start, end) -> dict:
+    pipeline = [
+        {"$match": {"uploaded_at": {"$gte": start, "$lt": end}}},
+        {
+            "$group": {
+                "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$uploaded_at"}},
+                "count": {"$sum": 1},
+            }
+        },
+    ]
+    return {doc["_id"]: doc["count"] for doc in get_collection(Contract).aggregate(pipeline)}
+
+
+def summary(days: int, top_gaps: int = 10) -> dict:
+    """Analytics for the last ``days`` UTC days, today included."""
+    today = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    start = today - timedelta(days=days - 1)
+    keys = [day_key(start + timedelta(days=i)) for i in range(days)]
+    uploads = uploads_by_day(start, today + timedelta(days=1))
+    rollups = {doc["_id"]: doc for doc in _rollups().find({"_id": {"$gte": keys[0], "$lte": keys[-1]}})}
+
+    histogram = {low: 0 for low in range(0, 100, HISTOGRAM_BIN)}
+    gaps = {}
+    series = []
+    for key in keys:
+        rollup = rollups.get(key, {})
+        completed = rollup.get("completed", 0)
+        for low, count in rollup.get("scores", {}).items():
+            histogram[int(low)] = histogram.get(int(low), 0) + count
+        for code, count in rollup.get("gaps", {}).items():
+            gaps[code] = gaps.get(code, 0) + count
+        series.append(
+            {
+                "date": key,
+                "uploaded": uploads.get(key, 0),
+                "completed": completed,
+                "failed": rollup.get("failed", 0),
+                "average_score": round(rollup["score_total"] / completed, 1) if completed else None,
+            }
+        )
+
+    ranked = sorted(gaps.items(), key=lambda item: (-item[1], item[0]))[:top_gaps]
+    return {
+        "status_counts": status_counts(),
+        "days": series,
+        "score_histogram": [
+            {"min": low, "max": 100 if low == 100 - HISTOGRAM_BIN else low + HISTOGRAM_BIN - 1, "count": count}
+            for low, count in sorted(histogram.items())
+        ],
+        "top_gaps": [{"gap": GAP_LABELS.get(code, code), "count": count} for code, count in ranked],
+    }
+
+
+def rebuild_rollups(batch_size: int = 5000) -> int:
+    """Recompute all rollups from stored contracts; returns the number of days."""
+    collection = get_collection(Contract)
+    days = {}
+    cursor = collection.find(
+        {"status": {"$in": [Contract.STATUS_COMPLETED, Contract.STATUS_FAILED]}, "duplicate_of_id": None},
+        {"_id": 0, "status": 1, "score": 1, "gaps": 1, "uploaded_at": 1},
+        batch_size=batch_size,
+    )
+    for doc in cursor:
+        rollup = days.setdefault(day_key(doc["uploaded_at"]), {})
+        increments = rollup_increments(doc["status"], doc.get("score"), repository.decode_field("gaps", doc.get("gaps")))
+        for path, value in increments.items():
+            target = rollup
+            *parents, leaf = path.split(".")
+            for parent in parents:
+                target = target.setdefault(parent, {})
+            target[leaf] = target.get(leaf, 0) + value
+
+    rollups = _rollups()
+    rollups.delete_many({})
+    if days:
+        rollups.insert_many([dict(rollup, _id=key) for key, rollup in days.items()])
+    return len(days)
@@ -0,0 +1,151 @@
+"""On-disk store of extracted page text, so extraction can be re-run without PDFs.
+
+Decoding the PDF is the expensive part of a parse, so the per-page text it
+produces is kept in one artifact file per contract under
+``CONTRACT_ARTIFACT_ROOT``. The file is a small header, an offset table and
+the pages, each zlib-compressed on its own::
+
+    b"CPA1" | page count (u32) | page count + 1 offsets (u64) | page blobs
+
+Offsets are relative to the end of the table. Artifacts are opened with
+``mmap``, so reading a page only touches that page's bytes.
+
+Only the text is stored, not layout tokens (positioned text runs): the field
+extractors read nothing else, so ``manage.py reextract`` can rerun them but a
+layout-aware extractor could not. Storing tokens would need a new format
+version (a different magic) and a full parse to fill it.
+"""
+import mmap
+import os
+import struct
+import tempfile
+import zlib
+from pathlib import Path
+
+from django.conf import settings
+
+MAGIC = b"CPA1"
+_HEADER = struct.Struct("<4sI")
+_OFFSET = struct.Struct("<Q")
+
+
+class ArtifactError(Exception):
+    """An artifact file is missing its header or is truncated."""
+
+
+def artifact_path(contract_id: int) -> Path:
+    return Path(settings.CONTRACT_ARTIFACT_ROOT) / f"{contract_id}.pages"
+
+
+class PageWriter:
+    """Write an artifact one page at a time, without holding the pages.
+
+    ``count`` is the number of pages that will be added. The artifact only
+    replaces the previous one on :meth:`commit`; used as a context manager,
+    the writer commits on success and discards the file on error.
+    """
+
+    def __init__(self, contract_id: int, count: int):
+        self.path = artifact_path(contract_id)
+        self.count = count
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, self._tmp = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+        self._out = os.fdopen(fd, "wb")
+        self._offsets = [0]
+        self._out.write(_HEADER.pack(MAGIC, count))
+        # The offset table is filled in on commit.
+        self._out.seek(_HEADER.size + (count + 1) * _OFFSET.size)
+
+    def add(self, text: str) -> None:
+        blob = zlib.compress(text.encode("utf-8"), settings.CONTRACT_ARTIFACT_COMPRESSION)
+        self._out.write(blob)
+        self._offsets.append(self._offsets[-1] + len(blob))
+
+    def commit(self) -> Path:
+        if len(self._offsets) != self.count + 1:
+            self.abort()
+            raise ArtifactError(f"Expected {self.count} pages, got {len(self._offsets) - 1}")
+        try:
+            self._out.seek(_HEADER.size)
+            self._out.write(b"".join(_OFFSET.pack(offset) for offset in self._offsets))
+            self._out.close()
+            # Readers see either the old artifact or the complete new one.
+            os.replace(self._tmp, self.path)
+        except BaseException:
+            self.abort()
+            raise
+        return self.path
+
+    def abort(self) -> None:
+        self._out.close()
+        try:
+            os.unlink(self._tmp)
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
+
+
+def write_pages(contract_id: int, texts) -> Path:
+    """Store the page texts of a contract, replacing any previous artifact."""
+    texts = list(texts)
+    with PageWriter(contract_id, len(texts)) as writer:
+        for text in texts:
+            writer.add(text)
+    return writer.path
+
+
+class PageArtifact:
+    """Memory-mapped, read-only view of a stored artifact."""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, count = _HEADER.unpack_from(self._map, 0)
+            if magic != MAGIC:
+                raise ArtifactError(f"{path} is not a page artifact")
+            table = _HEADER.size
+            self._offsets = [_OFFSET.unpack_from(self._map, table + i * _OFFSET.size)[0] for i in range(count + 1)]
+            self._data = table + (count + 1) * _OFFSET.size
+            if self._data + self._offsets[-1] > len(self._map):
+                raise ArtifactError(f"{path} is truncated")
+        except (struct.error, ArtifactError) as exc:
+            self._map.close()
+            raise ArtifactError(str(exc)) from exc
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def page(self, number: int) -> str:
+        start = self._data + self._offsets[number]
+        stop = self._data + self._offsets[number + 1]
+        return zlib.decompress(self._map[start:stop]).decode("utf-8")
+
+    def __iter__(self):
+        return (self.page(number) for number in range(len(self)))
+
+    def close(self) -> None:
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def open_pages(contract_id: int) -> PageArtifact:
+    """Open a contract's artifact; raises FileNotFoundError if it has none."""
+    return PageArtifact(artifact_path(contract_id))
+
+
+def exists(contract_id: int) -> bool:
+    return artifact_path(contract_id).exists()
@@ -0,0 +1,152 @@
+"""Native async versions of the read-path contract views.
+
+With ``CONTRACT_ASYNC_VIEWS`` on and the app served by an ASGI server
+(``uvicorn parser.asgi:application``), :func:`contract_status`,
+:func:`contract_list` and :func:`contract_detail` await MongoDB through the
+event loop's shared ``AsyncMongoClient`` (see
+``contracts.mongo.get_async_client`` and ``contracts.repository``) instead
+of holding a thread per request, so a long-poll or a slow client costs one
+coroutine. Responses match ``contracts.views``. The rare blocking steps
+(lazily rescoring stale rows, the optional shared cache tiers) run via
+``sync_to_async``.
+
+There is no async download: Django 3.2's ASGI handler iterates streaming
+response bodies on the event loop, so file downloads, the SSE stream and
+the export would block every other request on the worker. Serve those from
+a WSGI deployment (see the README).
+"""
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse
+from django.utils.http import parse_etags
+
+from . import detail_cache, events, pagination, progress, repository, rescoring, search
+from .models import Contract
+from .mongo import get_async_collection
+from .views import _detail_payload, _list_params, _list_rows, _partial_payload, _wants_partial
+
+
+async def _current_status(contract_id: int) -> dict:
+    """Async :func:`contracts.views._current_status`."""
+    payload = progress.get_table().get(contract_id)
+    if payload is None and settings.CONTRACT_PROGRESS_SHARED_CACHE:
+        payload = await sync_to_async(progress.current, thread_sensitive=False)(contract_id)
+    if payload is None:
+        payload = events.status_payload(await repository.aget_or_404(contract_id, repository.STATUS_FIELDS))
+    return payload
+
+
+async def contract_status(request, contract_id: int):
+    """Async :func:`contracts.views.contract_status`, long-poll included."""
+    try:
+        wait = min(float(request.GET.get("wait", 0)), settings.CONTRACT_LONG_POLL_MAX_WAIT)
+    except ValueError:
+        return JsonResponse({"detail": "Invalid wait"}, status=400)
+    if wait <= 0:
+        return JsonResponse(await _current_status(contract_id))
+
+    # Subscribe before reading so a transition in between is not missed.
+    with events.subscribe_async(contract_id) as subscription:
+        payload = await _current_status(contract_id)
+        known = (request.GET.get("status"), request.GET.get("progress"))
+        deadline = time.monotonic() + wait
+        while (payload["status"], str(payload["progress"])) == known and payload["status"] not in events.TERMINAL_STATUSES:
+            remaining = deadline - time.monotonic()
+            event = await subscription.get(timeout=remaining) if remaining > 0 else None
+            if event is None:
+                break
+            payload = event
+    return JsonResponse(payload)
+
+
+async def _refresh_rows(rows: list) -> None:
+    # Rescoring blocks, but only rows scored by an older rubric need it.
+    if any(rescoring.is_stale_row(row) for row in rows):
+        await sync_to_async(rescoring.refresh_rows, thread_sensitive=False)(rows)
+
+
+async def contract_list(request):
+    """Async :func:`contracts.views.contract_list`: same parameters and response shapes."""
+    try:
+        page_size, sort, filters = _list_params(request)
+    except ValueError as exc:
+        return JsonResponse({"detail": str(exc)}, status=400)
+    collection = get_async_collection(Contract)
+    query = pagination.build_query(**filters)
+
+    q = request.GET.get("q", "").strip()
+    if q:
+        try:
+            rows, next_cursor = await search.asearch_page(
+                q, query, page_size, after=request.GET.get("after"), sort=request.GET.get("sort")
+            )
+        except pagination.InvalidCursor:
+            return JsonResponse({"detail": "Invalid cursor"}, status=400)
+        await _refresh_rows(rows)
+        return JsonResponse({"results": _list_rows(rows), "next": next_cursor})
+
+    projection = dict(pagination.LIST_PROJECTION, rubric_version=1)
+    if "after" in request.GET:
+        try:
+            page_query, kwargs = pagination.keyset_find(
+                query, page_size, request.GET["after"], sort=sort, projection=projection
+            )
+        except pagination.InvalidCursor:
+            return JsonResponse({"detail": "Invalid cursor"}, status=400)
+        rows, next_cursor = pagination.keyset_result(
+            await collection.find(page_query, **kwargs).to_list(), page_size, sort
+        )
+        await _refresh_rows(rows)
+        payload = {"results": _list_rows(rows), "next": next_cursor}
+        count_param = request.GET.get("count")
+        if count_param == "exact":
+            payload["count"] = await collection.count_documents(query, hint=pagination.index_for(query, sort))
+        elif count_param == "estimated":
+            payload["count"] = await collection.estimated_document_count() if not query else None
+        return JsonResponse(payload)
+
+    count = await collection.count_documents(query, hint=pagination.index_for(query, sort))
+    pages = max(-(-count // page_size), 1)
+    page = pagination.page_number(request.GET.get("page", 1), pages)
+    page_query, kwargs = pagination.offset_find(query, page, page_size, sort=sort, projection=projection)
+    rows = await collection.find(page_query, **kwargs).to_list()
+    await _refresh_rows(rows)
+    return JsonResponse({"results": _list_rows(rows), "page": page, "pages": pages, "count": count})
+
+
+async def _cached_detail(contract_id: int):
+    entry = detail_cache.get_cache().get(contract_id)
+    if entry is None and settings.CONTRACT_DETAIL_SHARED_CACHE:
+        entry = await sync_to_async(detail_cache.lookup, thread_sensitive=False)(contract_id)
+    return entry
+
+
+async def contract_detail(request, contract_id: int):
+    """Async :func:`contracts.views.contract_detail`, sharing its cache and ETags."""
+    entry = await _cached_detail(contract_id)
+    if entry is None:
+        generation = detail_cache.get_cache().generation()
+        contract = await repository.aget_or_404(contract_id, repository.DETAIL_FIELDS)
+        if contract.status != Contract.STATUS_COMPLETED:
+            if _wants_partial(request, contract):
+                return JsonResponse(_partial_payload(contract))
+            return JsonResponse({"detail": "Processing not complete"}, status=409)
+        if rescoring.is_stale(contract):
+            await sync_to_async(rescoring.refresh_contract, thread_sensitive=False)(contract)
+        body = json.dumps(_detail_payload(contract), cls=DjangoJSONEncoder).encode()
+        if settings.CONTRACT_DETAIL_SHARED_CACHE:
+            entry = await sync_to_async(detail_cache.store, thread_sensitive=False)(contract.pk, body, generation)
+        else:
+            entry = detail_cache.store(contract.pk, body, generation)
+    etag, body = entry
+    if etag in parse_etags(request.META.get("HTTP_IF_NONE_MATCH", "")):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(body, content_type="application/json")
+    response["ETag"] = etag
+    return response
+
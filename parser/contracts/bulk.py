@@ -0,0 +1,212 @@
+"""Bulk contract ingestion.
+
+A bulk request carries many PDFs, either as repeated ``files`` parts of a
+multipart body or as one ZIP archive (an ``archive`` part, or the raw request
+body with ``Content-Type: application/zip``). Entries are validated one by
+one, deduplicated against each other and against stored contracts with a
+single digest lookup, inserted with one ``bulk_create`` and queued with one
+``insert_many``. Every entry gets a row in the returned manifest.
+"""
+import hashlib
+import tempfile
+import uuid
+import zipfile
+
+from django.conf import settings
+from django.core.files import File
+from django.db import DatabaseError
+from django.utils.text import get_valid_filename
+
+from . import dedup, jobs, search
+from .models import Contract
+
+COPY_CHUNK_SIZE = 64 * 1024
+
+
+class BulkUploadError(Exception):
+    """The request as a whole cannot be ingested."""
+
+
+class Entry:
+    def __init__(self, name: str, file=None, digest: str = None, error: str = None):
+        self.name = name
+        self.file = file
+        self.digest = digest
+        self.error = error
+        self.contract = None
+        self.needs_parse = False
+        self.stored_name = None
+
+
+def validate(name: str, size: int):
+    """Return an error message for an unacceptable entry, else None."""
+    if size > settings.CONTRACT_MAX_UPLOAD_BYTES:
+        return "File too large"
+    if not name.lower().endswith(".pdf"):
+        return "Unsupported file type"
+    return None
+
+
+def entries_from_files(files) -> list:
+    entries = []
+    for upload in files:
+        error = validate(upload.name, upload.size)
+        entries.append(Entry(upload.name, upload, dedup.file_digest(upload) if error is None else None, error))
+    return entries
+
+
+def entries_from_zip(fileobj) -> list:
+    """Read PDF entries out of a ZIP archive, one entry in memory/disk at a time.
+
+    Entry sizes are enforced on the bytes actually decompressed, not only on
+    the sizes the archive declares.
+    """
+    try:
+        archive = zipfile.ZipFile(fileobj)
+    except zipfile.BadZipFile:
+        raise BulkUploadError("Invalid ZIP archive")
+
+    limit = settings.CONTRACT_MAX_UPLOAD_BYTES
+    entries = []
+    for info in archive.infolist():
+        if info.is_dir() or info.filename.startswith("__MACOSX/"):
+            continue
+        name = info.filename.rsplit("/", 1)[-1]
+        if len(entries) >= settings.CONTRACT_BULK_MAX_FILES:
+            raise BulkUploadError(f"At most {settings.CONTRACT_BULK_MAX_FILES} files per request")
+        error = validate(name, info.file_size)
+        if error:
+            entries.append(Entry(name, error=error))
+            continue
+
+        sha = hashlib.sha256()
+        spool = tempfile.SpooledTemporaryFile(max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE)
+        size = 0
+        with archive.open(info) as member:
+            for chunk in iter(lambda: member.read(COPY_CHUNK_SIZE), b""):
+                size += len(chunk)
+                if size > limit:
+                    error = "File too large"
+                    break
+                sha.update(chunk)
+                spool.write(chunk)
+        if error:
+            spool.close()
+            entries.append(Entry(name, error=error))
+            continue
+        spool.seek(0)
+        entries.append(Entry(name, File(spool, name=name), sha.hexdigest()))
+    return entries
+
+
+def entries_from_stream(stream) -> list:
+    """Spool a raw ZIP request body to disk and read its entries."""
+    spool = tempfile.SpooledTemporaryFile(max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE)
+    copied = 0
+    for chunk in iter(lambda: stream.read(COPY_CHUNK_SIZE), b""):
+        copied += len(chunk)
+        if copied > settings.CONTRACT_BULK_MAX_BYTES:
+            raise BulkUploadError("Request too large")
+        spool.write(chunk)
+    spool.seek(0)
+    return entries_from_zip(spool)
+
+
+def ingest(entries: list, client: str = None) -> list:
+    """Create contracts for all valid entries and queue the ones to parse.
+
+    ``client`` is the uploader's fair-share queue key (see ``contracts.jobs``).
+    """
+    valid = [entry for entry in entries if entry.error is None]
+    if valid:
+        _create(valid)
+        search.add_uploads(entry.contract for entry in valid)
+        contracts = [entry.contract for entry in valid if entry.needs_parse]
+        jobs.enqueue_many(
+            [contract.pk for contract in contracts],
+            costs=[jobs.estimate_cost(contract.file.size) for contract in contracts],
+            client=client,
+        )
+    for entry in entries:
+        if entry.file is not None:
+            entry.file.close()
+    return [manifest_row(entry) for entry in entries]
+
+
+def manifest_row(entry: Entry) -> dict:
+    if entry.error:
+        return {"filename": entry.name, "error": entry.error}
+    return {
+        "filename": entry.name,
+        "contract_id": str(entry.contract.pk),
+        "status": entry.contract.status,
+        "deduplicated": not entry.needs_parse,
+    }
+
+
+def _create(entries: list) -> None:
+    digests = {entry.digest for entry in entries}
+    owners = {c.sha256: c for c in Contract.objects.filter(sha256__in=digests)}
+    failed = [d for d, c in owners.items() if c.status == Contract.STATUS_FAILED]
+    if failed:
+        # Failed owners give up their digest, as in dedup.create_contract.
+        Contract.objects.filter(sha256__in=failed).update(sha256="")
+        for digest in failed:
+            del owners[digest]
+
+    batch = uuid.uuid4().hex
+    batch_owners = {}
+    batch_duplicates = []
+    for entry in entries:
+        filename = get_valid_filename(entry.name)
+        owner = owners.get(entry.digest)
+        if owner is not None:
+            entry.contract = dedup.build_duplicate(owner, filename)
+        elif entry.digest in batch_owners:
+            # Same bytes twice in one request: link to the first copy after insert.
+            first = batch_owners[entry.digest]
+            entry.contract = Contract(file=first.stored_name, original_filename=filename)
+            batch_duplicates.append((entry, first))
+        else:
+            entry.contract = Contract(original_filename=filename, sha256=entry.digest)
+            entry.contract.file.save(filename, entry.file, save=False)
+            entry.stored_name = entry.contract.file.name
+            entry.needs_parse = True
+            batch_owners[entry.digest] = entry
+        entry.contract.upload_batch = batch
+
+    try:
+        Contract.objects.bulk_create([entry.contract for entry in entries])
+    except DatabaseError:
+        # A concurrent upload claimed one of the digests; an ordered insert
+        # stops there, so finish the rest one at a time.
+        inserted = _assign_ids(batch, entries)
+        _create_individually(entries[inserted:])
+    else:
+        _assign_ids(batch, entries)
+
+    # Copies of a file uploaded earlier in this request are always inserted
+    # after it, so by now their first copy has an id.
+    for entry, first in batch_duplicates:
+        if entry.contract.duplicate_of_id is None:
+            Contract.objects.filter(pk=entry.contract.pk).update(duplicate_of=first.contract)
+            entry.contract.duplicate_of = first.contract
+
+
+def _assign_ids(batch: str, entries: list) -> int:
+    # djongo allocates ids for one insert as a contiguous ascending block, so
+    # id order is insertion order.
+    ids = list(Contract.objects.filter(upload_batch=batch).order_by("id").values_list("id", flat=True))
+    for entry, pk in zip(entries, ids):
+        entry.contract.pk = pk
+    return len(ids)
+
+
+def _create_individually(entries: list) -> None:
+    for entry in entries:
+        source = entry.stored_name or entry.contract.file.name
+        entry.contract, entry.needs_parse = dedup.create_contract(
+            source, entry.contract.original_filename, digest=entry.digest
+        )
+        if entry.stored_name and not entry.needs_parse:
+            entry.contract.file.storage.delete(entry.stored_name)
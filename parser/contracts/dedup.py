@@ -0,0 +1,193 @@
+"""Content-addressed deduplication of uploaded contracts.
+
+The SHA-256 of every uploaded file is computed by :class:`Sha256UploadHandler`
+while the request body streams in. The first contract stored with a digest
+owns the blob; later uploads of the same bytes become duplicates that point at
+it, share its stored file and copy its extracted fields instead of being
+parsed again. Their page text is not copied: ``contracts.search`` indexes it
+once, under the owner.
+"""
+import hashlib
+
+from django.core.files.uploadhandler import FileUploadHandler
+from django.db import DatabaseError
+
+from . import events, repository
+from .models import Contract
+from .mongo import get_collection
+
+# Fields a duplicate copies from the contract that owns its blob.
+EXTRACTED_FIELDS = [
+    "parties",
+    "account_info",
+    "financial_details",
+    "payment_structure",
+    "revenue_classification",
+    "sla",
+    "score",
+    "gaps",
+    "rubric_version",
+]
+
+
+class Sha256UploadHandler(FileUploadHandler):
+    """Hash each uploaded file chunk by chunk and pass the data through.
+
+    Must run before the handler that stores the file. Digests are collected
+    per form field in upload order; :func:`attach_digests` copies them onto the
+    parsed ``UploadedFile`` objects as ``sha256``.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.digests = {}
+        self._hash = None
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self._hash = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self._hash.update(raw_data)
+        return raw_data
+
+    def file_complete(self, file_size):
+        self.digests.setdefault(self.field_name, []).append(self._hash.hexdigest())
+        return None
+
+
+def install_hashing(request) -> Sha256UploadHandler:
+    """Hash uploads on ``request``; call before ``request.FILES`` is touched."""
+    handler = Sha256UploadHandler(request)
+    request.upload_handlers.insert(0, handler)
+    return handler
+
+
+def attach_digests(request, handler: Sha256UploadHandler) -> None:
+    for field_name, files in request.FILES.lists():
+        for upload, digest in zip(files, handler.digests.get(field_name, [])):
+            upload.sha256 = digest
+
+
+def file_digest(upload) -> str:
+    digest = getattr(upload, "sha256", None)
+    if digest is None:
+        sha = hashlib.sha256()
+        for chunk in upload.chunks():
+            sha.update(chunk)
+        digest = upload.sha256 = sha.hexdigest()
+    return digest
+
+
+def build_duplicate(owner: Contract, filename: str) -> Contract:
+    """Return an unsaved contract sharing ``owner``'s blob (and fields, if parsed)."""
+    contract = Contract(
+        file=owner.file.name,
+        original_filename=filename,
+        duplicate_of=owner,
+        status=owner.status if owner.status == Contract.STATUS_COMPLETED else Contract.STATUS_PENDING,
+        progress=owner.progress if owner.status == Contract.STATUS_COMPLETED else 0,
+    )
+    if owner.status == Contract.STATUS_COMPLETED:
+        for field in EXTRACTED_FIELDS:
+            setattr(contract, field, getattr(owner, field))
+    return contract
+
+
+def create_contract(upload, filename: str, digest: str = None, parent_id: int = None):
+    """Store ``upload`` as a new contract, reusing an identical existing blob.
+
+    Returns ``(contract, needs_parse)``. A re-upload of a completed contract
+    comes back already completed; one of a contract still being parsed comes
+    back pending and is filled in by :func:`propagate_to_duplicates`. A failed
+    owner gives up its digest so the new upload is parsed from scratch.
+    ``upload`` may also be the storage name of an already stored file, in
+    which case ``digest`` is required. ``parent_id`` is the contract this
+    upload amends (see :mod:`contracts.versions`).
+    """
+    digest = digest or file_digest(upload)
+    for _ in range(2):
+        owner = Contract.objects.filter(sha256=digest).first()
+        if owner is not None and owner.status != Contract.STATUS_FAILED:
+            contract = build_duplicate(owner, filename)
+            contract.parent_id = parent_id
+            contract.save()
+            return contract, False
+        if owner is not None:
+            Contract.objects.filter(pk=owner.pk, sha256=digest).update(sha256="")
+
+        contract = Contract(
+            file=upload,
+            original_filename=filename,
+            sha256=digest,
+            parent_id=parent_id,
+            status=Contract.STATUS_PENDING,
+            progress=0,
+        )
+        try:
+            contract.save()
+        except DatabaseError:
+            # Lost a race with a concurrent upload of the same bytes.
+            contract.file.delete(save=False)
+            if not Contract.objects.filter(sha256=digest).exists():
+                raise
+            continue
+        return contract, True
+    raise DatabaseError(f"Could not store contract with digest {digest}")
+
+
+def propagate_to_duplicates(owner: Contract) -> None:
+    """Copy a finished parse onto the duplicates that were waiting for it."""
+    if owner.status == Contract.STATUS_COMPLETED:
+        updates = {"status": Contract.STATUS_COMPLETED, "progress": 100}
+        updates.update((field, getattr(owner, field)) for field in EXTRACTED_FIELDS)
+    elif owner.status == Contract.STATUS_FAILED:
+        updates = {"status": Contract.STATUS_FAILED, "error_message": owner.error_message}
+    else:
+        return
+    collection = get_collection(Contract)
+    # Only pending duplicates are waiting; a cancelled one stays cancelled.
+    waiting = [
+        repository.from_document(doc)
+        for doc in collection.find(
+            {"duplicate_of_id": owner.pk, "status": Contract.STATUS_PENDING},
+            repository.projection(repository.STATUS_FIELDS),
+        )
+    ]
+    if not waiting:
+        return
+    collection.update_many(
+        {"id": {"$in": [c.pk for c in waiting]}, "status": Contract.STATUS_PENDING},
+        {"$set": repository.to_document(updates)},
+    )
+    for contract in waiting:
+        for field, value in updates.items():
+            setattr(contract, field, value)
+        events.publish(contract)
+
+
+def hand_over_duplicates(owner: Contract):
+    """Make the oldest duplicate waiting on ``owner`` the blob owner instead.
+
+    For an owner whose parse was cancelled: the duplicates were uploaded on
+    their own and still need a parse. The heir takes over the digest and the
+    other waiting duplicates; the caller queues its parse. Returns the heir
+    (with ``id`` and ``file``), or None if nothing was waiting.
+    """
+    collection = get_collection(Contract)
+    heir = collection.find_one(
+        {"duplicate_of_id": owner.pk, "status": Contract.STATUS_PENDING},
+        repository.projection(("id", "file")),
+        sort=[("id", 1)],
+    )
+    if heir is None:
+        return None
+    digest = (collection.find_one({"id": owner.pk}, {"_id": 0, "sha256": 1}) or {}).get("sha256", "")
+    # The digest is unique among owners, so the cancelled owner gives it up first.
+    collection.update_one({"id": owner.pk}, {"$set": {"sha256": ""}})
+    collection.update_one({"id": heir["id"]}, {"$set": {"sha256": digest, "duplicate_of_id": None}})
+    collection.update_many(
+        {"duplicate_of_id": owner.pk, "status": Contract.STATUS_PENDING},
+        {"$set": {"duplicate_of_id": heir["id"]}},
+    )
+    return repository.from_document(heir)
@@ -0,0 +1,141 @@
+"""Cache of serialized contract detail responses.
+
+A completed contract's detail payload only changes when it is re-parsed or
+rescored, so the serialized JSON is cached per contract and served with a
+strong ``ETag`` (a digest of the body); a matching ``If-None-Match`` gets a
+304 without touching the database. Each web process keeps an LRU bounded by
+``CONTRACT_DETAIL_CACHE_BYTES``, optionally backed by a shared Django cache
+(``CONTRACT_DETAIL_SHARED_CACHE``, e.g. Redis or memcached) keyed by contract
+id and rubric version.
+
+Every change to a contract is published to the event bus (see
+:mod:`contracts.events`), whose thread evicts the contract from both tiers.
+A response built from a read that raced with such an eviction is not cached.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+from . import events, scoring
+
+# Recent invalidations remembered per process to reject racing stores.
+INVALIDATION_MEMORY = 4096
+
+
+class DetailCache:
+    """Thread-safe LRU of ``contract_id -> (etag, body)`` bounded by body bytes."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._generation = 0
+        self._invalidated = OrderedDict()
+
+    def generation(self) -> int:
+        """Take before reading a contract; pass to :meth:`put` with the result."""
+        with self._lock:
+            return self._generation
+
+    def get(self, contract_id: int):
+        with self._lock:
+            entry = self._entries.get(contract_id)
+            if entry is not None:
+                self._entries.move_to_end(contract_id)
+            return entry
+
+    def put(self, contract_id: int, entry, generation: int) -> bool:
+        """Cache ``entry`` unless the contract was invalidated after ``generation``."""
+        size = len(entry[1])
+        if size > self.max_bytes:
+            return False
+        with self._lock:
+            if self._invalidated.get(contract_id, -1) > generation:
+                return False
+            self._discard(contract_id)
+            self._entries[contract_id] = entry
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, body) = self._entries.popitem(last=False)
+                self._bytes -= len(body)
+        return True
+
+    def invalidate(self, contract_id: int) -> None:
+        with self._lock:
+            self._generation += 1
+            self._invalidated[contract_id] = self._generation
+            self._invalidated.move_to_end(contract_id)
+            if len(self._invalidated) > INVALIDATION_MEMORY:
+                self._invalidated.popitem(last=False)
+            self._discard(contract_id)
+
+    def _discard(self, contract_id: int) -> None:
+        entry = self._entries.pop(contract_id, None)
+        if entry is not None:
+            self._bytes -= len(entry[1])
+
+
+_cache = None
+_cache_pid = None
+
+
+def get_cache() -> DetailCache:
+    """Return this process's cache, listening for contract changes."""
+    global _cache, _cache_pid
+    if _cache is None or _cache_pid != os.getpid():
+        _cache = DetailCache(settings.CONTRACT_DETAIL_CACHE_BYTES)
+        _cache_pid = os.getpid()
+        bus = events.get_bus()
+        bus.add_listener(lambda contract_id, payload: invalidate(contract_id))
+        bus.start()
+    return _cache
+
+
+def _shared():
+    alias = settings.CONTRACT_DETAIL_SHARED_CACHE
+    return caches[alias] if alias else None
+
+
+def _shared_key(contract_id: int) -> str:
+    return f"contracts:detail:v{scoring.RUBRIC_VERSION}:{contract_id}"
+
+
+def make_entry(body: bytes):
+    return f'"{hashlib.sha256(body).hexdigest()}"', body
+
+
+def lookup(contract_id: int):
+    """Return the cached ``(etag, body)`` for a contract, or None."""
+    cache = get_cache()
+    entry = cache.get(contract_id)
+    if entry is None:
+        shared = _shared()
+        if shared is not None:
+            generation = cache.generation()
+            body = shared.get(_shared_key(contract_id))
+            if body is not None:
+                entry = make_entry(body)
+                cache.put(contract_id, entry, generation)
+    return entry
+
+
+def store(contract_id: int, body: bytes, generation: int):
+    """Cache a freshly built response body and return its ``(etag, body)``."""
+    entry = make_entry(body)
+    if get_cache().put(contract_id, entry, generation):
+        shared = _shared()
+        if shared is not None:
+            shared.set(_shared_key(contract_id), body, settings.CONTRACT_DETAIL_SHARED_TIMEOUT)
+    return entry
+
+
+def invalidate(contract_id: int) -> None:
+    get_cache().invalidate(contract_id)
+    shared = _shared()
+    if shared is not None:
+        shared.delete(_shared_key(contract_id))
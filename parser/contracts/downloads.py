@@ -0,0 +1,116 @@
+"""Streaming file responses for contract downloads.
+
+Files are never read into memory: full downloads use ``FileResponse`` and
+single byte ranges are streamed in ``DOWNLOAD_CHUNK_SIZE`` blocks. ``ETag`` and
+``Last-Modified`` come from storage metadata, so conditional requests are
+answered with ``304`` without opening the file. With ``CONTRACT_DOWNLOAD_ACCEL``
+set, the response only carries an ``X-Accel-Redirect`` (nginx) or
+``X-Sendfile`` (Apache/lighttpd) header and the front proxy sends the bytes.
+"""
+import re
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_etags
+
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def parse_range(header: str, size: int):
+    """Return ``(start, end)`` (inclusive) for a single-range header.
+
+    Returns None when the header should be ignored (absent, malformed or
+    multi-range: the full file is served) and raises ValueError when the range
+    cannot be satisfied.
+    """
+    match = _RANGE_RE.match((header or "").strip())
+    if not match or size == 0:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        length = int(last)
+        if length == 0:
+            raise ValueError("Empty suffix range")
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or (last and int(last) < start):
+        raise ValueError("Range not satisfiable")
+    return start, end
+
+
+def _iter_range(fh, start: int, length: int):
+    try:
+        fh.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = fh.read(min(DOWNLOAD_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        fh.close()
+
+
+def file_etag(size: int, modified, digest: str = "") -> str:
+    if digest:
+        return f'"{digest}"'
+    return f'"{size:x}-{int(modified.timestamp()):x}"'
+
+
+def serve_file(request, fieldfile, filename: str, content_type: str = "application/pdf", digest: str = ""):
+    storage = fieldfile.storage
+    size = storage.size(fieldfile.name)
+    modified = storage.get_modified_time(fieldfile.name)
+    etag = file_etag(size, modified, digest)
+    last_modified = int(modified.timestamp())
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        not_modified["ETag"] = etag
+        return not_modified
+
+    disposition = f"attachment; filename=\"{filename}\""
+    accel = settings.CONTRACT_DOWNLOAD_ACCEL
+    if accel:
+        response = HttpResponse(content_type=content_type)
+        if accel == "nginx":
+            response["X-Accel-Redirect"] = settings.CONTRACT_DOWNLOAD_ACCEL_PREFIX.rstrip("/") + "/" + fieldfile.name
+        else:
+            response["X-Sendfile"] = fieldfile.path
+    else:
+        byte_range = None
+        if_range = request.META.get("HTTP_IF_RANGE")
+        if not if_range or etag in parse_etags(if_range):
+            try:
+                byte_range = parse_range(request.META.get("HTTP_RANGE"), size)
+            except ValueError:
+                response = HttpResponse(status=416)
+                response["Content-Range"] = f"bytes */{size}"
+                return response
+
+        if byte_range is None:
+            response = FileResponse(fieldfile.open("rb"), content_type=content_type)
+            response.block_size = DOWNLOAD_CHUNK_SIZE
+        else:
+            start, end = byte_range
+            length = end - start + 1
+            response = StreamingHttpResponse(
+                _iter_range(storage.open(fieldfile.name, "rb"), start, length),
+                status=206,
+                content_type=content_type,
+            )
+            response["Content-Length"] = str(length)
+            response["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    response["Accept-Ranges"] = "bytes"
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    response["Content-Disposition"] = disposition
+    return response
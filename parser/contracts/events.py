@@ -0,0 +1,232 @@
+"""Contract status event bus.
+
+Parse workers run in other processes (often other hosts), so status and
+progress transitions are published to ``contract_events``, a capped Mongo
+collection. Each web process runs a single :class:`EventBus` thread that tails
+it with a tailable, awaiting cursor (no replica set needed, unlike change
+streams) and fans events out to in-process subscribers. However many clients
+watch a contract, the collection is read by one cursor per process.
+Listeners registered with :meth:`EventBus.add_listener` (the detail cache and
+the progress table) see every event, including changes that are not status
+transitions, such as rescores. Async views subscribe with
+:func:`subscribe_async`; the bus thread hands their events to the event loop.
+"""
+import asyncio
+import logging
+import os
+import queue
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid, PyMongoError
+
+from .models import Contract
+from .mongo import get_database
+
+logger = logging.getLogger(__name__)
+
+EVENTS_COLLECTION = "contract_events"
+
+TERMINAL_STATUSES = {Contract.STATUS_COMPLETED, Contract.STATUS_FAILED}
+
+
+def status_payload(contract: Contract) -> dict:
+    return {
+        "status": contract.status,
+        "progress": contract.progress,
+        "error": contract.error_message or None,
+    }
+
+
+_created = set()
+
+
+def _events():
+    db = get_database()
+    if db.name not in _created:
+        try:
+            db.create_collection(EVENTS_COLLECTION, capped=True, size=settings.CONTRACT_EVENTS_CAPPED_BYTES)
+            # A tailable cursor on an empty capped collection dies at once.
+            db[EVENTS_COLLECTION].insert_one({"contract_id": None, "ts": timezone.now()})
+        except CollectionInvalid:
+            pass
+        _created.add(db.name)
+    return db[EVENTS_COLLECTION]
+
+
+def publish(contract: Contract) -> None:
+    """Publish the current status/progress of ``contract`` to all web processes."""
+    try:
+        _events().insert_one({"contract_id": contract.pk, "ts": timezone.now(), **status_payload(contract)})
+    except PyMongoError:
+        # Events are an optimisation over polling; never fail a parse over one.
+        logger.warning("Could not publish status event for contract %s", contract.pk, exc_info=True)
+
+
+def publish_changed(contract_ids) -> None:
+    """Tell all web processes that contracts changed without a status transition."""
+    now = timezone.now()
+    docs = [{"contract_id": pk, "ts": now} for pk in contract_ids]
+    if not docs:
+        return
+    try:
+        _events().insert_many(docs, ordered=False)
+    except PyMongoError:
+        logger.warning("Could not publish change events for %d contracts", len(docs), exc_info=True)
+
+
+class Subscription:
+    def __init__(self, bus, contract_id: int):
+        self.bus = bus
+        self.contract_id = contract_id
+        self.queue = queue.Queue()
+
+    def put(self, payload: dict) -> None:
+        self.queue.put(payload)
+
+    def get(self, timeout: float):
+        """Return the next event payload, or None after ``timeout`` seconds."""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self) -> None:
+        self.bus.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class AsyncSubscription(Subscription):
+    """A subscription awaited on an event loop instead of blocking a thread."""
+
+    def __init__(self, bus, contract_id: int):
+        super().__init__(bus, contract_id)
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+
+    def put(self, payload: dict) -> None:
+        # Called from the bus thread; asyncio queues are not thread-safe.
+        try:
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, payload)
+        except RuntimeError:
+            pass  # The loop has closed; nobody is waiting any more.
+
+    async def get(self, timeout: float):
+        """Return the next event payload, or None after ``timeout`` seconds."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class EventBus:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+        self._listeners = []
+        self._thread = None
+
+    def subscribe(self, contract_id: int, subscription_class=Subscription) -> Subscription:
+        subscription = subscription_class(self, contract_id)
+        with self._lock:
+            self._subscribers[contract_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.contract_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.contract_id]
+
+    def add_listener(self, callback) -> None:
+        """Call ``callback(contract_id, payload)`` for every event.
+
+        ``payload`` is the status payload, or None for change events.
+        """
+        with self._lock:
+            self._listeners.append(callback)
+
+    def notify(self, contract_id: int, payload) -> None:
+        with self._lock:
+            listeners = list(self._listeners)
+        for callback in listeners:
+            try:
+                callback(contract_id, payload)
+            except Exception:
+                logger.warning("Contract event listener failed for contract %s", contract_id, exc_info=True)
+
+    def dispatch(self, contract_id: int, payload: dict) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers.get(contract_id, ()))
+        for subscription in subscribers:
+            subscription.put(payload)
+
+    def start(self) -> None:
+        """Start tailing the event collection, unless already running."""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="contract-event-bus", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        # Events are full snapshots, so replaying a few is harmless; the margin
+        # covers clock skew between hosts.
+        since = timezone.now() - timedelta(seconds=5)
+        while True:
+            try:
+                cursor = _events().find(
+                    {"ts": {"$gte": since}},
+                    cursor_type=CursorType.TAILABLE_AWAIT,
+                    max_await_time_ms=1000,
+                )
+                while cursor.alive:
+                    for doc in cursor:
+                        since = doc["ts"]
+                        if doc.get("contract_id") is None:
+                            continue
+                        payload = None
+                        if "status" in doc:
+                            payload = {"status": doc["status"], "progress": doc["progress"], "error": doc["error"]}
+                        self.notify(doc["contract_id"], payload)
+                        if payload is not None:
+                            self.dispatch(doc["contract_id"], payload)
+            except PyMongoError:
+                logger.warning("Contract event cursor failed; reconnecting", exc_info=True)
+            time.sleep(1)
+
+
+_bus = None
+_bus_pid = None
+
+
+def get_bus() -> EventBus:
+    global _bus, _bus_pid
+    if _bus is None or _bus_pid != os.getpid():
+        _bus = EventBus()
+        _bus_pid = os.getpid()
+    return _bus
+
+
+def subscribe(contract_id: int) -> Subscription:
+    bus = get_bus()
+    bus.start()
+    return bus.subscribe(contract_id)
+
+
+def subscribe_async(contract_id: int) -> AsyncSubscription:
+    """Subscribe from a coroutine; see :class:`AsyncSubscription`."""
+    bus = get_bus()
+    bus.start()
+    return bus.subscribe(contract_id, AsyncSubscription)
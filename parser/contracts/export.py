@@ -0,0 +1,103 @@
+"""Streaming NDJSON and CSV exports of the contract corpus.
+
+Rows come from a single server-side cursor that fetches
+``CONTRACT_EXPORT_BATCH_SIZE`` documents per round trip and are encoded as they
+arrive, so an export holds one batch in memory however many contracts match.
+Filters go into the Mongo query and rows are read in upload order along the
+same indexes as the list API (see ``contracts.pagination``). Used by ``GET
+/contracts/export`` and ``manage.py export_contracts``.
+"""
+import csv
+import json
+from datetime import datetime
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from pymongo import ASCENDING
+
+from . import extraction, pagination
+from .models import Contract
+from .mongo import get_collection
+from .repository import SECTION_FIELDS, decode_field, projection
+
+FIELDS = ("id", "original_filename", "status", "score", "gaps", "rubric_version", "uploaded_at", "updated_at")
+CONTENT_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+# Rows are joined into chunks of about this many characters before being sent.
+CHUNK_CHARS = 64 * 1024
+
+
+def find(query: dict, batch_size: int = None):
+    """Server-side cursor over the contracts matching ``query``, oldest first."""
+    return get_collection(Contract).find(
+        query,
+        projection(FIELDS + SECTION_FIELDS),
+        sort=[("uploaded_at", ASCENDING), ("id", ASCENDING)],
+        hint=pagination.index_for(query, "uploaded_at"),
+        batch_size=batch_size or settings.CONTRACT_EXPORT_BATCH_SIZE,
+    )
+
+
+def row(doc: dict) -> dict:
+    values = {name: decode_field(name, doc.get(name)) for name in FIELDS}
+    for section in SECTION_FIELDS:
+        values[section] = extraction.full_section(section, decode_field(section, doc.get(section)))
+    return values
+
+
+def ndjson_lines(docs):
+    for doc in docs:
+        yield json.dumps(row(doc), cls=DjangoJSONEncoder) + "\n"
+
+
+class _Echo:
+    """A file-like whose ``write`` returns the line, for ``csv.writer``."""
+
+    def write(self, value):
+        return value
+
+
+def _cell(value):
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, cls=DjangoJSONEncoder)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def csv_lines(docs):
+    """A header and one line per contract; each extracted field gets a ``section.field`` column."""
+    columns = [(section, field) for section, fields in extraction.SECTION_FIELDS.items() for field in fields]
+    writer = csv.writer(_Echo())
+    yield writer.writerow(list(FIELDS) + [f"{section}.{field}" for section, field in columns])
+    for doc in docs:
+        values = row(doc)
+        cells = [_cell(values[name]) for name in FIELDS]
+        cells += [_cell(values[section].get(field)) for section, field in columns]
+        yield writer.writerow(cells)
+
+
+FORMATS = {"ndjson": ndjson_lines, "csv": csv_lines}
+
+
+def chunks(lines):
+    """Join ``lines`` into chunks of about :data:`CHUNK_CHARS` characters."""
+    buffer = []
+    size = 0
+    for line in lines:
+        buffer.append(line)
+        size += len(line)
+        if size >= CHUNK_CHARS:
+            yield "".join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def stream(query: dict, fmt: str = "ndjson", batch_size: int = None):
+    """Yield the export of the contracts matching ``query`` in chunks of text."""
+    cursor = find(query, batch_size)
+    try:
+        yield from chunks(FORMATS[fmt](cursor))
+    finally:
+        cursor.close()
@@ -0,0 +1,456 @@
+"""PDF text and field extraction.
+
+Page text is extracted with PyPDF2 in parallel: the page range is cut into
+chunks of ``PARSE_PAGES_PER_TASK`` pages and each chunk is handled by a process
+from a pool of ``PARSE_PROCESSES`` workers, which opens the file itself so only
+page numbers and results cross the process boundary. Each page yields a
+partial set of fields; :class:`FieldMerger` folds them into the section dicts
+stored on :class:`~contracts.models.Contract`. The page text is also kept as
+an artifact (see :mod:`contracts.artifacts`) so that
+:func:`reextract_artifact` can rerun the field extractors without the PDF.
+
+Memory stays bounded however large the PDF is: :func:`iter_pages` yields
+pages in order while only a small window of chunks is in flight, readers
+parse the file through a file handle instead of loading it, the objects
+resolved for a page are released once it is extracted, and a reader whose
+process grows past ``PARSE_MEMORY_LIMIT_MB`` is dropped and reopened.
+
+:func:`fingerprint_pages` hashes what extraction reads from each page without
+extracting it, so amended versions of a contract only extract the pages that
+changed (see :mod:`contracts.versions`).
+"""
+import gc
+import hashlib
+import logging
+import os
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from PyPDF2 import PdfReader
+
+from . import artifacts
+
+logger = logging.getLogger(__name__)
+
+# Extracted sections and the keys each one always carries (None when not found).
+SECTION_FIELDS = {
+    "parties": ["customer", "vendor", "signatories"],
+    "account_info": ["billing_contact", "technical_contact"],
+    "financial_details": ["line_items", "total_value", "currency", "taxes"],
+    "payment_structure": ["terms", "schedule", "method", "banking"],
+    "revenue_classification": ["type", "billing_cycle", "renewal"],
+    "sla": ["metrics", "penalties", "support"],
+}
+
+# Fields collected from every page rather than taken from the first hit.
+LIST_FIELDS = {("parties", "signatories"), ("financial_details", "line_items")}
+
+CURRENCY_SYMBOLS = {"$": "USD", "€": "EUR", "£": "GBP", "¥": "JPY", "₹": "INR"}
+
+_AMOUNT = r"(?P<symbol>[$€£¥₹])?\s*(?P<code>USD|EUR|GBP|JPY|INR|CAD|AUD)?\s*(?P<amount>\d[\d,]*(?:\.\d+)?)"
+_EMAIL = r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+"
+
+_PATTERNS = {
+    "customer": re.compile(r"^\s*(?:customer|client|buyer|licensee)\s*(?:name)?\s*[:\-]\s*(?P<value>.+)$", re.I | re.M),
+    "vendor": re.compile(r"^\s*(?:vendor|supplier|provider|seller|licensor)\s*(?:name)?\s*[:\-]\s*(?P<value>.+)$", re.I | re.M),
+    "signatory": re.compile(r"^\s*(?:signed by|signatory|authorized signatory|by)\s*[:\-]\s*(?P<value>[^\n]+)$", re.I | re.M),
+    "billing_contact": re.compile(rf"billing[^\n]*?(?P<value>{_EMAIL})", re.I),
+    "technical_contact": re.compile(rf"(?:technical|support)[^\n]*?(?P<value>{_EMAIL})", re.I),
+    "line_item": re.compile(
+        r"^\s*(?P<description>[A-Za-z][^\n]*?)\s+(?P<quantity>\d+)\s*x?\s+[$€£]?\s*(?P<unit_price>\d[\d,]*\.\d{2})\s*$",
+        re.M,
+    ),
+    "total_value": re.compile(rf"\btotal(?:\s+contract)?(?:\s+(?:value|amount|price|fees?))?\s*[:\-]?\s*{_AMOUNT}", re.I),
+    "taxes": re.compile(r"\b(?:tax(?:es)?|vat|gst)\b[^\n\d$€£]*(?P<symbol>[$€£])?\s*(?P<amount>\d[\d,]*(?:\.\d+)?)\s*(?P<percent>%)?", re.I),
+    "terms": re.compile(r"\b(?:net\s*(?P<days>\d{1,3})|(?P<receipt>due (?:up)?on receipt))\b", re.I),
+    "schedule": re.compile(r"\b(?:invoiced|billed|payable|paid)\s+(?P<value>monthly|quarterly|annually|yearly|weekly|semi-annually|in advance|in arrears)\b", re.I),
+    "method": re.compile(r"\b(?P<value>wire transfer|bank transfer|ach|credit card|cheque|check|direct debit|paypal)\b", re.I),
+    "iban": re.compile(r"\bIBAN\s*[:\-]?\s*(?P<value>[A-Z]{2}\d{2}(?:\s?[A-Z0-9]{4}){2,7}(?:\s?[A-Z0-9]{1,3})?)"),
+    "swift": re.compile(r"\b(?:SWIFT|BIC)(?:\s*code)?\s*[:\-]?\s*(?P<value>[A-Z]{6}[A-Z0-9]{2}(?:[A-Z0-9]{3})?)\b"),
+    "routing_number": re.compile(r"\brouting\s*(?:number|no\.?|#)?\s*[:\-]?\s*(?P<value>\d{9})\b", re.I),
+    "account_number": re.compile(r"\baccount\s*(?:number|no\.?|#)\s*[:\-]?\s*(?P<value>[A-Z0-9][A-Z0-9-]{3,})", re.I),
+    "recurring": re.compile(r"\b(?:subscription|recurring|per month|per year|per annum)\b", re.I),
+    "one_time": re.compile(r"\b(?:one[- ]time|non[- ]recurring|lump sum)\b", re.I),
+    "billing_cycle": re.compile(r"\b(?P<value>monthly|quarterly|annual|annually|yearly)\s+(?:billing|subscription|fee|invoice)", re.I),
+    "renewal": re.compile(r"\b(?:auto(?:matically)?[- ]?renew\w*|renewal term|renew\w* for (?:successive|additional))", re.I),
+    "metrics": re.compile(r"(?P<value>\d{2,3}(?:\.\d+)?\s*%\s*(?:uptime|availability)|(?:uptime|availability) of \d{2,3}(?:\.\d+)?\s*%|response time[^.\n]*)", re.I),
+    "penalties": re.compile(r"\b(?:service credits?|penalt(?:y|ies)|liquidated damages)\b", re.I),
+    "support": re.compile(r"\b(?:24\s*/\s*7|24x7|support hours|technical support|maintenance and support)\b", re.I),
+}
+
+
+def _clean(value: str, limit: int = 200) -> str:
+    return " ".join(value.split())[:limit]
+
+
+def _sentence(text: str, match) -> str:
+    """Return the sentence of ``text`` around ``match``."""
+    start = max(text.rfind(".", 0, match.start()), text.rfind("\n", 0, match.start())) + 1
+    ends = [i for i in (text.find(".", match.end()), text.find("\n", match.end())) if i != -1]
+    end = min(ends) + 1 if ends else len(text)
+    return _clean(text[start:end])
+
+
+def _to_number(amount: str):
+    value = float(amount.replace(",", ""))
+    return int(value) if value.is_integer() else value
+
+
+def _search(name: str, text: str):
+    return _PATTERNS[name].search(text)
+
+
+def extract_page_fields(text: str) -> dict:
+    """Extract whatever fields can be found on a single page of text.
+
+    Returns a ``{section: {field: value}}`` dict containing only the fields
+    found on this page.
+    """
+    found = {section: {} for section in SECTION_FIELDS}
+    if not text or not text.strip():
+        return found
+
+    parties = found["parties"]
+    for field in ("customer", "vendor"):
+        m = _search(field, text)
+        if m:
+            parties[field] = _clean(m.group("value"))
+    signatories = [_clean(m.group("value")) for m in _PATTERNS["signatory"].finditer(text)]
+    if signatories:
+        parties["signatories"] = signatories
+
+    for field in ("billing_contact", "technical_contact"):
+        m = _search(field, text)
+        if m:
+            found["account_info"][field] = m.group("value")
+
+    financial = found["financial_details"]
+    items = [
+        {
+            "description": _clean(m.group("description")),
+            "quantity": int(m.group("quantity")),
+            "unit_price": _to_number(m.group("unit_price")),
+        }
+        for m in _PATTERNS["line_item"].finditer(text)
+        if not _PATTERNS["total_value"].match(m.group("description"))
+    ]
+    if items:
+        financial["line_items"] = items
+    m = _search("total_value", text)
+    if m:
+        financial["total_value"] = _to_number(m.group("amount"))
+        currency = m.group("code") or CURRENCY_SYMBOLS.get(m.group("symbol") or "")
+        if currency:
+            financial["currency"] = currency
+    m = _search("taxes", text)
+    if m:
+        financial["taxes"] = f"{m.group('amount')}%" if m.group("percent") else _to_number(m.group("amount"))
+
+    payment = found["payment_structure"]
+    m = _search("terms", text)
+    if m:
+        payment["terms"] = f"Net {m.group('days')}" if m.group("days") else "Due on receipt"
+    m = _search("schedule", text)
+    if m:
+        payment["schedule"] = m.group("value").lower()
+    m = _search("method", text)
+    if m:
+        payment["method"] = m.group("value").lower()
+    banking = {}
+    for field in ("iban", "swift", "routing_number", "account_number"):
+        m = _search(field, text)
+        if m:
+            banking[field] = _clean(m.group("value"))
+    if banking:
+        payment["banking"] = banking
+
+    revenue = found["revenue_classification"]
+    if _search("recurring", text):
+        revenue["type"] = "recurring"
+    elif _search("one_time", text):
+        revenue["type"] = "one-time"
+    m = _search("billing_cycle", text)
+    if m:
+        revenue["billing_cycle"] = m.group("value").lower()
+    m = _search("renewal", text)
+    if m:
+        revenue["renewal"] = _sentence(text, m)
+
+    sla = found["sla"]
+    m = _search("metrics", text)
+    if m:
+        sla["metrics"] = _clean(m.group("value"))
+    for field in ("penalties", "support"):
+        m = _search(field, text)
+        if m:
+            sla[field] = _sentence(text, m)
+
+    return found
+
+
+def empty_fields() -> dict:
+    return {section: {field: None for field in fields} for section, fields in SECTION_FIELDS.items()}
+
+
+def full_section(section: str, values) -> dict:
+    """``values`` with every field of ``section``; storage leaves out empty ones."""
+    return dict(dict.fromkeys(SECTION_FIELDS[section]), **(values or {}))
+
+
+_EMPTY = (None, "", [], {})
+
+
+class FieldMerger:
+    """Fold per-page field dicts, in page order, into one set of sections.
+
+    Scalar fields keep the first value found; list fields accumulate across
+    pages without duplicates.
+    """
+
+    def __init__(self):
+        self.sections = empty_fields()
+        self.complete = set()
+
+    def add(self, page: dict):
+        """Merge one page; returns ``(changed, completed)`` sets of section names.
+
+        A section is completed by the page that gives it a value for every field.
+        """
+        changed = set()
+        for section, fields in page.items():
+            merged = self.sections[section]
+            for field, value in fields.items():
+                if (section, field) in LIST_FIELDS:
+                    current = merged[field] or []
+                    for item in value:
+                        if item not in current:
+                            current.append(item)
+                            changed.add(section)
+                    merged[field] = current
+                elif merged.get(field) in _EMPTY:
+                    merged[field] = value
+                    if value not in _EMPTY:
+                        changed.add(section)
+        completed = {
+            section for section in changed
+            if section not in self.complete and all(v not in _EMPTY for v in self.sections[section].values())
+        }
+        self.complete |= completed
+        return changed, completed
+
+
+class SearchText:
+    """Whitespace-normalized text of pages added in order, capped for the search index."""
+
+    def __init__(self, limit: int = None):
+        self.limit = settings.CONTRACT_SEARCH_TEXT_MAX_CHARS if limit is None else limit
+        self._parts = []
+        self._size = 0
+
+    def add(self, page: str) -> None:
+        if self._size > self.limit:
+            return
+        part = " ".join(page.split())
+        self._parts.append(part)
+        self._size += len(part) + 1
+
+    def text(self) -> str:
+        return " ".join(self._parts)[:self.limit]
+
+
+def _rss_bytes():
+    """Resident set size of this process, or None where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def iter_page_range(path: str, start: int, stop: int, memory_limit: int = None):
+    """Yield ``(text, fields)`` for pages ``start..stop-1``, one page at a time.
+
+    The objects the reader resolved for a page (content streams, fonts,
+    images) are released after the page is extracted; if this process still
+    holds more than ``memory_limit`` bytes the reader is reopened. The
+    allocator rarely hands freed memory back, so RSS stays high after a
+    reopen: the next one waits until RSS grows past where the last was
+    triggered rather than firing on every page.
+    """
+    if memory_limit is None:
+        memory_limit = settings.PARSE_MEMORY_LIMIT_MB * 1024 * 1024
+    ceiling = memory_limit
+    with open(path, "rb") as fh:
+        # A file object, not a path: PyPDF2 reads a path into memory whole.
+        reader = PdfReader(fh)
+        for number in range(start, stop):
+            try:
+                text = reader.pages[number].extract_text() or ""
+            except Exception:
+                logger.warning("Could not extract text from page %s of %s", number + 1, path, exc_info=True)
+                text = ""
+            reader.resolved_objects.clear()
+            rss = _rss_bytes() if memory_limit else None
+            if rss and rss > ceiling:
+                reader = None
+                gc.collect()
+                reader = PdfReader(fh)
+                ceiling = rss
+            yield text, extract_page_fields(text)
+
+
+def _extract_range(path: str, start: int, stop: int) -> list:
+    """Pool task: return ``[(text, fields), ...]`` for pages ``start..stop-1``."""
+    return list(iter_page_range(path, start, stop))
+
+
+_pool = None
+_pool_pid = None
+
+
+def _get_pool(processes: int) -> ProcessPoolExecutor:
+    # One pool per process, recreated after fork so parse workers never share it.
+    global _pool, _pool_pid
+    if _pool is None or _pool_pid != os.getpid():
+        _pool = ProcessPoolExecutor(max_workers=processes)
+        _pool_pid = os.getpid()
+    return _pool
+
+
+def count_pages(path: str) -> int:
+    with open(path, "rb") as fh:
+        return len(PdfReader(fh).pages)
+
+
+def _resolve(obj):
+    return obj.get_object() if obj is not None else None
+
+
+def _hash_resources(digest, resources, depth: int = 0) -> None:
+    # Fonts decide how the content stream's bytes map to text; form XObjects
+    # carry text of their own.
+    resources = _resolve(resources) or {}
+    fonts = _resolve(resources.get("/Font")) or {}
+    for name in sorted(fonts):
+        font = _resolve(fonts[name])
+        digest.update(repr((name, font.get("/BaseFont"), _resolve(font.get("/Encoding")))).encode())
+        to_unicode = _resolve(font.get("/ToUnicode"))
+        if to_unicode is not None:
+            digest.update(to_unicode.get_data())
+    xobjects = _resolve(resources.get("/XObject")) or {}
+    for name in sorted(xobjects):
+        xobject = _resolve(xobjects[name])
+        if xobject.get("/Subtype") == "/Form" and depth < 8:
+            digest.update(name.encode())
+            digest.update(xobject.get_data())
+            _hash_resources(digest, xobject.get("/Resources"), depth + 1)
+
+
+def page_fingerprint(page) -> str:
+    """Hash of what text extraction reads from ``page``: its content streams,
+    fonts and form XObjects. Pages with equal fingerprints extract to the
+    same text; computing one costs a fraction of extracting it."""
+    digest = hashlib.blake2b(digest_size=16)
+    contents = _resolve(page.get("/Contents"))
+    for stream in contents if isinstance(contents, list) else [contents] if contents is not None else []:
+        digest.update(_resolve(stream).get_data())
+    _hash_resources(digest, page.get("/Resources"))
+    return digest.hexdigest()
+
+
+def fingerprint_pages(path: str) -> list:
+    """Fingerprint every page of the PDF at ``path``, in page order."""
+    fingerprints = []
+    with open(path, "rb") as fh:
+        reader = PdfReader(fh)
+        for page in reader.pages:
+            fingerprints.append(page_fingerprint(page))
+            reader.resolved_objects.clear()
+    return fingerprints
+
+
+def _runs(numbers):
+    """Contiguous ``(start, stop)`` runs of sorted page numbers."""
+    runs = []
+    for number in numbers:
+        if runs and runs[-1][1] == number:
+            runs[-1][1] = number + 1
+        else:
+            runs.append([number, number + 1])
+    return [tuple(run) for run in runs]
+
+
+def iter_pages(path: str, processes: int = None, pages_per_task: int = None, on_progress=None, total: int = None,
+               numbers=None):
+    """Yield ``(text, fields)`` for every page of the PDF at ``path``, in page order.
+
+    ``numbers`` limits extraction to those (0-based) pages, still yielded in
+    order. ``on_progress(done, total)`` is called as page chunks complete,
+    counting only the pages extracted. With a pool, at most two chunks per
+    process are extracted ahead of the consumer.
+    """
+    processes = processes or settings.PARSE_PROCESSES
+    pages_per_task = pages_per_task or settings.PARSE_PAGES_PER_TASK
+    if numbers is None:
+        numbers = range(count_pages(path) if total is None else total)
+    runs = _runs(sorted(numbers))
+    total = sum(stop - start for start, stop in runs)
+    ranges = [
+        (chunk, min(chunk + pages_per_task, stop))
+        for start, stop in runs
+        for chunk in range(start, stop, pages_per_task)
+    ]
+
+    if processes <= 1 or len(ranges) <= 1:
+        done = 0
+        for start, stop in runs:
+            for page in iter_page_range(path, start, stop):
+                yield page
+                done += 1
+                if on_progress and (done % pages_per_task == 0 or done == total):
+                    on_progress(done, total)
+        return
+
+    pool = _get_pool(processes)
+    waiting = deque(ranges)
+    in_flight = deque()
+    done = 0
+    try:
+        while waiting or in_flight:
+            while waiting and len(in_flight) < processes * 2:
+                start, stop = waiting.popleft()
+                in_flight.append(pool.submit(_extract_range, path, start, stop))
+            chunk = in_flight.popleft().result()
+            done += len(chunk)
+            if on_progress:
+                on_progress(done, total)
+            yield from chunk
+    finally:
+        for future in in_flight:
+            future.cancel()
+
+
+def contract_fields(pages):
+    """Fold extracted ``(text, fields)`` pages into ``(sections, text)`` in one pass."""
+    merger = FieldMerger()
+    text = SearchText()
+    for page, fields in pages:
+        merger.add(fields)
+        text.add(page)
+    return merger.sections, text.text()
+
+
+def reextract_artifact(contract_id: int):
+    """Pool task: rerun field extraction over a stored page artifact.
+
+    Returns ``(contract_id, sections, text)``, with None for sections and
+    text when the contract has no readable artifact.
+    """
+    try:
+        with artifacts.open_pages(contract_id) as pages:
+            texts = list(pages)
+    except (OSError, artifacts.ArtifactError):
+        return contract_id, None, None
+    return (contract_id, *contract_fields([(text, extract_page_fields(text)) for text in texts]))
@@ -0,0 +1,322 @@
+"""Durable parse job queue backed by the ``parse_jobs`` Mongo collection.
+
+Uploads enqueue one job per contract. Worker processes (``manage.py
+parse_worker``) claim jobs by atomically taking a time-limited lease, keep the
+lease alive with heartbeats while parsing, and mark the job done afterwards.
+A lease that expires because its worker died is simply claimable again, so no
+job is lost when a process or host restarts.
+
+Jobs are claimed in ``priority`` order rather than arrival order. A job's
+priority is the time it was queued plus its estimated cost
+(:func:`estimate_cost`), so short jobs overtake long ones, but a job can only
+be overtaken by jobs queued less than its (capped) cost after it: nothing
+starves. Jobs from the same client (``CONTRACT_CLIENT_HEADER``) are queued
+behind that client's earlier jobs, like a fair queue: a client's priorities
+advance by the cost of each job it queues, so one client's backlog of large
+scans delays its own jobs, not everyone else's.
+
+A job can be cancelled (:func:`cancel`) while queued or running; the worker
+running it notices between pages (:func:`raise_if_cancelled`) and moves on.
+
+Done, failed and cancelled jobs record ``finished_at``; a TTL index on it
+deletes them ``PARSE_JOB_RETENTION_SECONDS`` later, so the collection holds
+the live queue plus recent history rather than every job ever run.
+"""
+import logging
+import os
+import socket
+import threading
+import uuid
+from contextvars import ContextVar
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import OperationFailure
+
+from . import metrics
+from .mongo import get_database
+
+logger = logging.getLogger(__name__)
+
+JOBS_COLLECTION = "parse_jobs"
+CLIENTS_COLLECTION = "parse_clients"
+FINISHED_INDEX = "parse_jobs_finished_at_ttl"
+
+JOB_QUEUED = "queued"
+JOB_LEASED = "leased"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+# Set, for the duration of a handler call, to an Event the worker sets when the
+# job is cancelled or its lease is lost.
+_cancelled = ContextVar("parse_job_cancelled", default=None)
+
+
+class JobCancelled(Exception):
+    """Raised in a handler whose job was cancelled or lost its lease."""
+
+
+def _jobs():
+    return get_database()[JOBS_COLLECTION]
+
+
+def _clients():
+    return get_database()[CLIENTS_COLLECTION]
+
+
+def ensure_indexes() -> None:
+    jobs = _jobs()
+    jobs.create_index([("status", ASCENDING), ("enqueued_at", ASCENDING)])
+    jobs.create_index([("status", ASCENDING), ("priority", ASCENDING)])
+    jobs.create_index([("status", ASCENDING), ("lease_expires_at", ASCENDING)])
+    jobs.create_index([("contract_id", ASCENDING)])
+    retention = settings.PARSE_JOB_RETENTION_SECONDS
+    try:
+        jobs.create_index([("finished_at", ASCENDING)], name=FINISHED_INDEX, expireAfterSeconds=retention)
+    except OperationFailure:
+        # The index exists with another retention; change it in place.
+        get_database().command(
+            "collMod", JOBS_COLLECTION, index={"name": FINISHED_INDEX, "expireAfterSeconds": retention}
+        )
+    _clients().create_index([("client", ASCENDING)], unique=True)
+
+
+def estimate_cost(size: int) -> float:
+    """Estimated parse time, in seconds, of a PDF of ``size`` bytes.
+
+    Computed from the size alone so that enqueueing never opens the PDF:
+    counting pages parses its cross-reference table, too slow to do inside
+    an upload request. Scanned pages, the slow ones, are also the large ones.
+    """
+    pages = max(size or 0, 0) / settings.PARSE_JOB_BYTES_PER_PAGE
+    return min(pages * settings.PARSE_JOB_SECONDS_PER_PAGE, settings.PARSE_JOB_MAX_DELAY)
+
+
+def _priorities(costs: list, client: str, now) -> list:
+    """Claim order keys for jobs costing ``costs`` seconds queued by ``client`` at ``now``."""
+    costs = [min(max(cost, 0.0), settings.PARSE_JOB_MAX_DELAY) for cost in costs]
+    if client:
+        # Advance the client's clock past all of these jobs in one atomic
+        # update; it never lags behind the present.
+        total = sum(costs)
+        doc = _clients().find_one_and_update(
+            {"client": client},
+            [{"$set": {"clock": {"$add": [{"$max": ["$clock", now]}, total * 1000]}}}],
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        start = doc["clock"] - timedelta(seconds=total)
+    else:
+        start = now
+    priorities = []
+    for cost in costs:
+        start += timedelta(seconds=cost)
+        priorities.append(start)
+    return priorities
+
+
+def _new_job(contract_id: int, now, priority) -> dict:
+    return {
+        "contract_id": contract_id,
+        "status": JOB_QUEUED,
+        "attempts": 0,
+        "enqueued_at": now,
+        "priority": priority,
+        "lease_owner": None,
+        "lease_expires_at": None,
+        "heartbeat_at": None,
+        "error": None,
+    }
+
+
+def enqueue(contract_id: int, cost: float = 0.0, client: str = None):
+    """Queue a contract whose parse is estimated to take ``cost`` seconds."""
+    now = timezone.now()
+    priority, = _priorities([cost], client, now)
+    return _jobs().insert_one(_new_job(contract_id, now, priority)).inserted_id
+
+
+def enqueue_many(contract_ids, costs=None, client: str = None) -> list:
+    """Queue several contracts with a single ``insert_many``."""
+    contract_ids = list(contract_ids)
+    if not contract_ids:
+        return []
+    now = timezone.now()
+    priorities = _priorities(list(costs) if costs is not None else [0.0] * len(contract_ids), client, now)
+    docs = [_new_job(contract_id, now, priority) for contract_id, priority in zip(contract_ids, priorities)]
+    return _jobs().insert_many(docs).inserted_ids
+
+
+def claim(worker_id: str, lease_seconds: int):
+    """Lease the runnable job with the lowest priority key to ``worker_id`` and return it, or None.
+
+    Runnable means queued, or leased with an expired lease.
+    """
+    now = timezone.now()
+    return _jobs().find_one_and_update(
+        {
+            "$or": [
+                {"status": JOB_QUEUED},
+                {"status": JOB_LEASED, "lease_expires_at": {"$lt": now}},
+            ]
+        },
+        {
+            "$set": {
+                "status": JOB_LEASED,
+                "lease_owner": worker_id,
+                "lease_expires_at": now + timedelta(seconds=lease_seconds),
+                "heartbeat_at": now,
+            },
+            "$inc": {"attempts": 1},
+        },
+        sort=[("priority", ASCENDING)],
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+def heartbeat(job_id, worker_id: str, lease_seconds: int) -> bool:
+    """Extend the lease; False means the lease was lost to another worker."""
+    now = timezone.now()
+    result = _jobs().update_one(
+        {"_id": job_id, "status": JOB_LEASED, "lease_owner": worker_id},
+        {"$set": {"lease_expires_at": now + timedelta(seconds=lease_seconds), "heartbeat_at": now}},
+    )
+    return result.matched_count == 1
+
+
+def complete(job_id, worker_id: str) -> None:
+    _jobs().update_one(
+        {"_id": job_id, "status": JOB_LEASED, "lease_owner": worker_id},
+        {"$set": {"status": JOB_DONE, "lease_expires_at": None, "finished_at": timezone.now()}},
+    )
+
+
+def fail(job_id, worker_id: str, error: str, retry: bool) -> None:
+    update = {"error": error, "lease_owner": None, "lease_expires_at": None}
+    if retry:
+        update["status"] = JOB_QUEUED
+    else:
+        update["status"] = JOB_FAILED
+        update["finished_at"] = timezone.now()
+    _jobs().update_one({"_id": job_id, "status": JOB_LEASED, "lease_owner": worker_id}, {"$set": update})
+
+
+def cancel(contract_id: int) -> int:
+    """Cancel the queued or running jobs of a contract; returns how many there were."""
+    return _jobs().update_many(
+        {"contract_id": contract_id, "status": {"$in": [JOB_QUEUED, JOB_LEASED]}},
+        {"$set": {"status": JOB_CANCELLED, "lease_expires_at": None, "finished_at": timezone.now()}},
+    ).modified_count
+
+
+def raise_if_cancelled() -> None:
+    """Raise :class:`JobCancelled` if the job being handled was cancelled.
+
+    Handlers call this between units of work; outside a worker it does nothing.
+    """
+    cancelled = _cancelled.get()
+    if cancelled is not None and cancelled.is_set():
+        raise JobCancelled()
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class Worker:
+    """Claim and run parse jobs until stopped.
+
+    ``handler`` is called with the contract id of each claimed job. Exceptions
+    escaping it requeue the job until ``max_attempts`` is reached; after that
+    ``on_give_up`` is called with the contract id and the error message.
+    :class:`JobCancelled` leaves the job to whoever cancelled (or re-leased) it.
+    """
+
+    def __init__(self, handler, on_give_up=None, worker_id=None, lease_seconds=None,
+                 poll_interval=None, max_attempts=None):
+        self.handler = handler
+        self.on_give_up = on_give_up
+        self.worker_id = worker_id or default_worker_id()
+        self.lease_seconds = lease_seconds or settings.PARSE_JOB_LEASE_SECONDS
+        self.poll_interval = poll_interval or settings.PARSE_JOB_POLL_INTERVAL
+        self.max_attempts = max_attempts or settings.PARSE_JOB_MAX_ATTEMPTS
+        self.stop_event = threading.Event()
+        self._current = None
+
+    def stop(self) -> None:
+        self.stop_event.set()
+
+    def cancel(self, contract_id: int) -> None:
+        """Stop the running job if it is for ``contract_id``."""
+        current = self._current
+        if current is not None and current[0] == contract_id:
+            current[1].set()
+
+    def run(self, burst: bool = False) -> None:
+        """Process jobs until :meth:`stop` is called (or the queue drains, if ``burst``)."""
+        ensure_indexes()
+        logger.info("Parse worker %s started", self.worker_id)
+        while not self.stop_event.is_set():
+            if not self.run_one():
+                if burst:
+                    break
+                self.stop_event.wait(self.poll_interval)
+        logger.info("Parse worker %s stopped", self.worker_id)
+
+    def run_one(self) -> bool:
+        """Claim and process a single job. Returns False if none was runnable."""
+        job = claim(self.worker_id, self.lease_seconds)
+        if job is None:
+            return False
+        contract_id = job["contract_id"]
+        if job["attempts"] == 1:
+            waited = (timezone.now() - job["enqueued_at"]).total_seconds()
+            metrics.PARSE_STAGE_SECONDS.observe(max(waited, 0), stage="queue_wait")
+        if job["attempts"] > self.max_attempts:
+            self._give_up(job, "Exceeded maximum parse attempts")
+            return True
+
+        done = threading.Event()
+        cancelled = threading.Event()
+        self._current = (contract_id, cancelled)
+        token = _cancelled.set(cancelled)
+        beat = threading.Thread(target=self._heartbeat_loop, args=(job["_id"], done, cancelled), daemon=True)
+        beat.start()
+        close_old_connections()
+        try:
+            self.handler(contract_id)
+        except JobCancelled:
+            logger.info("Parse job %s for contract %s was cancelled", job["_id"], contract_id)
+        except Exception as exc:
+            logger.exception("Parse job %s for contract %s failed", job["_id"], contract_id)
+            if job["attempts"] < self.max_attempts:
+                fail(job["_id"], self.worker_id, str(exc), retry=True)
+            else:
+                self._give_up(job, str(exc))
+        else:
+            complete(job["_id"], self.worker_id)
+        finally:
+            _cancelled.reset(token)
+            self._current = None
+            done.set()
+            beat.join()
+            close_old_connections()
+        return True
+
+    def _give_up(self, job, error: str) -> None:
+        fail(job["_id"], self.worker_id, error, retry=False)
+        if self.on_give_up is not None:
+            self.on_give_up(job["contract_id"], error)
+
+    def _heartbeat_loop(self, job_id, done: threading.Event, cancelled: threading.Event) -> None:
+        interval = max(self.lease_seconds / 3, 1)
+        while not done.wait(interval):
+            if not heartbeat(job_id, self.worker_id, self.lease_seconds):
+                # Cancelled, or re-leased to another worker: stop parsing either way.
+                logger.warning("Worker %s lost the lease on job %s", self.worker_id, job_id)
+                cancelled.set()
+                return
@@ -0,0 +1,298 @@
+import json
+import os
+import random
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from contracts import events, jobs, synthetic
+from contracts.mongo import MONGO_ALIAS
+from contracts.views import _background_parse
+
+READ_ENDPOINTS = ("status", "list", "detail", "download")
+COMPARED_METRICS = ("throughput", "p50", "p95", "p99")
+
+
+class InProcessTransport:
+    """Call the views through Django's test client: no server, no network."""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def _client(self) -> Client:
+        if not hasattr(self._local, "client"):
+            # "testserver" is only allowed under the test runner.
+            self._local.client = Client(HTTP_HOST=settings.ALLOWED_HOSTS[0])
+        return self._local.client
+
+    def get(self, path: str, params=None):
+        response = self._client().get(path, params or {})
+        body = b"".join(response.streaming_content) if response.streaming else response.content
+        response.close()
+        return response.status_code, body
+
+    def upload(self, path: str, name: str, data: bytes):
+        response = self._client().post(path, {"file": SimpleUploadedFile(name, data, "application/pdf")})
+        return response.status_code, response.content
+
+
+class HttpTransport:
+    """Call a running server over HTTP, one keep-alive session per thread."""
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url.rstrip("/")
+        self._local = threading.local()
+
+    def _session(self) -> requests.Session:
+        if not hasattr(self._local, "session"):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def get(self, path: str, params=None):
+        response = self._session().get(self.base_url + path, params=params)
+        return response.status_code, response.content
+
+    def upload(self, path: str, name: str, data: bytes):
+        response = self._session().post(self.base_url + path, files={"file": (name, data, "application/pdf")})
+        return response.status_code, response.content
+
+
+def summarize(latencies, errors: int, elapsed: float) -> dict:
+    ms = np.array(latencies) * 1000 if latencies else np.zeros(1)
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "throughput": round(len(latencies) / elapsed, 1) if elapsed else None,
+        "p50": round(float(p50), 2),
+        "p95": round(float(p95), 2),
+        "p99": round(float(p99), 2),
+        "max": round(float(ms.max()), 2),
+    }
+
+
+def run_phase(call, count: int, concurrency: int) -> dict:
+    """Run ``call(i)`` for ``i < count`` on ``concurrency`` threads and time each call.
+
+    ``call`` returns an HTTP status code; anything but 2xx/304 is an error.
+    """
+    def timed(i):
+        started = time.perf_counter()
+        status = call(i)
+        return time.perf_counter() - started, status
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(timed, range(count)))
+    elapsed = time.perf_counter() - started
+    errors = sum(1 for _, status in results if not (200 <= status < 300 or status == 304))
+    return summarize([latency for latency, _ in results], errors, elapsed)
+
+
+def git_commit():
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=settings.BASE_DIR, capture_output=True, text=True
+        )
+    except OSError:
+        return None
+    return result.stdout.strip() or None
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark uploads, parsing and the read endpoints with synthetic PDFs and report "
+        "latency percentiles and throughput. Without --base-url it runs in-process against a "
+        "throwaway copy of the Mongo database (the test database) and a temporary media root."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--contracts", type=int, default=50, help="Contracts to upload (default: 50).")
+        parser.add_argument(
+            "--pages",
+            default="1,10,50",
+            help="Comma-separated page counts, cycled over the uploaded contracts (default: 1,10,50).",
+        )
+        parser.add_argument("--concurrency", type=int, default=8, help="Concurrent clients (default: 8).")
+        parser.add_argument(
+            "--requests", type=int, default=500, help="Requests per read endpoint (default: 500)."
+        )
+        parser.add_argument("--seed", type=int, default=0, help="Seed for documents and request mix.")
+        parser.add_argument(
+            "--base-url",
+            help="Benchmark a running server (e.g. http://localhost:8000) instead of in-process; "
+            "its parse workers must be running.",
+        )
+        parser.add_argument(
+            "--parse-timeout", type=float, default=600, help="Seconds to wait for parsing (default: 600)."
+        )
+        parser.add_argument("--output", help="Write the JSON report to this file.")
+        parser.add_argument("--compare", help="A previous JSON report to compare against.")
+        parser.add_argument("--keep-db", action="store_true", help="Keep the in-process benchmark database.")
+
+    def handle(self, *args, **options):
+        try:
+            page_counts = [int(p) for p in options["pages"].split(",") if p]
+        except ValueError:
+            raise CommandError("--pages must be a comma-separated list of integers")
+        if not page_counts or min(page_counts) < 1 or options["contracts"] < 1:
+            raise CommandError("--contracts and every --pages value must be at least 1")
+        options["concurrency"] = max(options["concurrency"], 1)
+
+        documents = [
+            (f"bench-{i:05d}.pdf", page_counts[i % len(page_counts)])
+            for i in range(options["contracts"])
+        ]
+        self.stdout.write(f"Generating {len(documents)} synthetic contracts")
+        documents = [
+            (name, pages, synthetic.contract_pdf(pages, seed=options["seed"] * 1_000_003 + i))
+            for i, (name, pages) in enumerate(documents)
+        ]
+
+        if options["base_url"]:
+            report = self._run(HttpTransport(options["base_url"]), documents, options)
+        else:
+            report = self._run_in_process(documents, options)
+
+        report.update(
+            commit=git_commit(),
+            created_at=timezone.now().isoformat(),
+            config={
+                "mode": "http" if options["base_url"] else "in-process",
+                "contracts": options["contracts"],
+                "pages": page_counts,
+                "concurrency": options["concurrency"],
+                "requests": options["requests"],
+                "seed": options["seed"],
+                "parse_processes": settings.PARSE_PROCESSES,
+            },
+        )
+        self._print(report)
+        if options["compare"]:
+            with open(options["compare"]) as f:
+                self._print_comparison(json.load(f), report)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"Report written to {options['output']}")
+
+    def _run_in_process(self, documents, options) -> dict:
+        connection = connections[MONGO_ALIAS]
+        old_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options["keep_db"])
+        media_root = tempfile.mkdtemp(prefix="contracts-benchmark-")
+        try:
+            with override_settings(
+                MEDIA_ROOT=media_root, CONTRACT_ARTIFACT_ROOT=os.path.join(media_root, "artifacts")
+            ):
+                return self._run(InProcessTransport(), documents, options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options["keep_db"])
+            shutil.rmtree(media_root, ignore_errors=True)
+
+    def _run(self, transport, documents, options) -> dict:
+        concurrency = options["concurrency"]
+        ids = [None] * len(documents)
+        upload_url = reverse("contract_upload")
+
+        def upload(i):
+            name, _, data = documents[i]
+            status, body = transport.upload(upload_url, name, data)
+            if status < 300:
+                ids[i] = json.loads(body)["contract_id"]
+            return status
+
+        self.stdout.write(f"Uploading at concurrency {concurrency}")
+        endpoints = {"upload": run_phase(upload, len(documents), concurrency)}
+        uploaded = [(pk, pages) for pk, (_, pages, _) in zip(ids, documents) if pk is not None]
+        if not uploaded:
+            raise CommandError("No upload succeeded")
+
+        self.stdout.write("Parsing")
+        parse = self._parse(transport, uploaded, options)
+
+        rng = random.Random(options["seed"])
+        targets = [rng.choice(uploaded)[0] for _ in range(options["requests"])]
+        calls = {
+            "status": lambda i: transport.get(reverse("contract_status", args=[targets[i]]))[0],
+            "list": lambda i: transport.get(reverse("contract_list"), {"after": "", "page_size": 20})[0],
+            "detail": lambda i: transport.get(reverse("contract_detail", args=[targets[i]]))[0],
+            "download": lambda i: transport.get(reverse("contract_download", args=[targets[i]]))[0],
+        }
+        for name in READ_ENDPOINTS:
+            self.stdout.write(f"Benchmarking {name}")
+            endpoints[name] = run_phase(calls[name], options["requests"], concurrency)
+        return {"endpoints": endpoints, "parse": parse}
+
+    def _parse(self, transport, uploaded, options) -> dict:
+        started = time.perf_counter()
+        if isinstance(transport, InProcessTransport):
+            # The benchmark database holds only this run's jobs.
+            jobs.Worker(_background_parse, poll_interval=0.1).run(burst=True)
+        else:
+            pending = {str(pk) for pk, _ in uploaded}
+            url = reverse("contract_status_batch")
+            while pending:
+                if time.perf_counter() - started > options["parse_timeout"]:
+                    raise CommandError(f"{len(pending)} contracts still parsing after {options['parse_timeout']}s")
+                batch = sorted(pending)[:1000]
+                _, body = transport.get(url, {"ids": ",".join(batch)})
+                for pk, row in json.loads(body)["results"].items():
+                    if row["status"] in events.TERMINAL_STATUSES:
+                        pending.discard(pk)
+                time.sleep(0.5)
+        elapsed = time.perf_counter() - started
+        pages = sum(count for _, count in uploaded)
+        cores = min(settings.PARSE_PROCESSES, os.cpu_count() or 1)
+        return {
+            "contracts": len(uploaded),
+            "pages": pages,
+            "seconds": round(elapsed, 3),
+            "contracts_per_second": round(len(uploaded) / elapsed, 2),
+            "pages_per_second": round(pages / elapsed, 1),
+            "pages_per_second_per_core": round(pages / elapsed / cores, 1),
+        }
+
+    def _print(self, report: dict) -> None:
+        parse = report["parse"]
+        self.stdout.write(
+            f"\nParse: {parse['contracts']} contracts / {parse['pages']} pages in {parse['seconds']}s "
+            f"({parse['pages_per_second']} pages/s, {parse['pages_per_second_per_core']} pages/s/core)"
+        )
+        self.stdout.write(f"\n{'endpoint':<10}{'requests':>9}{'errors':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+        for name, row in report["endpoints"].items():
+            self.stdout.write(
+                f"{name:<10}{row['requests']:>9}{row['errors']:>8}{row['throughput']:>9}"
+                f"{row['p50']:>9}{row['p95']:>9}{row['p99']:>9}"
+            )
+
+    def _print_comparison(self, before: dict, after: dict) -> None:
+        self.stdout.write(f"\nChange since {before.get('commit') or 'baseline'} (negative latency is faster)")
+        for name, row in after["endpoints"].items():
+            old = before.get("endpoints", {}).get(name)
+            if not old:
+                continue
+            changes = []
+            for metric in COMPARED_METRICS:
+                if old.get(metric):
+                    changes.append(f"{metric} {100 * (row[metric] - old[metric]) / old[metric]:+.1f}%")
+            self.stdout.write(f"{name:<10}" + "  ".join(changes))
+        old_parse = before.get("parse", {}).get("pages_per_second")
+        if old_parse:
+            change = 100 * (after["parse"]["pages_per_second"] - old_parse) / old_parse
+            self.stdout.write(f"{'parse':<10}pages/s {change:+.1f}%")
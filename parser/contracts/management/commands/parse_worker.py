@@ -0,0 +1,94 @@
+import multiprocessing
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from contracts import events, jobs, metrics, mongo
+from contracts.models import Contract
+from contracts.views import CANCELLED_ERROR, _background_parse, _fail
+
+
+def _give_up(contract_id: int, error: str) -> None:
+    # A contract that did complete (say, before a lost lease) stays completed.
+    _fail(
+        contract_id,
+        error,
+        from_statuses=(Contract.STATUS_PENDING, Contract.STATUS_PROCESSING, Contract.STATUS_FAILED),
+    )
+
+
+def _cancel_listener(worker: jobs.Worker):
+    """Stop ``worker``'s running job as soon as its contract is cancelled."""
+    def listener(contract_id: int, payload) -> None:
+        if payload is not None and payload["status"] == Contract.STATUS_FAILED and payload["error"] == CANCELLED_ERROR:
+            worker.cancel(contract_id)
+    return listener
+
+
+def _run_worker(burst: bool, metrics_port: int = 0) -> None:
+    # Forked children must not reuse the parent's sockets.
+    connections.close_all()
+    mongo.reset_client()
+    if metrics_port:
+        metrics.serve(metrics_port)
+    worker = jobs.Worker(_background_parse, on_give_up=_give_up)
+    # The lease heartbeat notices a cancellation too, but only every third of a lease.
+    bus = events.get_bus()
+    bus.add_listener(_cancel_listener(worker))
+    bus.start()
+    signal.signal(signal.SIGTERM, lambda signum, frame: worker.stop())
+    signal.signal(signal.SIGINT, lambda signum, frame: worker.stop())
+    worker.run(burst=burst)
+
+
+class Command(BaseCommand):
+    help = "Run contract parse workers that consume the Mongo-backed job queue."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=1,
+            help="Number of worker processes to run on this host (default: 1).",
+        )
+        parser.add_argument(
+            "--burst",
+            action="store_true",
+            help="Exit once the queue is empty instead of polling for new jobs.",
+        )
+        parser.add_argument(
+            "--metrics-port",
+            type=int,
+            default=settings.PARSE_WORKER_METRICS_PORT,
+            help="Serve Prometheus metrics on this port (worker N of --processes uses port + N; "
+            "default: PARSE_WORKER_METRICS_PORT, 0 disables).",
+        )
+
+    def handle(self, *args, **options):
+        processes = max(options["processes"], 1)
+        port = options["metrics_port"]
+        if processes == 1:
+            _run_worker(options["burst"], port)
+            return
+
+        children = [
+            multiprocessing.Process(
+                target=_run_worker, args=(options["burst"], port + i if port else 0), daemon=False
+            )
+            for i in range(processes)
+        ]
+        for child in children:
+            child.start()
+        self.stdout.write(f"Started {processes} parse workers")
+
+        def _forward(signum, frame):
+            for child in children:
+                if child.is_alive():
+                    child.terminate()
+
+        signal.signal(signal.SIGTERM, _forward)
+        signal.signal(signal.SIGINT, _forward)
+        for child in children:
+            child.join()
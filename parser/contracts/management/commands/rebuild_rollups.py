@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from contracts import analytics
+
+
+class Command(BaseCommand):
+    help = "Recompute the daily analytics rollups from the stored contracts."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Cursor batch size when streaming contracts (default: 5000).",
+        )
+
+    def handle(self, *args, **options):
+        days = analytics.rebuild_rollups(batch_size=max(options["batch_size"], 1))
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt analytics rollups for {days} days"))
@@ -0,0 +1,104 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from pymongo import ASCENDING, UpdateMany, UpdateOne
+
+from contracts import events, repository, scoring, search
+from contracts.extraction import SECTION_FIELDS, reextract_artifact
+from contracts.models import Contract
+from contracts.mongo import get_collection
+
+
+class Command(BaseCommand):
+    help = (
+        "Rerun field extraction and scoring over the stored page artifacts of completed "
+        "contracts, without decoding any PDFs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=settings.PARSE_PROCESSES,
+            help="Extraction processes (default: PARSE_PROCESSES).",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=500,
+            help="Contracts extracted and written per batch (default: 500).",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Extract and score without writing anything.",
+        )
+
+    def handle(self, *args, **options):
+        collection = get_collection(Contract)
+        # Duplicates share their owner's artifact and are updated with it.
+        cursor = collection.find(
+            {"status": Contract.STATUS_COMPLETED, "duplicate_of_id": None},
+            {"_id": 0, "id": 1},
+            sort=[("id", ASCENDING)],
+        )
+        cursor.batch_size(options["chunk_size"])
+
+        started = time.monotonic()
+        done = missing = 0
+        processes = max(options["processes"], 1)
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            chunk = []
+            for doc in cursor:
+                chunk.append(doc["id"])
+                if len(chunk) >= options["chunk_size"]:
+                    missing += self._reextract(collection, pool, chunk, processes, options["dry_run"])
+                    done += len(chunk)
+                    chunk = []
+                    self.stdout.write(f"Re-extracted {done} contracts")
+            if chunk:
+                missing += self._reextract(collection, pool, chunk, processes, options["dry_run"])
+                done += len(chunk)
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Re-extracted {done - missing} contracts in {elapsed:.1f}s; "
+            f"{missing} had no page artifact and need a full re-parse"
+        ))
+
+    def _reextract(self, collection, pool, ids, processes: int, dry_run: bool) -> int:
+        """Re-extract one chunk; returns how many contracts had no artifact."""
+        results = [
+            result
+            for result in pool.map(reextract_artifact, ids, chunksize=max(len(ids) // (processes * 4), 1))
+            if result[1] is not None
+        ]
+        if not results or dry_run:
+            return len(ids) - len(results)
+
+        scores, gaps = scoring.score_batch([sections for _, sections, _ in results])
+        now = timezone.now()
+        updates = []
+        for (pk, sections, text), score, doc_gaps in zip(results, scores, gaps):
+            fields = {section: repository.encode_field(section, sections[section]) for section in SECTION_FIELDS}
+            fields.update(
+                score=int(score),
+                gaps=repository.encode_field("gaps", doc_gaps),
+                rubric_version=scoring.RUBRIC_VERSION,
+                updated_at=now,
+            )
+            updates.append(UpdateOne({"id": pk, "status": Contract.STATUS_COMPLETED}, {"$set": fields}))
+            updates.append(
+                UpdateMany({"duplicate_of_id": pk, "status": Contract.STATUS_COMPLETED}, {"$set": fields})
+            )
+        collection.bulk_write(updates, ordered=False)
+        search.store_texts({pk: text for pk, _, text in results})
+        search.sync([pk for pk, _, _ in results])
+
+        owners = [pk for pk, _, _ in results]
+        duplicates = [doc["id"] for doc in collection.find({"duplicate_of_id": {"$in": owners}}, {"_id": 0, "id": 1})]
+        events.publish_changed(owners + duplicates)
+        return len(ids) - len(results)
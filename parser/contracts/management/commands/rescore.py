@@ -0,0 +1,57 @@
+import time
+
+from django.core.management.base import BaseCommand
+from pymongo import ASCENDING
+
+from contracts import rescoring
+from contracts.models import Contract
+from contracts.mongo import get_collection
+
+
+class Command(BaseCommand):
+    help = "Rescore stored contracts against the current rubric, in vectorized batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=5000,
+            help="Contracts scored and written per batch (default: 5000).",
+        )
+        parser.add_argument(
+            "--status",
+            default=Contract.STATUS_COMPLETED,
+            help="Only rescore contracts in this status (default: completed).",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report how many contracts would change without writing.",
+        )
+
+    def handle(self, *args, **options):
+        collection = get_collection(Contract)
+        # Server-side cursor: memory stays at one chunk however large the corpus.
+        cursor = collection.find({"status": options["status"]}, rescoring.SECTION_PROJECTION, sort=[("id", ASCENDING)])
+        cursor.batch_size(options["chunk_size"])
+
+        started = time.monotonic()
+        seen = changed = 0
+        chunk = []
+        for doc in cursor:
+            chunk.append(doc)
+            if len(chunk) >= options["chunk_size"]:
+                changed += self._rescore(collection, chunk, options["dry_run"])
+                seen += len(chunk)
+                chunk = []
+                self.stdout.write(f"Rescored {seen} contracts ({changed} changed)")
+        if chunk:
+            changed += self._rescore(collection, chunk, options["dry_run"])
+            seen += len(chunk)
+
+        elapsed = time.monotonic() - started
+        verb = "would change" if options["dry_run"] else "changed"
+        self.stdout.write(self.style.SUCCESS(f"Rescored {seen} contracts in {elapsed:.1f}s; {changed} {verb}"))
+
+    def _rescore(self, collection, docs, dry_run: bool) -> int:
+        return rescoring.rescore_documents(collection, docs, dry_run=dry_run)[1]
@@ -0,0 +1,61 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from pymongo import ASCENDING
+
+from contracts import rescoring, scoring
+from contracts.models import Contract
+from contracts.mongo import get_collection
+
+
+class Command(BaseCommand):
+    help = (
+        "Rescore completed contracts whose rubric version is outdated, at a bounded rate, "
+        "until the corpus has converged."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rate",
+            type=float,
+            default=settings.RUBRIC_SWEEP_RATE,
+            help="Maximum contracts rescored per second (default: RUBRIC_SWEEP_RATE).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Contracts rescored per batch (default: 500).",
+        )
+        parser.add_argument(
+            "--follow",
+            action="store_true",
+            help="Keep running after convergence, checking again every minute.",
+        )
+
+    def handle(self, *args, **options):
+        collection = get_collection(Contract)
+        batch_size = max(options["batch_size"], 1)
+        interval = batch_size / options["rate"] if options["rate"] > 0 else 0
+        total = 0
+        while True:
+            started = time.monotonic()
+            docs = list(
+                collection.find(rescoring.stale_query(), rescoring.SECTION_PROJECTION)
+                .sort("id", ASCENDING)
+                .limit(batch_size)
+            )
+            if not docs:
+                self.stdout.write(self.style.SUCCESS(
+                    f"All completed contracts are on rubric version {scoring.RUBRIC_VERSION} "
+                    f"({total} rescored)"
+                ))
+                if not options["follow"]:
+                    return
+                time.sleep(60)
+                continue
+            rescoring.rescore_documents(collection, docs)
+            total += len(docs)
+            self.stdout.write(f"Rescored {total} contracts")
+            time.sleep(max(interval - (time.monotonic() - started), 0))
@@ -0,0 +1,290 @@
+"""In-process metrics in the Prometheus text format, without dependencies.
+
+:class:`MetricsMiddleware` records per-view latency and, per request, how many
+ORM queries (djongo: SQL translation plus MongoDB) and direct pymongo commands
+ran and how long they took. Parse workers record per-stage timings. Web
+processes expose their registry at ``/metrics``; parse workers serve theirs
+with :func:`serve` (``parse_worker --metrics-port``). Each process has its own
+registry, so scrape every process, as with any multi-process Prometheus setup.
+Under ASGI the middleware runs natively async; ORM queries made there run in
+``sync_to_async`` threads and are not counted per request.
+"""
+import asyncio
+import bisect
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.db import connections
+from pymongo import monitoring
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+STAGE_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900)
+
+REGISTRY = []
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values, extra=()) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{value}"' for name, value in extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+        REGISTRY.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        with self._lock:
+            values = {key: list(value) if isinstance(value, list) else value for key, value in self._values.items()}
+        for key in sorted(values):
+            lines.extend(self._render_sample(key, values[key]))
+        return lines
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _render_sample(self, key, value) -> list:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value}"]
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            # Per-bucket counts (the last one is +Inf), then the sum.
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[index] += 1
+            counts[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _render_sample(self, key, counts) -> list:
+        lines = []
+        cumulative = 0
+        bounds = [repr(float(bound)) for bound in self.buckets] + ["+Inf"]
+        for bound, count in zip(bounds, counts):
+            cumulative += count
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, [('le', bound)])} {cumulative}")
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {counts[-1]}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+def render() -> str:
+    return "\n".join(line for metric in REGISTRY for line in metric.render()) + "\n"
+
+
+REQUEST_LATENCY = Histogram(
+    "contracts_http_request_duration_seconds",
+    "Time spent in a view, by URL name, method and status class.",
+    ("view", "method", "status"),
+)
+REQUEST_QUERIES = Histogram(
+    "contracts_http_request_db_queries",
+    "ORM database queries run per request, by URL name.",
+    ("view",),
+    buckets=COUNT_BUCKETS,
+)
+REQUEST_QUERY_SECONDS = Histogram(
+    "contracts_http_request_db_seconds",
+    "Time per request spent in ORM queries (djongo translation and MongoDB), by URL name.",
+    ("view",),
+)
+REQUEST_MONGO_COMMANDS = Histogram(
+    "contracts_http_request_mongo_commands",
+    "Direct pymongo commands run per request, by URL name.",
+    ("view",),
+    buckets=COUNT_BUCKETS,
+)
+REQUEST_MONGO_SECONDS = Histogram(
+    "contracts_http_request_mongo_seconds",
+    "Time per request spent in direct pymongo commands, by URL name.",
+    ("view",),
+)
+MONGO_COMMAND_SECONDS = Histogram(
+    "contracts_mongo_command_duration_seconds",
+    "Duration of direct pymongo commands, by command.",
+    ("command",),
+)
+MONGO_COMMAND_FAILURES = Counter(
+    "contracts_mongo_command_failures_total",
+    "Direct pymongo commands that failed, by command.",
+    ("command",),
+)
+PARSE_STAGE_SECONDS = Histogram(
+    "contracts_parse_stage_duration_seconds",
+    "Time spent in each parse stage (queue_wait, extraction, scoring, save).",
+    ("stage",),
+    buckets=STAGE_BUCKETS,
+)
+PARSE_RESULTS = Counter(
+    "contracts_parse_results_total",
+    "Finished parses, by final status.",
+    ("status",),
+)
+
+
+class RequestStats:
+    __slots__ = ("queries", "query_seconds", "commands", "command_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.commands = 0
+        self.command_seconds = 0.0
+
+
+# A context variable rather than a thread-local: async views run many requests
+# on one thread, and pymongo's async client calls listeners in the task that
+# ran the command.
+_stats = ContextVar("contracts_request_stats", default=None)
+
+
+def _current():
+    return _stats.get()
+
+
+def _record_query(execute, sql, params, many, context):
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats = _current()
+        if stats is not None:
+            stats.queries += 1
+            stats.query_seconds += time.perf_counter() - started
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Time direct pymongo commands; registered on the client in contracts.mongo."""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self._record(event)
+
+    def failed(self, event):
+        MONGO_COMMAND_FAILURES.inc(command=event.command_name)
+        self._record(event)
+
+    def _record(self, event):
+        seconds = event.duration_micros / 1_000_000
+        MONGO_COMMAND_SECONDS.observe(seconds, command=event.command_name)
+        # pymongo calls listeners in the thread (or task) that ran the command.
+        stats = _current()
+        if stats is not None:
+            stats.commands += 1
+            stats.command_seconds += seconds
+
+
+class MetricsMiddleware:
+    """Record latency and database work for every request."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Marks the instance as a coroutine function for Django's handler.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        stats = RequestStats()
+        token = _stats.set(stats)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(_record_query))
+                response = self.get_response(request)
+        finally:
+            _stats.reset(token)
+        self._observe(request, response, stats, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = _stats.set(stats)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _stats.reset(token)
+        self._observe(request, response, stats, time.perf_counter() - started)
+        return response
+
+    def _observe(self, request, response, stats, elapsed):
+        match = getattr(request, "resolver_match", None)
+        view = (match.url_name or match.view_name) if match else "unresolved"
+        REQUEST_LATENCY.observe(elapsed, view=view, method=request.method, status=f"{response.status_code // 100}xx")
+        REQUEST_QUERIES.observe(stats.queries, view=view)
+        REQUEST_QUERY_SECONDS.observe(stats.query_seconds, view=view)
+        REQUEST_MONGO_COMMANDS.observe(stats.commands, view=view)
+        REQUEST_MONGO_SECONDS.observe(stats.command_seconds, view=view)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """Serve this process's metrics over HTTP from a daemon thread."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
@@ -0,0 +1,44 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+SHA256_INDEX = "contracts_contract_sha256_uniq"
+
+
+def create_sha256_index(apps, schema_editor):
+    # djongo does not create partial unique indexes, so build it with pymongo.
+    # Only blob owners carry a digest, duplicates keep sha256 == "".
+    Contract = apps.get_model("contracts", "Contract")
+    collection = schema_editor.connection.connection[Contract._meta.db_table]
+    collection.create_index(
+        [("sha256", 1)],
+        name=SHA256_INDEX,
+        unique=True,
+        partialFilterExpression={"sha256": {"$gt": ""}},
+    )
+
+
+def drop_sha256_index(apps, schema_editor):
+    Contract = apps.get_model("contracts", "Contract")
+    schema_editor.connection.connection[Contract._meta.db_table].drop_index(SHA256_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contracts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contract',
+            name='sha256',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='contract',
+            name='duplicate_of',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='duplicates', to='contracts.contract'),
+        ),
+        migrations.RunPython(create_sha256_index, drop_sha256_index),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contracts', '0003_contract_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contract',
+            name='upload_batch',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=32),
+        ),
+    ]
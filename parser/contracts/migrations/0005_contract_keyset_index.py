@@ -0,0 +1,28 @@
+from django.db import migrations
+
+
+KEYSET_INDEX = "contracts_contract_uploaded_at_id"
+
+
+def create_keyset_index(apps, schema_editor):
+    # Backs keyset pagination on (uploaded_at, id); djongo only creates
+    # single-field indexes.
+    Contract = apps.get_model("contracts", "Contract")
+    collection = schema_editor.connection.connection[Contract._meta.db_table]
+    collection.create_index([("uploaded_at", -1), ("id", -1)], name=KEYSET_INDEX)
+
+
+def drop_keyset_index(apps, schema_editor):
+    Contract = apps.get_model("contracts", "Contract")
+    schema_editor.connection.connection[Contract._meta.db_table].drop_index(KEYSET_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contracts', '0004_contract_upload_batch'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_keyset_index, drop_keyset_index),
+    ]
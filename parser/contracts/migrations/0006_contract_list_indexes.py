@@ -0,0 +1,35 @@
+from django.db import migrations
+
+
+# name -> keys; djongo only creates single-field indexes, so these are built
+# with pymongo. contracts.pagination.INDEXES maps list queries onto them.
+LIST_INDEXES = {
+    "contracts_contract_status_uploaded_at_id": [("status", 1), ("uploaded_at", -1), ("id", -1)],
+    "contracts_contract_score_id": [("score", -1), ("id", -1)],
+    "contracts_contract_status_score_id": [("status", 1), ("score", -1), ("id", -1)],
+}
+
+
+def create_list_indexes(apps, schema_editor):
+    Contract = apps.get_model("contracts", "Contract")
+    collection = schema_editor.connection.connection[Contract._meta.db_table]
+    for name, keys in LIST_INDEXES.items():
+        collection.create_index(keys, name=name)
+
+
+def drop_list_indexes(apps, schema_editor):
+    Contract = apps.get_model("contracts", "Contract")
+    collection = schema_editor.connection.connection[Contract._meta.db_table]
+    for name in LIST_INDEXES:
+        collection.drop_index(name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contracts', '0005_contract_keyset_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_list_indexes, drop_list_indexes),
+    ]
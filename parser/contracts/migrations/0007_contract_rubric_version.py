@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contracts', '0006_contract_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contract',
+            name='rubric_version',
+            field=models.PositiveIntegerField(db_index=True, default=0),
+        ),
+    ]
@@ -0,0 +1,38 @@
+from django.db import migrations, models
+
+
+# One text index per collection is allowed; contracts.search queries it.
+SEARCH_INDEX = "contracts_contract_search_text"
+
+
+def create_search_index(apps, schema_editor):
+    Contract = apps.get_model("contracts", "Contract")
+    collection = schema_editor.connection.connection[Contract._meta.db_table]
+    collection.create_index(
+        [("original_filename", "text"), ("search_text", "text")],
+        name=SEARCH_INDEX,
+        weights={"original_filename": 5, "search_text": 1},
+        default_language="english",
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    Contract = apps.get_model("contracts", "Contract")
+    collection = schema_editor.connection.connection[Contract._meta.db_table]
+    collection.drop_index(SEARCH_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contracts', '0007_contract_rubric_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contract',
+            name='search_text',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,123 @@
+import json
+
+from django.db import migrations
+from pymongo import UpdateOne
+
+import contracts.models
+
+SECTIONS = ("parties", "account_info", "financial_details", "payment_structure", "revenue_classification", "sla")
+EMPTY_VALUES = (None, "", [], {})
+BATCH_SIZE = 1000
+
+# contracts.scoring.GAP_BITS and its label encoding as of this migration,
+# frozen so replaying it gives the same masks whatever the rubric becomes.
+GAP_BITS = (
+    ("financial_details", "line_items"),
+    ("financial_details", "total_value"),
+    ("financial_details", "currency"),
+    ("financial_details", "taxes"),
+    ("parties", "customer"),
+    ("parties", "vendor"),
+    ("parties", "signatories"),
+    ("payment_structure", "terms"),
+    ("payment_structure", "schedule"),
+    ("payment_structure", "method"),
+    ("payment_structure", "banking"),
+    ("sla", "metrics"),
+    ("sla", "penalties"),
+    ("sla", "support"),
+    ("account_info", "billing_contact"),
+    ("account_info", "technical_contact"),
+)
+GAP_LABELS = tuple(f"Missing {section}.{field}" for section, field in GAP_BITS)
+
+
+def _gap_mask(gaps):
+    mask = 0
+    for label in gaps:
+        try:
+            mask |= 1 << GAP_LABELS.index(label)
+        except ValueError:
+            raise ValueError(f"Unknown gap {label!r}")
+    return mask
+
+
+def _gap_labels(mask):
+    # The rubric scored every field in bit order, so this is also gap-reporting order.
+    return [label for bit, label in enumerate(GAP_LABELS) if mask & (1 << bit)]
+
+
+def _load(value):
+    return json.loads(value) if isinstance(value, str) else value
+
+
+def _convert(apps, schema_editor, convert):
+    """Rewrite every contract with ``convert(doc) -> {field: stored value}``, a batch at a time."""
+    Contract = apps.get_model("contracts", "Contract")
+    collection = schema_editor.connection.connection[Contract._meta.db_table]
+    projection = dict({"_id": 1, "gaps": 1}, **{section: 1 for section in SECTIONS})
+    updates = []
+    for doc in collection.find({}, projection, batch_size=BATCH_SIZE):
+        fields = convert(doc)
+        if fields:
+            updates.append(UpdateOne({"_id": doc["_id"]}, {"$set": fields}))
+        if len(updates) >= BATCH_SIZE:
+            collection.bulk_write(updates, ordered=False)
+            updates = []
+    if updates:
+        collection.bulk_write(updates, ordered=False)
+
+
+def _compact(doc):
+    fields = {}
+    gaps = _load(doc.get("gaps"))
+    if isinstance(gaps, list):
+        fields["gaps"] = json.dumps(_gap_mask(gaps))
+    for section in SECTIONS:
+        values = _load(doc.get(section))
+        if isinstance(values, dict) and any(value in EMPTY_VALUES for value in values.values()):
+            fields[section] = json.dumps({k: v for k, v in values.items() if v not in EMPTY_VALUES})
+    return fields
+
+
+def _expand(doc):
+    # Compact sections stay readable by the previous code; only gaps need labels again.
+    gaps = _load(doc.get("gaps"))
+    return {"gaps": json.dumps(_gap_labels(gaps))} if isinstance(gaps, int) else {}
+
+
+def compact_contracts(apps, schema_editor):
+    _convert(apps, schema_editor, _compact)
+
+
+def expand_contracts(apps, schema_editor):
+    _convert(apps, schema_editor, _expand)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contracts', '0008_contract_search_text'),
+    ]
+
+    operations = [
+        # Same column type; only the stored encoding changes, so there is no
+        # schema change to run.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='contract',
+                    name=section,
+                    field=contracts.models.SectionField(blank=True, default=dict),
+                )
+                for section in SECTIONS
+            ] + [
+                migrations.AlterField(
+                    model_name='contract',
+                    name='gaps',
+                    field=contracts.models.GapsField(blank=True, default=list),
+                ),
+            ],
+        ),
+        migrations.RunPython(compact_contracts, expand_contracts),
+    ]
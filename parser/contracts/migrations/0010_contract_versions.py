@@ -0,0 +1,29 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+import contracts.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contracts', '0009_contract_compact_fields'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contract',
+            name='parent',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='versions', to='contracts.contract'),
+        ),
+        migrations.AddField(
+            model_name='contract',
+            name='page_fingerprints',
+            field=contracts.models.StoredJSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='contract',
+            name='page_diff',
+            field=contracts.models.StoredJSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,91 @@
+from django.db import migrations
+from pymongo import UpdateMany, UpdateOne
+
+# Mirrors contracts.search; the migration must not depend on the module changing.
+SEARCH_COLLECTION = "contract_search"
+SEARCH_INDEX = "contract_search_text"
+KEY_FIELDS = ("id", "status", "score", "uploaded_at")
+# The text index migration 0008 put on the contracts collection.
+CONTRACT_SEARCH_INDEX = "contracts_contract_search_text"
+BATCH_SIZE = 1000
+
+
+def _collections(apps, schema_editor):
+    Contract = apps.get_model("contracts", "Contract")
+    db = schema_editor.connection.connection
+    return db[Contract._meta.db_table], db[SEARCH_COLLECTION]
+
+
+def _flush(collection, updates):
+    if updates:
+        collection.bulk_write(updates, ordered=False)
+    return []
+
+
+def move_text_out(apps, schema_editor):
+    contracts, search = _collections(apps, schema_editor)
+    updates = []
+    fields = dict.fromkeys(KEY_FIELDS + ("duplicate_of_id", "original_filename", "search_text"), 1)
+    for doc in contracts.find({}, dict(fields, _id=0), batch_size=BATCH_SIZE):
+        owner = doc.get("duplicate_of_id") or doc["id"]
+        update = {
+            "$addToSet": {"filenames": doc.get("original_filename", "")},
+            "$push": {"contracts": {field: doc.get(field) for field in KEY_FIELDS}},
+        }
+        if owner == doc["id"]:
+            update["$set"] = {"text": doc.get("search_text") or ""}
+        updates.append(UpdateOne({"_id": owner}, update, upsert=True))
+        if len(updates) >= BATCH_SIZE:
+            updates = _flush(search, updates)
+    _flush(search, updates)
+
+
+def move_text_back(apps, schema_editor):
+    contracts, search = _collections(apps, schema_editor)
+    updates = []
+    for doc in search.find({"text": {"$exists": True}}, {"text": 1}, batch_size=BATCH_SIZE):
+        fields = {"$set": {"search_text": doc["text"]}}
+        updates.append(UpdateOne({"id": doc["_id"]}, fields))
+        updates.append(UpdateMany({"duplicate_of_id": doc["_id"]}, fields))
+        if len(updates) >= BATCH_SIZE:
+            updates = _flush(contracts, updates)
+    _flush(contracts, updates)
+    search.drop()
+
+
+def move_index_out(apps, schema_editor):
+    contracts, search = _collections(apps, schema_editor)
+    search.create_index(
+        [("filenames", "text"), ("text", "text")],
+        name=SEARCH_INDEX,
+        weights={"filenames": 5, "text": 1},
+        default_language="english",
+    )
+    contracts.drop_index(CONTRACT_SEARCH_INDEX)
+
+
+def move_index_back(apps, schema_editor):
+    contracts, search = _collections(apps, schema_editor)
+    contracts.create_index(
+        [("original_filename", "text"), ("search_text", "text")],
+        name=CONTRACT_SEARCH_INDEX,
+        weights={"original_filename": 5, "search_text": 1},
+        default_language="english",
+    )
+    search.drop_index(SEARCH_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contracts', '0010_contract_versions'),
+    ]
+
+    operations = [
+        migrations.RunPython(move_text_out, move_text_back),
+        migrations.RunPython(move_index_out, move_index_back),
+        migrations.RemoveField(
+            model_name='contract',
+            name='search_text',
+        ),
+    ]
@@ -1,5 +1,55 @@
 from django.db import models
 
+from . import scoring
+
+EMPTY_VALUES = (None, "", [], {})
+
+
+class StoredJSONField(models.JSONField):
+    """A JSONField stored in a more compact form than its Python value.
+
+    :meth:`to_stored` and :meth:`from_stored` convert between the two; the ORM
+    applies them itself, code using pymongo goes through
+    ``contracts.repository.encode_field``/``decode_field``.
+    """
+
+    def to_stored(self, value):
+        return value
+
+    def from_stored(self, value):
+        return value
+
+    def get_prep_value(self, value):
+        return super().get_prep_value(self.to_stored(value))
+
+    def from_db_value(self, value, expression, connection):
+        return self.from_stored(super().from_db_value(value, expression, connection))
+
+
+class SectionField(StoredJSONField):
+    """Extracted fields of one section. Empty fields are not stored; the API
+    puts them back (``contracts.extraction.full_section``)."""
+
+    def to_stored(self, value):
+        if isinstance(value, dict):
+            return {field: item for field, item in value.items() if item not in EMPTY_VALUES}
+        return value
+
+
+class GapsField(StoredJSONField):
+    """Rubric gap labels, stored as a bitmask (``contracts.scoring.GAP_BITS``)."""
+
+    def to_stored(self, value):
+        if isinstance(value, (list, tuple)):
+            return scoring.gap_mask(value)
+        return value
+
+    def from_stored(self, value):
+        # Documents written before the bitmask hold the labels themselves.
+        if isinstance(value, int):
+            return scoring.gap_labels(value)
+        return value
+
 
 class Contract(models.Model):
     STATUS_PENDING = "pending"
@@ -17,19 +67,50 @@ class Contract(models.Model):
     file = models.FileField(upload_to="contracts/")
     original_filename = models.CharField(max_length=255)
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
     progress = models.PositiveIntegerField(default=0)
     error_message = models.TextField(blank=True)
 
+    # Content addressing: sha256 is unique among contracts that own their blob;
+    # re-uploads of the same bytes point at the owner through duplicate_of.
+    sha256 = models.CharField(max_length=64, blank=True, default="")
+    duplicate_of = models.ForeignKey(
+        "self",
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="duplicates",
+        db_constraint=False,
+    )
+    # The contract this one amends: an upload can name it so unchanged pages
+    # are reused instead of re-parsed (see contracts.versions).
+    parent = models.ForeignKey(
+        "self",
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="versions",
+        db_constraint=False,
+    )
+    # Set on every contract created by one bulk upload request.
+    upload_batch = models.CharField(max_length=32, blank=True, default="", db_index=True)
+
     # Simplified extracted data fields
-    parties = models.JSONField(default=dict, blank=True)
-    account_info = models.JSONField(default=dict, blank=True)
-    financial_details = models.JSONField(default=dict, blank=True)
-    payment_structure = models.JSONField(default=dict, blank=True)
-    revenue_classification = models.JSONField(default=dict, blank=True)
-    sla = models.JSONField(default=dict, blank=True)
+    parties = SectionField(default=dict, blank=True)
+    account_info = SectionField(default=dict, blank=True)
+    financial_details = SectionField(default=dict, blank=True)
+    payment_structure = SectionField(default=dict, blank=True)
+    revenue_classification = SectionField(default=dict, blank=True)
+    sla = SectionField(default=dict, blank=True)
     score = models.PositiveIntegerField(default=0)
-    gaps = models.JSONField(default=list, blank=True)
+    gaps = GapsField(default=list, blank=True)
+    # contracts.scoring.RUBRIC_VERSION that score and gaps were computed with.
+    rubric_version = models.PositiveIntegerField(default=0, db_index=True)
+    # Per-page fingerprints (contracts.extraction.fingerprint_pages), kept for
+    # versions and their parents, and the page diff against the parent.
+    page_fingerprints = StoredJSONField(default=list, blank=True)
+    page_diff = StoredJSONField(default=dict, blank=True)
 
     def __str__(self) -> str:
         return f"Contract #{self.pk} - {self.original_filename}"
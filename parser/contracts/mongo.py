@@ -0,0 +1,98 @@
+import asyncio
+import json
+import threading
+import weakref
+
+from django.db import connections
+from pymongo import AsyncMongoClient, MongoClient
+
+from .metrics import MongoCommandListener
+
+MONGO_ALIAS = "mongo"
+
+_client = None
+_client_lock = threading.Lock()
+# Event loop -> AsyncMongoClient; an async client is bound to the loop it was
+# first used on.
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def _client_settings() -> dict:
+    client_settings = dict(connections[MONGO_ALIAS].settings_dict.get("CLIENT") or {})
+    client_settings.setdefault("tz_aware", True)
+    client_settings.setdefault("connect", False)
+    client_settings.setdefault("event_listeners", [MongoCommandListener()])
+    return client_settings
+
+
+def get_client() -> MongoClient:
+    """Return the process-wide pymongo client for the ``mongo`` database.
+
+    Built lazily from the djongo ``CLIENT`` settings so it follows the same
+    host/port configuration. The client owns its own connection pool and is
+    safe to share between threads, but not across ``fork()``; child
+    processes must call :func:`reset_client` first.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = MongoClient(**_client_settings())
+    return _client
+
+
+def get_async_client() -> AsyncMongoClient:
+    """Return the async pymongo client for the running event loop.
+
+    Used by the async views (``contracts.async_views``). All requests served
+    by one loop share the client and so its connection pool; under an ASGI
+    server that is one pool per worker process.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = _async_clients[loop] = AsyncMongoClient(**_client_settings())
+    return client
+
+
+def _database_name() -> str:
+    # Resolve the name on every call: the test runner swaps it for test_<name>.
+    return connections[MONGO_ALIAS].settings_dict["NAME"]
+
+
+def get_database():
+    return get_client()[_database_name()]
+
+
+def get_async_database():
+    return get_async_client()[_database_name()]
+
+
+def get_collection(model):
+    """Return the pymongo collection djongo stores ``model`` in."""
+    return get_database()[model._meta.db_table]
+
+
+def get_async_collection(model):
+    """Async counterpart of :func:`get_collection`."""
+    return get_async_database()[model._meta.db_table]
+
+
+def decode_json(value):
+    """Decode a ``models.JSONField`` value read with pymongo.
+
+    Django's JSONField is stored by djongo as a JSON-encoded string, so code
+    reading or writing it without the ORM has to (de)serialize it itself.
+    """
+    return json.loads(value) if isinstance(value, str) else value
+
+
+def encode_json(value) -> str:
+    return json.dumps(value)
+
+
+def reset_client() -> None:
+    global _client
+    with _client_lock:
+        _client = None
+    _async_clients.clear()
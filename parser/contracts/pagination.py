@@ -0,0 +1,185 @@
+"""Indexed filtering and keyset (cursor) pagination over the contracts collection.
+
+Only sorts that an index can serve are accepted (:data:`SORTS`), and every
+query is sent with a ``hint`` naming the index for its shape, so the list API
+never falls back to a collection scan. Pages continue from the last row of the
+previous page, so a page costs one indexed range scan however deep it is: no
+``OFFSET`` skip and no ``count()``. Cursors are opaque to clients: URL-safe
+base64 of ``<sort value>:<id>``, with datetimes as epoch milliseconds and
+search relevance as a float. A cursor is only meaningful with the sort and
+filters that produced it.
+"""
+import base64
+from datetime import datetime, timedelta, timezone
+
+from django.utils.dateparse import parse_datetime
+from pymongo import ASCENDING, DESCENDING
+
+LIST_FIELDS = ["id", "original_filename", "status", "progress", "score", "uploaded_at"]
+LIST_PROJECTION = dict({"_id": 0}, **{field: 1 for field in LIST_FIELDS})
+
+# Accepted ``sort`` values -> (field, direction). Ties are broken by id in the
+# same direction.
+SORTS = {
+    "-uploaded_at": ("uploaded_at", DESCENDING),
+    "uploaded_at": ("uploaded_at", ASCENDING),
+    "-score": ("score", DESCENDING),
+    "score": ("score", ASCENDING),
+}
+DEFAULT_SORT = "-uploaded_at"
+
+# (status filtered?, sort field) -> index serving that query shape. Created by
+# migrations 0005 and 0006; ascending sorts walk the same indexes backwards.
+INDEXES = {
+    (False, "uploaded_at"): "contracts_contract_uploaded_at_id",
+    (True, "uploaded_at"): "contracts_contract_status_uploaded_at_id",
+    (False, "score"): "contracts_contract_score_id",
+    (True, "score"): "contracts_contract_status_score_id",
+}
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return (value - EPOCH) // timedelta(milliseconds=1)
+    if isinstance(value, float):
+        return repr(value)  # Search relevance; repr round-trips exactly.
+    return int(value)
+
+
+def encode_cursor(value, pk: int) -> str:
+    raw = f"{_encode_value(value)}:{pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, field: str = "uploaded_at"):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        value, pk = base64.urlsafe_b64decode(padded.encode()).decode().split(":")
+        value = float(value) if field == "relevance" else int(value)
+        pk = int(pk)
+    except (ValueError, UnicodeDecodeError):
+        raise InvalidCursor(cursor)
+    if field == "uploaded_at":
+        value = EPOCH + timedelta(milliseconds=value)
+    return value, pk
+
+
+def after_clause(cursor: str, sort: str = DEFAULT_SORT) -> dict:
+    """Query clause selecting rows that sort strictly after ``cursor``."""
+    return keyset_clause(cursor, *SORTS[sort])
+
+
+def keyset_clause(cursor: str, field: str, direction: int) -> dict:
+    """Query clause selecting rows after ``cursor`` in ``(field, id)`` order."""
+    value, pk = decode_cursor(cursor, field)
+    op = "$lt" if direction == DESCENDING else "$gt"
+    return {"$or": [{field: {op: value}}, {field: value, "id": {op: pk}}]}
+
+
+def parse_filters(params) -> dict:
+    """:func:`build_query` arguments from query parameters (or any mapping).
+
+    Raises ValueError with a client-facing message.
+    """
+    filters = {"status": params.get("status") or None}
+    for name in ("score_min", "score_max"):
+        value = params.get(name)
+        if value:
+            try:
+                filters[name] = int(value)
+            except ValueError:
+                raise ValueError(f"Invalid {name}")
+    for name in ("uploaded_after", "uploaded_before"):
+        value = params.get(name)
+        if value:
+            parsed = parse_datetime(value)
+            if parsed is None:
+                raise ValueError(f"Invalid {name}")
+            filters[name] = parsed.replace(tzinfo=timezone.utc) if parsed.tzinfo is None else parsed
+    return filters
+
+
+def build_query(status=None, score_min=None, score_max=None, uploaded_after=None, uploaded_before=None) -> dict:
+    query = {}
+    if status:
+        query["status"] = status
+    score = {}
+    if score_min is not None:
+        score["$gte"] = score_min
+    if score_max is not None:
+        score["$lte"] = score_max
+    if score:
+        query["score"] = score
+    uploaded = {}
+    if uploaded_after is not None:
+        uploaded["$gte"] = uploaded_after
+    if uploaded_before is not None:
+        uploaded["$lt"] = uploaded_before
+    if uploaded:
+        query["uploaded_at"] = uploaded
+    return query
+
+
+def index_for(query: dict, sort: str = DEFAULT_SORT) -> str:
+    return INDEXES[("status" in query, SORTS[sort][0])]
+
+
+def page_number(value, pages: int) -> int:
+    """Clamp like ``Paginator.get_page``: non-numbers give 1, out-of-range the last page."""
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        return 1
+    return number if 1 <= number <= pages else pages
+
+
+def offset_find(query: dict, page: int, page_size: int, sort: str = DEFAULT_SORT, projection: dict = None):
+    """Return ``(filter, find_kwargs)`` for page ``page`` of the classic page mode."""
+    field, direction = SORTS[sort]
+    return query, {
+        "projection": projection or LIST_PROJECTION,
+        "sort": [(field, direction), ("id", direction)],
+        "skip": (page - 1) * page_size,
+        "limit": page_size,
+        "hint": index_for(query, sort),
+    }
+
+
+def keyset_find(query: dict, page_size: int, after: str = None, sort: str = DEFAULT_SORT,
+                projection: dict = None):
+    """Return ``(filter, find_kwargs)`` fetching one page plus a lookahead row."""
+    field, direction = SORTS[sort]
+    hint = index_for(query, sort)
+    if after:
+        query = {"$and": [query, after_clause(after, sort)]} if query else after_clause(after, sort)
+    return query, {
+        "projection": projection or LIST_PROJECTION,
+        "sort": [(field, direction), ("id", direction)],
+        "limit": page_size + 1,
+        "hint": hint,
+    }
+
+
+def keyset_result(rows: list, page_size: int, sort: str = DEFAULT_SORT):
+    """Split the rows fetched with :func:`keyset_find` into ``(rows, next_cursor)``."""
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = encode_cursor(last[SORTS[sort][0]], last["id"])
+    return rows, next_cursor
+
+
+def keyset_page(collection, query: dict, page_size: int, after: str = None, sort: str = DEFAULT_SORT,
+                projection: dict = None):
+    """Return ``(rows, next_cursor)`` for one page; ``next_cursor`` is None at the end."""
+    query, kwargs = keyset_find(query, page_size, after, sort, projection)
+    return keyset_result(list(collection.find(query, **kwargs)), page_size, sort)
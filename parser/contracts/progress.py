@@ -0,0 +1,181 @@
+"""Live parse progress without a database write per tick.
+
+Workers report progress through a :class:`ProgressTracker`. Each change goes
+to the optional shared cache (``CONTRACT_PROGRESS_SHARED_CACHE``) and, at most
+every ``CONTRACT_PROGRESS_PUBLISH_INTERVAL`` seconds, onto the event bus; the
+contract document itself is only written on status transitions and every
+``CONTRACT_PROGRESS_FLUSH_INTERVAL`` seconds. Web processes keep the latest
+event of every running parse in an in-memory table fed by the bus, and status
+reads consult it, then the shared cache, before falling back to the database.
+Entries expire after ``CONTRACT_PROGRESS_TTL`` seconds without news, so a
+dead worker's last report is never served for long.
+"""
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+from . import events, repository
+
+# Running parses tracked per web process; more than this are served from Mongo.
+TABLE_MAX_ENTRIES = 100_000
+
+
+class ProgressTable:
+    """Thread-safe ``contract_id -> status payload`` table with expiry."""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def get(self, contract_id: int):
+        with self._lock:
+            entry = self._entries.get(contract_id)
+            if entry is None:
+                return None
+            payload, seen = entry
+            if time.monotonic() - seen > self.ttl:
+                del self._entries[contract_id]
+                return None
+            return payload
+
+    def put(self, contract_id: int, payload: dict) -> None:
+        with self._lock:
+            if contract_id not in self._entries and len(self._entries) >= TABLE_MAX_ENTRIES:
+                self._expire()
+                if len(self._entries) >= TABLE_MAX_ENTRIES:
+                    return
+            self._entries[contract_id] = (payload, time.monotonic())
+
+    def discard(self, contract_id: int) -> None:
+        with self._lock:
+            self._entries.pop(contract_id, None)
+
+    def _expire(self) -> None:
+        cutoff = time.monotonic() - self.ttl
+        for contract_id in [pk for pk, (_, seen) in self._entries.items() if seen < cutoff]:
+            del self._entries[contract_id]
+
+
+def _on_event(contract_id: int, payload) -> None:
+    if payload is None:
+        return
+    if payload["status"] in events.TERMINAL_STATUSES:
+        # Terminal states are saved before they are published; read them from Mongo.
+        get_table().discard(contract_id)
+    else:
+        get_table().put(contract_id, payload)
+
+
+_table = None
+_table_pid = None
+
+
+def get_table() -> ProgressTable:
+    """Return this process's table, fed by the event bus."""
+    global _table, _table_pid
+    if _table is None or _table_pid != os.getpid():
+        _table = ProgressTable(settings.CONTRACT_PROGRESS_TTL)
+        _table_pid = os.getpid()
+        bus = events.get_bus()
+        bus.add_listener(_on_event)
+        bus.start()
+    return _table
+
+
+def _shared():
+    alias = settings.CONTRACT_PROGRESS_SHARED_CACHE
+    return caches[alias] if alias else None
+
+
+def _shared_key(contract_id: int) -> str:
+    return f"contracts:progress:{contract_id}"
+
+
+def current(contract_id: int):
+    """Latest live status payload of a running parse, or None."""
+    payload = get_table().get(contract_id)
+    if payload is None:
+        shared = _shared()
+        if shared is not None:
+            payload = shared.get(_shared_key(contract_id))
+    return payload
+
+
+def current_many(contract_ids) -> dict:
+    """``{contract_id: payload}`` for the given contracts that have live progress."""
+    table = get_table()
+    found = {}
+    for contract_id in contract_ids:
+        payload = table.get(contract_id)
+        if payload is not None:
+            found[contract_id] = payload
+    shared = _shared()
+    rest = [contract_id for contract_id in contract_ids if contract_id not in found]
+    if shared is not None and rest:
+        keys = {_shared_key(contract_id): contract_id for contract_id in rest}
+        for key, payload in shared.get_many(list(keys)).items():
+            found[keys[key]] = payload
+    return found
+
+
+def clear(contract_id: int) -> None:
+    """Forget live progress once a parse reached a terminal state."""
+    shared = _shared()
+    if shared is not None:
+        shared.delete(_shared_key(contract_id))
+
+
+class ProgressTracker:
+    """Coalesce the progress reports of one parse.
+
+    Create it right after the status transition that starts the parse (which
+    is written and published as usual) and call :meth:`update` as often as
+    progress changes. Partially extracted sections passed to
+    :meth:`add_sections` are written along with progress.
+    """
+
+    def __init__(self, contract, flush_interval: float = None, publish_interval: float = None):
+        self.contract = contract
+        if flush_interval is None:
+            flush_interval = settings.CONTRACT_PROGRESS_FLUSH_INTERVAL
+        if publish_interval is None:
+            publish_interval = settings.CONTRACT_PROGRESS_PUBLISH_INTERVAL
+        self.flush_interval = flush_interval
+        self.publish_interval = publish_interval
+        self._flushed = self._published = time.monotonic()
+        self._sections = {}
+
+    def update(self, progress: int) -> None:
+        contract = self.contract
+        if progress == contract.progress:
+            return
+        contract.progress = progress
+        shared = _shared()
+        if shared is not None:
+            shared.set(_shared_key(contract.pk), events.status_payload(contract), settings.CONTRACT_PROGRESS_TTL)
+        now = time.monotonic()
+        if now - self._published >= self.publish_interval:
+            events.publish(contract)
+            self._published = now
+        if now - self._flushed >= self.flush_interval:
+            self._flush(now)
+
+    def add_sections(self, sections: dict, complete: bool = False) -> None:
+        """Queue partially extracted ``{section: values}`` for the contract document.
+
+        They are written with the next progress flush, or at once when
+        ``complete`` (a section just got all of its fields), so the partial
+        detail view fills in while the parse runs.
+        """
+        self._sections.update(sections)
+        if complete:
+            self._flush(time.monotonic())
+
+    def _flush(self, now: float) -> None:
+        repository.update(self.contract.pk, progress=self.contract.progress, **self._sections)
+        self._sections = {}
+        self._flushed = now
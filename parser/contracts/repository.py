@@ -0,0 +1,123 @@
+"""Direct pymongo access to contracts for the hot read and write paths.
+
+djongo translates every ORM query back from SQL (with sqlparse) into a Mongo
+query, on every call. The views and the parse worker read and write
+contracts here instead, over the process-wide pooled client
+(``contracts.mongo.get_client``), with explicit projections and
+``find_one_and_update`` for status transitions, so a transition and the read
+of its result are one round trip. Documents come back as ``Contract``
+instances loaded like an ORM ``.only()`` query: fields left out of the
+projection are deferred. JSON fields are converted to and from their stored
+form (compact sections, gap bitmasks) by :func:`encode_field` and
+:func:`decode_field`, as the ORM would. Creating contracts (uploads, bulk ingestion), the
+admin and ``ContractsRouter`` stay on the ORM.
+"""
+from django.db import models
+from django.http import Http404
+from django.utils import timezone
+from pymongo import ReturnDocument
+
+from .models import Contract
+from .mongo import MONGO_ALIAS, decode_json, encode_json, get_async_collection, get_collection
+
+# attname -> field, for every field stored as JSON (all StoredJSONFields).
+JSON_FIELDS = {field.attname: field for field in Contract._meta.concrete_fields if isinstance(field, models.JSONField)}
+
+STATUS_FIELDS = ("id", "status", "progress", "error_message")
+SECTION_FIELDS = (
+    "parties", "account_info", "financial_details", "payment_structure", "revenue_classification", "sla",
+)
+# duplicate_of_id is for rescoring.refresh_contract, which keeps duplicates out of the rollups.
+DETAIL_FIELDS = (
+    "id", "file", "uploaded_at", "status", "progress", "score", "gaps", "rubric_version", "parent_id", "page_diff",
+    "duplicate_of_id",
+) + SECTION_FIELDS
+DOWNLOAD_FIELDS = ("id", "file", "original_filename", "sha256")
+# What the parse worker reads, and what it writes back on success.
+PARSE_FIELDS = ("id", "file", "status", "progress", "error_message", "score", "gaps", "parent_id")
+PARSE_RESULT_FIELDS = ("status", "progress", "error_message", "score", "gaps", "rubric_version") + SECTION_FIELDS
+# Also written back by parses of versions (contracts with a parent).
+VERSION_RESULT_FIELDS = ("page_fingerprints", "page_diff")
+
+
+def projection(fields) -> dict:
+    return dict({"_id": 0}, **{field: 1 for field in fields})
+
+
+def decode_field(name: str, value):
+    """A field as read with pymongo, converted to its Python value."""
+    field = JSON_FIELDS.get(name)
+    return field.from_stored(decode_json(value)) if field is not None else value
+
+
+def encode_field(name: str, value):
+    """A field's Python value, converted to what is stored."""
+    field = JSON_FIELDS.get(name)
+    return encode_json(field.to_stored(value)) if field is not None else value
+
+
+def from_document(doc: dict) -> Contract:
+    """A ``Contract`` for a raw document, as if the ORM had loaded it."""
+    names = [field.attname for field in Contract._meta.concrete_fields if field.attname in doc]
+    return Contract.from_db(MONGO_ALIAS, names, [decode_field(name, doc[name]) for name in names])
+
+
+def to_document(values: dict) -> dict:
+    """Field values as stored, with ``updated_at`` bumped."""
+    doc = {name: encode_field(name, value) for name, value in values.items()}
+    doc["updated_at"] = timezone.now()
+    return doc
+
+
+def _not_found() -> Http404:
+    # The message get_object_or_404 would use.
+    return Http404(f"No {Contract._meta.object_name} matches the given query.")
+
+
+def get(contract_id: int, fields=DETAIL_FIELDS):
+    """Load ``fields`` of one contract, or return None."""
+    doc = get_collection(Contract).find_one({"id": contract_id}, projection(fields))
+    return from_document(doc) if doc is not None else None
+
+
+def get_or_404(contract_id: int, fields=DETAIL_FIELDS) -> Contract:
+    contract = get(contract_id, fields)
+    if contract is None:
+        raise _not_found()
+    return contract
+
+
+async def aget_or_404(contract_id: int, fields=DETAIL_FIELDS) -> Contract:
+    """Async :func:`get_or_404`, for ``contracts.async_views``."""
+    doc = await get_async_collection(Contract).find_one({"id": contract_id}, projection(fields))
+    if doc is None:
+        raise _not_found()
+    return from_document(doc)
+
+
+def update(contract_id: int, where: dict = None, **values) -> bool:
+    """Set ``values`` on one contract; ``where`` adds conditions on its current state.
+
+    Returns False when no contract matched.
+    """
+    query = dict(where or {}, id=contract_id)
+    return get_collection(Contract).update_one(query, {"$set": to_document(values)}).matched_count == 1
+
+
+def transition(contract_id: int, status: str, from_statuses=None, fields=STATUS_FIELDS, where: dict = None,
+               **values):
+    """Move a contract to ``status`` and return it with ``fields`` as updated.
+
+    With ``from_statuses`` the move only happens from one of those statuses;
+    ``where`` adds other conditions. Returns None when no contract matched.
+    """
+    query = dict(where or {}, id=contract_id)
+    if from_statuses is not None:
+        query["status"] = {"$in": list(from_statuses)}
+    doc = get_collection(Contract).find_one_and_update(
+        query,
+        {"$set": to_document(dict(values, status=status))},
+        projection=projection(fields),
+        return_document=ReturnDocument.AFTER,
+    )
+    return from_document(doc) if doc is not None else None
@@ -0,0 +1,129 @@
+"""Bringing stored scores up to the current rubric.
+
+Scores are recomputed from the stored section fields (never by re-reading the
+PDF) and written back with a conditional, unordered Mongo bulk write, so a
+concurrent re-parse is never overwritten with an older result, and the
+analytics rollups are moved to the new scores and gaps. Used by the
+read paths (lazily, for the contracts being served), by ``manage.py
+rubric_sweeper`` (for the rest of the corpus) and by ``manage.py rescore``.
+"""
+from django.utils import timezone
+from pymongo import UpdateOne
+
+from . import analytics, events, repository, scoring, search
+from .models import Contract
+from .mongo import decode_json, get_collection
+
+SECTION_PROJECTION = dict(
+    {"_id": 1, "id": 1, "status": 1, "score": 1, "gaps": 1, "rubric_version": 1, "uploaded_at": 1,
+     "duplicate_of_id": 1},
+    **{section: 1 for section in scoring.SCORED_SECTIONS},
+)
+
+
+def is_stale(contract) -> bool:
+    return contract.status == Contract.STATUS_COMPLETED and contract.rubric_version != scoring.RUBRIC_VERSION
+
+
+def is_stale_row(row: dict) -> bool:
+    return row.get("status") == Contract.STATUS_COMPLETED and row.get("rubric_version") != scoring.RUBRIC_VERSION
+
+
+def stale_query() -> dict:
+    return {"status": Contract.STATUS_COMPLETED, "rubric_version": {"$ne": scoring.RUBRIC_VERSION}}
+
+
+def _in_rollups(doc: dict) -> bool:
+    # Rollups count parses; duplicates are never parsed.
+    return doc.get("status") == Contract.STATUS_COMPLETED and not doc.get("duplicate_of_id")
+
+
+def rescore_documents(collection, docs, dry_run: bool = False):
+    """Rescore raw contract documents.
+
+    Returns ``({id: (score, gaps)}, changed)``. Only the ``changed`` documents
+    whose score, gaps or rubric version differ are written.
+    """
+    sections = [{s: decode_json(doc.get(s)) for s in scoring.SCORED_SECTIONS} for doc in docs]
+    scores, gaps = scoring.score_batch(sections)
+    now = timezone.now()
+    results = {}
+    changed = []
+    rollups = []
+    updates = []
+    for doc, score, doc_gaps in zip(docs, scores, gaps):
+        score = int(score)
+        results[doc["id"]] = (score, doc_gaps)
+        old_gaps = repository.decode_field("gaps", doc.get("gaps"))
+        unchanged = (
+            doc.get("score") == score
+            and old_gaps == doc_gaps
+            and doc.get("rubric_version") == scoring.RUBRIC_VERSION
+        )
+        if unchanged:
+            continue
+        changed.append(doc["id"])
+        if _in_rollups(doc):
+            rollups.append((doc["uploaded_at"], doc.get("score"), old_gaps, score, doc_gaps))
+        updates.append(
+            UpdateOne(
+                {"_id": doc["_id"], "rubric_version": doc.get("rubric_version")},
+                {
+                    "$set": {
+                        "score": score,
+                        "gaps": repository.encode_field("gaps", doc_gaps),
+                        "rubric_version": scoring.RUBRIC_VERSION,
+                        "updated_at": now,
+                    }
+                },
+            )
+        )
+    if updates and not dry_run:
+        collection.bulk_write(updates, ordered=False)
+        # A row lost to a concurrent re-parse is still moved; rebuild_rollups repairs that.
+        analytics.record_rescores(rollups)
+        search.sync(changed)
+        events.publish_changed(changed)
+    return results, len(updates)
+
+
+def rescore_ids(ids) -> dict:
+    """Rescore the given contracts; returns ``{id: (score, gaps)}``."""
+    if not ids:
+        return {}
+    collection = get_collection(Contract)
+    docs = list(collection.find({"id": {"$in": list(ids)}}, SECTION_PROJECTION))
+    return rescore_documents(collection, docs)[0]
+
+
+def refresh_contract(contract) -> bool:
+    """Rescore ``contract`` in place if its rubric version is outdated.
+
+    Returns True when the contract was rescored.
+    """
+    if not is_stale(contract):
+        return False
+    previous, old_score, old_gaps = contract.rubric_version, contract.score, contract.gaps
+    scoring.score_contract(contract)
+    updated = repository.update(
+        contract.pk,
+        where={"rubric_version": previous},
+        score=contract.score,
+        gaps=contract.gaps,
+        rubric_version=contract.rubric_version,
+    )
+    if updated:
+        if not contract.duplicate_of_id:
+            analytics.record_rescores([(contract.uploaded_at, old_score, old_gaps, contract.score, contract.gaps)])
+        search.sync([contract.pk])
+        events.publish_changed([contract.pk])
+    return True
+
+
+def refresh_rows(rows) -> None:
+    """Patch list rows (dicts with id/status/score/rubric_version) in place."""
+    stale = [row["id"] for row in rows if is_stale_row(row)]
+    for pk, (score, _) in rescore_ids(stale).items():
+        for row in rows:
+            if row["id"] == pk:
+                row["score"] = score
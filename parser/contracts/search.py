@@ -0,0 +1,166 @@
+"""Ranked full-text search over contracts.
+
+The normalized page text of each parsed contract lives outside the contract
+document, in the ``contract_search`` collection, so status, list and detail
+reads never page it in. Its documents are keyed by the contract that owns the
+blob (see ``contracts.dedup``) and also carry the filenames the blob was
+uploaded under; migration 0011 covers both with a MongoDB text index, the
+filenames weighted higher. Duplicates have no text of their own; instead each
+search document lists the owner and its duplicates under ``contracts``, with
+the keys the list filters and sorts use (:data:`KEY_FIELDS`). :func:`sync`
+copies them over whenever a status or score changes.
+
+A query filters, sorts and pages those entries inside the search collection,
+taking at most ``CONTRACT_SEARCH_MAX_CANDIDATES`` of the best-ranked matching
+documents, and only the page it returns is read from the contracts
+collection. Queries use MongoDB's ``$text`` syntax: terms are stemmed and
+OR-ed, ``"quoted phrases"`` must match exactly and ``-term`` excludes. Results
+are ranked by text score unless a sort is requested, and pages continue from
+a keyset cursor as in :mod:`contracts.pagination`.
+"""
+from django.conf import settings
+from pymongo import DESCENDING, UpdateOne
+
+from . import pagination
+from .models import Contract
+from .mongo import get_async_collection, get_async_database, get_collection, get_database
+
+SEARCH_COLLECTION = "contract_search"
+SEARCH_INDEX = "contract_search_text"
+
+# Copied from each contract into its search document's ``contracts`` entries.
+KEY_FIELDS = ("id", "status", "score", "uploaded_at")
+SEARCH_PROJECTION = dict(pagination.LIST_PROJECTION, rubric_version=1)
+RELEVANCE = ("relevance", DESCENDING)
+
+
+def get_search_collection():
+    return get_database()[SEARCH_COLLECTION]
+
+
+def _entry(contract) -> dict:
+    return {field: getattr(contract, field) for field in KEY_FIELDS}
+
+
+def add_uploads(contracts) -> None:
+    """Make new contracts findable by filename, before (or without) a parse."""
+    updates = [
+        UpdateOne(
+            {"_id": contract.duplicate_of_id or contract.pk},
+            {"$addToSet": {"filenames": contract.original_filename}, "$push": {"contracts": _entry(contract)}},
+            upsert=True,
+        )
+        for contract in contracts
+    ]
+    if updates:
+        get_search_collection().bulk_write(updates, ordered=False)
+
+
+def sync(contract_ids) -> None:
+    """Refresh the search entries of these contracts and of the rest of their blob groups.
+
+    Rebuilds each group's ``contracts`` and ``filenames`` from the contracts
+    collection, so it also covers duplicates handed to a new owner.
+    """
+    collection = get_collection(Contract)
+    owners = list({
+        doc.get("duplicate_of_id") or doc["id"]
+        for doc in collection.find({"id": {"$in": list(contract_ids)}}, {"_id": 0, "id": 1, "duplicate_of_id": 1})
+    })
+    if not owners:
+        return
+    groups = {owner: {"contracts": [], "filenames": []} for owner in owners}
+    fields = dict.fromkeys(KEY_FIELDS + ("duplicate_of_id", "original_filename"), 1)
+    fields["_id"] = 0
+    for doc in collection.find({"$or": [{"id": {"$in": owners}}, {"duplicate_of_id": {"$in": owners}}]}, fields):
+        group = groups.get(doc.get("duplicate_of_id") or doc["id"])
+        if group is None:
+            continue  # A former owner now duplicating another blob.
+        group["contracts"].append({field: doc.get(field) for field in KEY_FIELDS})
+        if doc["original_filename"] not in group["filenames"]:
+            group["filenames"].append(doc["original_filename"])
+    get_search_collection().bulk_write(
+        [UpdateOne({"_id": owner}, {"$set": group}, upsert=True) for owner, group in groups.items()],
+        ordered=False,
+    )
+
+
+def store(contract_id: int, text: str) -> None:
+    """Index a parsed contract's text."""
+    store_texts({contract_id: text})
+
+
+def store_texts(texts: dict) -> None:
+    """Replace the indexed text of several contracts (``{id: text}``)."""
+    if texts:
+        get_search_collection().bulk_write(
+            [UpdateOne({"_id": pk}, {"$set": {"text": text}}, upsert=True) for pk, text in texts.items()],
+            ordered=False,
+        )
+
+
+def _order(sort: str = None):
+    return pagination.SORTS[sort] if sort else RELEVANCE
+
+
+def search_pipeline(q: str, query: dict, page_size: int, after: str = None, sort: str = None) -> list:
+    """Aggregation over ``contract_search`` for the keys of one page of matches plus a lookahead row.
+
+    ``query`` holds the list filters; ``sort`` is a ``pagination.SORTS`` key,
+    or None to rank by relevance. Raises ``pagination.InvalidCursor``.
+    """
+    field, direction = _order(sort)
+    match = {"$text": {"$search": q}}
+    if query:
+        match["contracts"] = {"$elemMatch": query}
+    entries = query
+    if after:
+        clause = pagination.keyset_clause(after, field, direction)
+        entries = {"$and": [query, clause]} if query else clause
+    pipeline = [
+        {"$match": match},
+        {"$sort": {"relevance": {"$meta": "textScore"}}},
+        {"$limit": settings.CONTRACT_SEARCH_MAX_CANDIDATES},
+        {"$project": {"_id": 0, "contracts": 1, "relevance": {"$meta": "textScore"}}},
+        {"$unwind": "$contracts"},
+        {"$project": dict({field: f"$contracts.{field}" for field in KEY_FIELDS}, relevance=1)},
+    ]
+    if entries:
+        pipeline.append({"$match": entries})
+    pipeline += [
+        {"$sort": {field: direction, "id": direction}},
+        {"$limit": page_size + 1},
+    ]
+    return pipeline
+
+
+def _page(entries: list, docs, page_size: int, sort: str = None):
+    """Join one page of entries to their contract rows; returns ``(rows, next_cursor)``."""
+    next_cursor = None
+    if len(entries) > page_size:
+        entries = entries[:page_size]
+        last = entries[-1]
+        next_cursor = pagination.encode_cursor(last[_order(sort)[0]], last["id"])
+    rows = {doc["id"]: doc for doc in docs}
+    return [dict(rows[e["id"]], relevance=e["relevance"]) for e in entries if e["id"] in rows], next_cursor
+
+
+def search_page(q: str, query: dict, page_size: int, after: str = None, sort: str = None):
+    """Return ``(rows, next_cursor)`` for one page of matches; see :func:`search_pipeline`."""
+    entries = list(get_search_collection().aggregate(search_pipeline(q, query, page_size, after, sort)))
+    ids = [entry["id"] for entry in entries[:page_size]]
+    docs = get_collection(Contract).find({"id": {"$in": ids}}, SEARCH_PROJECTION) if ids else []
+    return _page(entries, docs, page_size, sort)
+
+
+async def asearch_page(q: str, query: dict, page_size: int, after: str = None, sort: str = None):
+    """Async :func:`search_page`, for ``contracts.async_views``."""
+    cursor = await get_async_database()[SEARCH_COLLECTION].aggregate(
+        search_pipeline(q, query, page_size, after, sort)
+    )
+    entries = await cursor.to_list()
+    ids = [entry["id"] for entry in entries[:page_size]]
+    docs = []
+    if ids:
+        docs = await get_async_collection(Contract).find({"id": {"$in": ids}}, SEARCH_PROJECTION).to_list()
+    return _page(entries, docs, page_size, sort)
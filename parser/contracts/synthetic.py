@@ -0,0 +1,106 @@
+"""Synthetic contract PDFs for benchmarks and tests.
+
+:func:`contract_pdf` writes a minimal, valid PDF (Helvetica text, no external
+dependencies) whose pages carry the kinds of lines the field extractors look
+for: parties and contacts on the first page, pricing and payment terms in the
+middle, SLA terms near the end, and filler clauses in between. The same seed
+always produces the same bytes, so benchmark runs are comparable.
+"""
+import random
+
+FILLER = (
+    "The parties agree that this clause is included for the purposes of this agreement only.",
+    "Nothing in this section limits any rights or remedies available under applicable law.",
+    "Each party shall comply with all laws and regulations applicable to its obligations.",
+    "Notices shall be delivered in writing to the addresses set out in the order form.",
+    "This agreement may be executed in counterparts, each of which is deemed an original.",
+    "Confidential information shall be protected with at least reasonable care.",
+)
+
+LINES_PER_PAGE = 45
+
+
+def contract_pages(pages: int, seed: int = 0) -> list:
+    """Return the text of each page of a synthetic contract."""
+    rng = random.Random(seed)
+    customer = f"Customer {rng.randrange(10_000):04d} Inc"
+    vendor = f"Vendor {rng.randrange(10_000):04d} Ltd"
+    blocks = [
+        (0, [
+            "MASTER SERVICES AGREEMENT",
+            f"Customer: {customer}",
+            f"Vendor: {vendor}",
+            f"Billing contact: billing@customer{seed}.example.com",
+            f"Technical support contact: support@vendor{seed}.example.com",
+        ]),
+        (pages // 2, [
+            "Pricing",
+            f"Platform subscription {rng.randint(1, 50)} x ${rng.randint(100, 9999)}.00",
+            f"Onboarding services {rng.randint(1, 5)} x ${rng.randint(100, 9999)}.00",
+            f"Total contract value: USD {rng.randint(10_000, 900_000):,}",
+            "Sales tax: 8%",
+            "Payment terms: Net 30. Fees are invoiced monthly and paid by wire transfer.",
+            "IBAN: GB29 NWBK 6016 1331 9268 19  SWIFT: NWBKGB2L",
+            "This is a recurring subscription with annual billing cycle.",
+            "The agreement will automatically renew for successive one-year terms.",
+        ]),
+        (pages - 1, [
+            "Service Levels",
+            "Availability target: 99.9% uptime, measured monthly.",
+            "Service credits of 10% apply as penalties for missed uptime.",
+            "Support is available 24x7 via the support portal.",
+            "Signed by: Jane Doe, Chief Financial Officer",
+            "Signed by: John Roe, Chief Executive Officer",
+        ]),
+    ]
+    texts = []
+    for number in range(pages):
+        lines = [line for page, block in blocks if page == number for line in block]
+        while len(lines) < LINES_PER_PAGE:
+            lines.append(rng.choice(FILLER))
+        texts.append("\n".join(lines))
+    return texts
+
+
+def _escape(line: str) -> str:
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def build_pdf(pages) -> bytes:
+    """Encode page texts as a PDF with one text object per page."""
+    count = len(pages)
+    font = 3 + 2 * count
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [{}] /Count {} >>".format(
+            " ".join(f"{3 + 2 * i} 0 R" for i in range(count)), count
+        ).encode(),
+    ]
+    for i, text in enumerate(pages):
+        ops = ["BT /F1 10 Tf 14 TL 50 780 Td"]
+        ops.extend(f"({_escape(line)}) Tj T*" for line in text.split("\n"))
+        ops.append("ET")
+        stream = "\n".join(ops).encode("latin-1", "replace")
+        objects.append(
+            (
+                f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {4 + 2 * i} 0 R "
+                f"/Resources << /Font << /F1 {font} 0 R >> >> >>"
+            ).encode()
+        )
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def contract_pdf(pages: int, seed: int = 0) -> bytes:
+    return build_pdf(contract_pages(pages, seed))
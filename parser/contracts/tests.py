@@ -1,8 +1,21 @@
-from django.test import TestCase, Client
+from asgiref.sync import async_to_sync
+from django.http import HttpResponse
+from django.test import SimpleTestCase, TestCase, Client, RequestFactory
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.urls import reverse
+from . import analytics, artifacts, async_views, dedup, detail_cache, events, export, extraction, jobs, metrics, pagination, progress, repository, rescoring, scoring, search, synthetic, versions, views
+from .downloads import parse_range
+from .extraction import SECTION_FIELDS, FieldMerger, SearchText, extract_page_fields
 from .models import Contract
+from datetime import datetime, timezone as dt_timezone
+import asyncio
+import csv
+import hashlib
+import io
 import json
+import tempfile
+import zipfile
+from unittest import mock
 
 
 class ContractModelTest(TestCase):
@@ -65,6 +78,18 @@ class ContractAPITest(TestCase):
         data = json.loads(response.content)
         self.assertIn('detail', data)
 
+    def test_contract_upload_with_parent(self):
+        parent = Contract.objects.create(original_filename="v1.pdf", status=Contract.STATUS_COMPLETED)
+        file_data = SimpleUploadedFile("v2.pdf", self.test_pdf_content, content_type="application/pdf")
+        response = self.client.post(self.upload_url, {'file': file_data, 'parent': str(parent.pk)})
+        self.assertEqual(response.status_code, 200)
+        contract = Contract.objects.get(pk=json.loads(response.content)['contract_id'])
+        self.assertEqual(contract.parent_id, parent.pk)
+
+        file_data = SimpleUploadedFile("v3.pdf", b'%PDF-1.4\n%Other', content_type="application/pdf")
+        response = self.client.post(self.upload_url, {'file': file_data, 'parent': str(parent.pk + 1000)})
+        self.assertEqual(response.status_code, 400)
+
     def test_contract_status(self):
         contract = Contract.objects.create(
             original_filename="test.pdf",
@@ -172,10 +197,1007 @@ class ContractScoringTest(TestCase):
         
         # This would normally be called by the parsing function
         # For testing, we'll call it directly
-        from .views import _score_and_gaps
-        _score_and_gaps(contract)
+        scoring.score_contract(contract)
         
         # Should get full score (100 points)
         self.assertEqual(contract.score, 100)
         self.assertEqual(len(contract.gaps), 0)
 
+
+
+class ParseJobQueueTest(TestCase):
+    databases = {"default", "mongo"}
+
+    def setUp(self):
+        jobs._jobs().delete_many({})
+
+    def test_upload_enqueues_job(self):
+        file_data = SimpleUploadedFile("queued.pdf", b'%PDF-1.4\n', content_type="application/pdf")
+        response = self.client.post(reverse('contract_upload'), {'file': file_data})
+
+        contract_id = int(json.loads(response.content)['contract_id'])
+        job = jobs._jobs().find_one({"contract_id": contract_id})
+        self.assertEqual(job["status"], jobs.JOB_QUEUED)
+
+    def test_claim_leases_job_once(self):
+        jobs.enqueue(1)
+        job = jobs.claim("worker-a", lease_seconds=60)
+        self.assertEqual(job["contract_id"], 1)
+        self.assertEqual(job["status"], jobs.JOB_LEASED)
+        self.assertIsNone(jobs.claim("worker-b", lease_seconds=60))
+
+    def test_expired_lease_is_reclaimed(self):
+        jobs.enqueue(1)
+        jobs.claim("worker-a", lease_seconds=-1)
+        job = jobs.claim("worker-b", lease_seconds=60)
+        self.assertEqual(job["lease_owner"], "worker-b")
+        self.assertEqual(job["attempts"], 2)
+        self.assertFalse(jobs.heartbeat(job["_id"], "worker-a", 60))
+
+    def test_worker_runs_handler_and_completes_job(self):
+        job_id = jobs.enqueue(7)
+        seen = []
+        worker = jobs.Worker(seen.append, worker_id="worker-a", lease_seconds=60)
+        self.assertTrue(worker.run_one())
+        self.assertEqual(seen, [7])
+        self.assertEqual(jobs._jobs().find_one({"_id": job_id})["status"], jobs.JOB_DONE)
+
+    def test_finished_jobs_expire(self):
+        job_id = jobs.enqueue(7)
+        jobs.Worker(lambda contract_id: None, worker_id="worker-a", lease_seconds=60).run_one()
+        self.assertIsNotNone(jobs._jobs().find_one({"_id": job_id})["finished_at"])
+        with self.settings(PARSE_JOB_RETENTION_SECONDS=60):
+            jobs.ensure_indexes()
+        with self.settings(PARSE_JOB_RETENTION_SECONDS=120):
+            jobs.ensure_indexes()
+        index = jobs._jobs().index_information()[jobs.FINISHED_INDEX]
+        self.assertEqual(index["expireAfterSeconds"], 120)
+
+    def test_short_jobs_are_claimed_first(self):
+        jobs.enqueue(1, cost=300)
+        jobs.enqueue(2, cost=1)
+        self.assertEqual(jobs.claim("worker-a", lease_seconds=60)["contract_id"], 2)
+        self.assertEqual(jobs.claim("worker-a", lease_seconds=60)["contract_id"], 1)
+
+    def test_client_backlog_does_not_delay_other_clients(self):
+        jobs._clients().delete_many({})
+        jobs.enqueue_many([1, 2, 3], costs=[60, 60, 60], client="bulk")
+        jobs.enqueue(4, cost=60, client="other")
+        claimed = [jobs.claim("worker-a", lease_seconds=60)["contract_id"] for _ in range(4)]
+        self.assertEqual(claimed[:2], [1, 4])
+        self.assertEqual(claimed[2:], [2, 3])
+
+    def test_cancelled_job_stops_handler(self):
+        job_id = jobs.enqueue(7)
+        seen = []
+        worker = jobs.Worker(None, worker_id="worker-a", lease_seconds=60)
+
+        def handler(contract_id):
+            jobs.cancel(contract_id)
+            worker.cancel(contract_id)
+            jobs.raise_if_cancelled()
+            seen.append(contract_id)
+
+        worker.handler = handler
+        self.assertTrue(worker.run_one())
+        self.assertEqual(seen, [])
+        self.assertEqual(jobs._jobs().find_one({"_id": job_id})["status"], jobs.JOB_CANCELLED)
+        self.assertIsNone(jobs.claim("worker-a", lease_seconds=60))
+
+    def test_reclaimed_job_leaves_completed_contract_alone(self):
+        contract = Contract.objects.create(original_filename="a.pdf", status=Contract.STATUS_COMPLETED, progress=100)
+        job_id = jobs.enqueue(contract.pk)
+        self.assertTrue(jobs.Worker(views._background_parse, worker_id="worker-a", lease_seconds=60).run_one())
+        contract.refresh_from_db()
+        self.assertEqual((contract.status, contract.progress), (Contract.STATUS_COMPLETED, 100))
+        self.assertEqual(jobs._jobs().find_one({"_id": job_id})["status"], jobs.JOB_DONE)
+
+    def test_retry_clears_previous_error(self):
+        contract = Contract.objects.create(
+            original_filename="a.pdf", file="contracts/missing.pdf",
+            status=Contract.STATUS_FAILED, error_message="Timed out",
+        )
+        with mock.patch.object(views, "_extract", return_value=(extraction.empty_fields(), "")):
+            views._background_parse(contract.pk)
+        contract.refresh_from_db()
+        self.assertEqual((contract.status, contract.error_message), (Contract.STATUS_COMPLETED, ""))
+
+    def test_cancel_endpoint_fails_pending_contract(self):
+        contract = Contract.objects.create(original_filename="a.pdf")
+        jobs.enqueue(contract.pk)
+        url = reverse('contract_cancel', args=[contract.pk])
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content), {"status": "failed", "progress": 0, "error": "Cancelled"})
+        self.assertEqual(jobs._jobs().find_one({"contract_id": contract.pk})["status"], jobs.JOB_CANCELLED)
+        self.assertEqual(self.client.post(url).status_code, 409)
+        self.assertEqual(self.client.get(url).status_code, 405)
+
+    def test_cancelling_an_owner_hands_its_duplicates_a_parse(self):
+        owner = Contract.objects.create(original_filename="a.pdf", file="contracts/a.pdf", sha256="ab" * 32)
+        first, second = (dedup.build_duplicate(owner, name) for name in ("b.pdf", "c.pdf"))
+        first.save()
+        second.save()
+        self.assertEqual(self.client.post(reverse('contract_cancel', args=[owner.pk])).status_code, 200)
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.status, first.duplicate_of_id, first.sha256), (Contract.STATUS_PENDING, None, "ab" * 32))
+        self.assertEqual((second.status, second.duplicate_of_id), (Contract.STATUS_PENDING, first.pk))
+        self.assertEqual(jobs._jobs().find_one({"contract_id": first.pk})["status"], jobs.JOB_QUEUED)
+
+    def test_cancelled_duplicate_is_not_completed_by_its_owner(self):
+        owner = Contract.objects.create(original_filename="a.pdf", file="contracts/a.pdf", sha256="cd" * 32)
+        duplicate = dedup.build_duplicate(owner, "b.pdf")
+        duplicate.save()
+        self.client.post(reverse('contract_cancel', args=[duplicate.pk]))
+        Contract.objects.filter(pk=owner.pk).update(status=Contract.STATUS_COMPLETED, progress=100)
+        owner.refresh_from_db()
+        dedup.propagate_to_duplicates(owner)
+        duplicate.refresh_from_db()
+        self.assertEqual((duplicate.status, duplicate.error_message), (Contract.STATUS_FAILED, "Cancelled"))
+
+
+class JobCostTest(SimpleTestCase):
+    def test_cost_follows_size(self):
+        with self.settings(PARSE_JOB_SECONDS_PER_PAGE=1, PARSE_JOB_BYTES_PER_PAGE=1000, PARSE_JOB_MAX_DELAY=30):
+            self.assertEqual(jobs.estimate_cost(4000), 4)
+            self.assertEqual(jobs.estimate_cost(10 ** 6), 30)
+            self.assertEqual(jobs.estimate_cost(0), 0)
+
+    def test_raise_if_cancelled_outside_worker_is_a_no_op(self):
+        jobs.raise_if_cancelled()
+
+
+class ExtractionTest(SimpleTestCase):
+    def test_extract_page_fields(self):
+        text = (
+            "Customer: Acme Corp\n"
+            "Vendor: Globex Ltd\n"
+            "Total Contract Value: USD 12,500.00\n"
+            "Payment terms: Net 30, invoiced monthly by wire transfer.\n"
+            "Vendor guarantees 99.9% uptime.\n"
+        )
+        fields = extract_page_fields(text)
+        self.assertEqual(fields["parties"]["customer"], "Acme Corp")
+        self.assertEqual(fields["parties"]["vendor"], "Globex Ltd")
+        self.assertEqual(fields["financial_details"]["total_value"], 12500)
+        self.assertEqual(fields["financial_details"]["currency"], "USD")
+        self.assertEqual(fields["payment_structure"]["terms"], "Net 30")
+        self.assertEqual(fields["payment_structure"]["method"], "wire transfer")
+        self.assertEqual(fields["sla"]["metrics"], "99.9% uptime")
+
+    def test_field_merger_folds_pages_in_order(self):
+        merger = FieldMerger()
+        merger.add({"parties": {"customer": "Acme", "signatories": ["Jane Doe"]}})
+        merger.add({"parties": {"customer": "Other", "signatories": ["Jane Doe", "John Roe"]}})
+        merged = merger.sections
+        self.assertEqual(merged["parties"]["customer"], "Acme")
+        self.assertEqual(merged["parties"]["signatories"], ["Jane Doe", "John Roe"])
+        self.assertIsNone(merged["parties"]["vendor"])
+        self.assertEqual(set(merged), set(SECTION_FIELDS))
+
+    def test_field_merger_reports_completed_sections(self):
+        merger = FieldMerger()
+        changed, completed = merger.add({"parties": {"customer": "Acme", "signatories": ["Jane Doe"]}})
+        self.assertEqual((changed, completed), ({"parties"}, set()))
+        changed, completed = merger.add({"parties": {"customer": "Other", "vendor": "Globex"}})
+        self.assertEqual((changed, completed), ({"parties"}, {"parties"}))
+        self.assertEqual(merger.sections["parties"]["customer"], "Acme")
+        self.assertEqual(merger.add({"parties": {"vendor": "Initech"}}), (set(), set()))
+
+
+class UploadDeduplicationTest(TestCase):
+    databases = {"default", "mongo"}
+
+    def test_upload_handler_hashes_stream(self):
+        content = b'%PDF-1.4\n%dedup'
+        request = RequestFactory().post("/contracts/upload", {"file": SimpleUploadedFile("a.pdf", content)})
+        hasher = dedup.install_hashing(request)
+        dedup.attach_digests(request, hasher)
+        self.assertEqual(request.FILES["file"].sha256, hashlib.sha256(content).hexdigest())
+
+    def test_reupload_of_completed_contract_reuses_blob_and_fields(self):
+        content = b'%PDF-1.4\n%dedup'
+        first = self.client.post(reverse('contract_upload'), {'file': SimpleUploadedFile("a.pdf", content)})
+        owner = Contract.objects.get(pk=json.loads(first.content)['contract_id'])
+        self.assertEqual(owner.sha256, hashlib.sha256(content).hexdigest())
+        Contract.objects.filter(pk=owner.pk).update(
+            status=Contract.STATUS_COMPLETED, progress=100, score=55, parties={"customer": "Acme"}
+        )
+
+        second = self.client.post(reverse('contract_upload'), {'file': SimpleUploadedFile("b.pdf", content)})
+        duplicate = Contract.objects.get(pk=json.loads(second.content)['contract_id'])
+        self.assertEqual(duplicate.duplicate_of_id, owner.pk)
+        self.assertEqual(duplicate.file.name, owner.file.name)
+        self.assertEqual(duplicate.status, Contract.STATUS_COMPLETED)
+        self.assertEqual(duplicate.score, 55)
+        self.assertEqual(duplicate.parties, {"customer": "Acme"})
+
+
+class ContractDownloadTest(TestCase):
+    databases = {"default", "mongo"}
+
+    def setUp(self):
+        self.content = b'%PDF-1.4\n' + bytes(range(256)) * 4
+        self.contract = Contract.objects.create(
+            file=SimpleUploadedFile("download.pdf", self.content),
+            original_filename="download.pdf",
+        )
+        self.url = reverse('contract_download', args=[self.contract.pk])
+
+    def tearDown(self):
+        self.contract.file.delete(save=False)
+
+    def test_download_streams_full_file(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), self.content)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('ETag', response)
+
+    def test_download_range(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=9-18')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b"".join(response.streaming_content), self.content[9:19])
+        self.assertEqual(response['Content-Range'], f'bytes 9-18/{len(self.content)}')
+
+    def test_download_not_modified(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+
+class ParseRangeTest(SimpleTestCase):
+    def test_parse_range(self):
+        self.assertEqual(parse_range("bytes=0-99", 1000), (0, 99))
+        self.assertEqual(parse_range("bytes=900-", 1000), (900, 999))
+        self.assertEqual(parse_range("bytes=-100", 1000), (900, 999))
+        self.assertIsNone(parse_range("bytes=0-1,5-6", 1000))
+        with self.assertRaises(ValueError):
+            parse_range("bytes=1000-", 1000)
+
+
+class EventBusTest(SimpleTestCase):
+    def test_dispatch_reaches_only_matching_subscribers(self):
+        bus = events.EventBus()
+        watching = bus.subscribe(1)
+        other = bus.subscribe(2)
+        payload = {"status": Contract.STATUS_PROCESSING, "progress": 40, "error": None}
+        bus.dispatch(1, payload)
+        self.assertEqual(watching.get(timeout=0.1), payload)
+        self.assertIsNone(other.get(timeout=0.01))
+
+    def test_closed_subscription_is_removed(self):
+        bus = events.EventBus()
+        with bus.subscribe(1):
+            pass
+        self.assertNotIn(1, bus._subscribers)
+
+    def test_async_subscription_is_fed_from_the_bus_thread(self):
+        bus = events.EventBus()
+        payload = {"status": Contract.STATUS_COMPLETED, "progress": 100, "error": None}
+
+        async def wait_for_event():
+            with bus.subscribe(1, events.AsyncSubscription) as subscription:
+                asyncio.get_running_loop().run_in_executor(None, bus.dispatch, 1, payload)
+                return await subscription.get(timeout=1)
+
+        self.assertEqual(asyncio.run(wait_for_event()), payload)
+
+
+class ContractStatusPushTest(TestCase):
+    databases = {"default", "mongo"}
+
+    def setUp(self):
+        self.contract = Contract.objects.create(
+            original_filename="push.pdf", status=Contract.STATUS_PROCESSING, progress=40
+        )
+        self.status_url = reverse('contract_status', args=[self.contract.pk])
+
+    def test_long_poll_returns_immediately_when_state_changed(self):
+        response = self.client.get(self.status_url, {"wait": 30, "status": "pending", "progress": 0})
+        self.assertEqual(json.loads(response.content)["progress"], 40)
+
+    def test_long_poll_times_out_with_current_state(self):
+        response = self.client.get(self.status_url, {"wait": 0.1, "status": "processing", "progress": 40})
+        self.assertEqual(json.loads(response.content)["status"], Contract.STATUS_PROCESSING)
+
+    def test_event_stream_ends_on_terminal_status(self):
+        Contract.objects.filter(pk=self.contract.pk).update(status=Contract.STATUS_COMPLETED, progress=100)
+        response = self.client.get(reverse('contract_events', args=[self.contract.pk]))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        body = b"".join(response.streaming_content).decode()
+        self.assertIn('"status": "completed"', body)
+
+
+class ContractStatusBatchTest(TestCase):
+    databases = {"default", "mongo"}
+
+    def setUp(self):
+        self.url = reverse('contract_status_batch')
+        self.pending = Contract.objects.create(original_filename="a.pdf")
+        self.failed = Contract.objects.create(
+            original_filename="b.pdf", status=Contract.STATUS_FAILED, error_message="Broken PDF"
+        )
+
+    def test_batch_status(self):
+        response = self.client.get(self.url, {"ids": f"{self.pending.pk},{self.failed.pk},999999"})
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content)
+        self.assertEqual(data['results'][str(self.pending.pk)]['status'], Contract.STATUS_PENDING)
+        self.assertEqual(data['results'][str(self.failed.pk)]['error'], "Broken PDF")
+        self.assertEqual(data['missing'], ["999999"])
+
+    def test_batch_status_changed_since(self):
+        as_of = json.loads(self.client.get(self.url, {"ids": self.pending.pk}).content)['as_of']
+        self.pending.progress = 50
+        self.pending.save()
+        response = self.client.post(
+            self.url,
+            json.dumps({"ids": [self.pending.pk, self.failed.pk], "since": as_of}),
+            content_type="application/json",
+        )
+        results = json.loads(response.content)['results']
+        self.assertEqual(list(results), [str(self.pending.pk)])
+        self.assertEqual(results[str(self.pending.pk)]['progress'], 50)
+
+    def test_batch_status_requires_ids(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 400)
+
+
+class ContractBulkUploadTest(TestCase):
+    databases = {"default", "mongo"}
+
+    def setUp(self):
+        self.url = reverse('contract_bulk_upload')
+
+    def test_bulk_upload_files(self):
+        response = self.client.post(self.url, {'files': [
+            SimpleUploadedFile("one.pdf", b'%PDF-1.4\n%one'),
+            SimpleUploadedFile("notes.txt", b'not a pdf'),
+            SimpleUploadedFile("copy.pdf", b'%PDF-1.4\n%one'),
+        ]})
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content)
+        self.assertEqual((data['accepted'], data['rejected']), (2, 1))
+        first, rejected, copy = data['results']
+        self.assertFalse(first['deduplicated'])
+        self.assertEqual(rejected['error'], "Unsupported file type")
+        self.assertTrue(copy['deduplicated'])
+        self.assertEqual(Contract.objects.get(pk=copy['contract_id']).duplicate_of_id, int(first['contract_id']))
+        self.assertEqual(jobs._jobs().count_documents({"contract_id": int(first['contract_id'])}), 1)
+
+    def test_bulk_upload_zip_body(self):
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, "w") as zf:
+            zf.writestr("contracts/a.pdf", b'%PDF-1.4\n%a')
+            zf.writestr("contracts/b.pdf", b'%PDF-1.4\n%b')
+        response = self.client.post(self.url, archive.getvalue(), content_type="application/zip")
+        data = json.loads(response.content)
+        self.assertEqual([row['filename'] for row in data['results']], ["a.pdf", "b.pdf"])
+        self.assertEqual(data['accepted'], 2)
+
+    def test_bulk_upload_requires_files(self):
+        response = self.client.post(self.url, {})
+        self.assertEqual(response.status_code, 400)
+
+
+class ContractExportTest(TestCase):
+    databases = {"default", "mongo"}
+
+    def test_export_streams_filtered_contracts(self):
+        low = Contract.objects.create(original_filename="low.pdf", status=Contract.STATUS_COMPLETED, score=20)
+        high = Contract.objects.create(
+            original_filename="high.pdf", status=Contract.STATUS_COMPLETED, score=90, parties={"customer": "Acme"}
+        )
+        Contract.objects.create(original_filename="draft.pdf", score=90)
+        url = reverse('contract_export')
+        response = self.client.get(url, {"score_min": 50})
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        rows = [json.loads(line) for line in b"".join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([row['id'] for row in rows], [high.pk])
+        self.assertEqual(rows[0]['parties'], {"customer": "Acme"})
+        response = self.client.get(url, {"format": "csv"})
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[1].startswith(f"{low.pk},low.pdf,completed,20,"))
+        response = self.client.get(url, {"status": ""})
+        self.assertEqual(len(b"".join(response.streaming_content).splitlines()), 3)
+        self.assertEqual(self.client.get(url, {"format": "xml"}).status_code, 400)
+
+
+class ExportFormatTest(SimpleTestCase):
+    doc = {
+        "id": 1, "original_filename": "a.pdf", "status": "completed", "score": 80, "gaps": '["missing_sla"]',
+        "parties": '{"customer": "Acme, Inc.", "signatories": ["Jane Doe", "John Roe"]}',
+        "uploaded_at": datetime(2024, 5, 1, tzinfo=dt_timezone.utc),
+    }
+
+    def test_ndjson_decodes_stored_json(self):
+        row = json.loads(next(export.ndjson_lines([self.doc])))
+        self.assertEqual(row['gaps'], ["missing_sla"])
+        self.assertEqual(row['parties']['customer'], "Acme, Inc.")
+        self.assertEqual(row['sla'], {"metrics": None, "penalties": None, "support": None})
+        self.assertEqual(row['parties']['vendor'], None)
+
+    def test_csv_flattens_sections(self):
+        header, line = [next(csv.reader([text])) for text in export.csv_lines([self.doc])]
+        values = dict(zip(header, line))
+        self.assertEqual(values['parties.customer'], "Acme, Inc.")
+        self.assertEqual(json.loads(values['parties.signatories']), ["Jane Doe", "John Roe"])
+        self.assertEqual(values['parties.vendor'], "")
+        self.assertEqual(values['uploaded_at'], "2024-05-01T00:00:00+00:00")
+
+    def test_chunks_join_lines(self):
+        with mock.patch.object(export, "CHUNK_CHARS", 4):
+            self.assertEqual(list(export.chunks(["ab", "cd", "ef"])), ["abcd", "ef"])
+
+    def test_filters_are_validated(self):
+        filters = pagination.parse_filters({"score_min": "50", "uploaded_after": "2024-05-01T00:00:00"})
+        self.assertEqual(filters['score_min'], 50)
+        self.assertEqual(filters['uploaded_after'], datetime(2024, 5, 1, tzinfo=dt_timezone.utc))
+        with self.assertRaises(ValueError):
+            pagination.parse_filters({"uploaded_before": "yesterday"})
+
+
+class ContractKeysetListTest(TestCase):
+    databases = {"default", "mongo"}
+
+    def test_cursor_pages_cover_all_contracts_once(self):
+        created = [Contract.objects.create(original_filename=f"{i}.pdf") for i in range(5)]
+        list_url = reverse('contract_list')
+        seen, after = [], ""
+        while after is not None:
+            data = json.loads(self.client.get(list_url, {"after": after, "page_size": 2}).content)
+            self.assertNotIn('count', data)
+            seen += [row['id'] for row in data['results']]
+            after = data['next']
+        self.assertEqual(seen, [str(c.pk) for c in reversed(created)])
+
+    def test_cursor_mode_exact_count_and_invalid_cursor(self):
+        Contract.objects.create(original_filename="a.pdf", status=Contract.STATUS_COMPLETED)
+        Contract.objects.create(original_filename="b.pdf")
+        list_url = reverse('contract_list')
+        data = json.loads(self.client.get(list_url, {"after": "", "status": "completed", "count": "exact"}).content)
+        self.assertEqual(data['count'], 1)
+        self.assertEqual(self.client.get(list_url, {"after": "not-a-cursor"}).status_code, 400)
+
+
+class CursorEncodingTest(SimpleTestCase):
+    def test_cursor_round_trip(self):
+        uploaded_at = datetime(2025, 8, 26, 6, 27, 1, 123000, tzinfo=dt_timezone.utc)
+        cursor = pagination.encode_cursor(uploaded_at, 42)
+        self.assertEqual(pagination.decode_cursor(cursor), (uploaded_at, 42))
+
+
+class ContractListFilterTest(TestCase):
+    databases = {"default", "mongo"}
+
+    def setUp(self):
+        for score in (10, 50, 90):
+            Contract.objects.create(original_filename=f"{score}.pdf", status=Contract.STATUS_COMPLETED, score=score)
+        self.list_url = reverse('contract_list')
+
+    def test_score_range_sorted_by_score(self):
+        for params in ({}, {"after": ""}):
+            response = self.client.get(self.list_url, dict(params, score_min=40, sort="-score"))
+            data = json.loads(response.content)
+            self.assertEqual([row['score'] for row in data['results']], [90, 50])
+
+    def test_unindexed_sort_is_rejected(self):
+        response = self.client.get(self.list_url, {"sort": "original_filename"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_invalid_date_filter_is_rejected(self):
+        response = self.client.get(self.list_url, {"uploaded_after": "yesterday"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_page_size_must_be_positive(self):
+        for page_size in ("0", "-5", "ten"):
+            response = self.client.get(self.list_url, {"page_size": page_size})
+            self.assertEqual(response.status_code, 400)
+
+
+class ListIndexSelectionTest(SimpleTestCase):
+    def test_every_sort_has_an_index_with_and_without_status(self):
+        for sort in pagination.SORTS:
+            self.assertTrue(pagination.index_for({}, sort))
+            self.assertTrue(pagination.index_for(pagination.build_query(status="completed", score_min=1), sort))
+
+
+class BatchScoringTest(SimpleTestCase):
+    def test_batch_scores_match_single_contract_scorer(self):
+        docs = [
+            {},
+            {"parties": {"customer": "Acme", "vendor": "Globex"}, "sla": {"metrics": "99.9%"}},
+            {"financial_details": {"line_items": [1], "total_value": 10, "currency": "USD", "taxes": 1},
+             "payment_structure": {"terms": "Net 30", "schedule": None}},
+        ]
+        scores, gaps = scoring.score_batch(docs)
+        for doc, score, doc_gaps in zip(docs, scores, gaps):
+            self.assertEqual(scoring.score_sections(doc), (score, doc_gaps))
+        self.assertEqual(scores[0], 0)
+        self.assertEqual(len(gaps[0]), len(scoring.GAP_LABELS))
+
+    def test_rubric_weights_total_100(self):
+        self.assertEqual(sum(weight for _, weight, _ in scoring.RUBRIC), 100)
+
+
+class RubricVersionTest(TestCase):
+    databases = {"default", "mongo"}
+
+    def test_stale_score_is_refreshed_on_detail(self):
+        contract = Contract.objects.create(
+            original_filename="old.pdf",
+            status=Contract.STATUS_COMPLETED,
+            parties={"customer": "Acme", "vendor": "Globex", "signatories": []},
+            score=3,
+            gaps=[],
+            rubric_version=0,
+        )
+        self.assertTrue(rescoring.is_stale(contract))
+        data = json.loads(self.client.get(reverse('contract_detail', args=[contract.pk])).content)
+        expected_score, expected_gaps = scoring.score_sections({"parties": contract.parties})
+        self.assertEqual(data['score'], expected_score)
+        self.assertEqual(data['gaps'], expected_gaps)
+        contract.refresh_from_db()
+        self.assertEqual(contract.rubric_version, scoring.RUBRIC_VERSION)
+        self.assertFalse(rescoring.is_stale(contract))
+
+    def test_only_completed_contracts_are_stale(self):
+        contract = Contract(status=Contract.STATUS_PROCESSING, rubric_version=0)
+        self.assertFalse(rescoring.is_stale(contract))
+
+
+class DetailCacheTest(SimpleTestCase):
+    def test_lru_evicts_least_recently_used_within_byte_budget(self):
+        cache = detail_cache.DetailCache(max_bytes=10)
+        cache.put(1, detail_cache.make_entry(b"aaaa"), cache.generation())
+        cache.put(2, detail_cache.make_entry(b"bbbb"), cache.generation())
+        cache.get(1)
+        cache.put(3, detail_cache.make_entry(b"cccc"), cache.generation())
+        self.assertIsNotNone(cache.get(1))
+        self.assertIsNone(cache.get(2))
+        self.assertIsNotNone(cache.get(3))
+
+    def test_store_racing_an_invalidation_is_dropped(self):
+        cache = detail_cache.DetailCache(max_bytes=1024)
+        generation = cache.generation()
+        cache.invalidate(7)
+        self.assertFalse(cache.put(7, detail_cache.make_entry(b"{}"), generation))
+        self.assertTrue(cache.put(7, detail_cache.make_entry(b"{}"), cache.generation()))
+
+
+class ContractDetailCacheTest(TestCase):
+    databases = {"default", "mongo"}
+
+    def test_etag_revalidation_returns_304(self):
+        contract = Contract.objects.create(
+            original_filename="a.pdf", status=Contract.STATUS_COMPLETED, rubric_version=scoring.RUBRIC_VERSION
+        )
+        url = reverse('contract_detail', args=[contract.pk])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_partial_detail_while_processing(self):
+        contract = Contract.objects.create(
+            original_filename="a.pdf",
+            status=Contract.STATUS_PROCESSING,
+            progress=40,
+            parties={"customer": "Acme Corp"},
+        )
+        url = reverse('contract_detail', args=[contract.pk])
+        self.assertEqual(self.client.get(url).status_code, 409)
+        response = self.client.get(url, {"partial": "1"})
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content)
+        self.assertTrue(data['partial'])
+        self.assertEqual(data['progress'], 40)
+        self.assertEqual(data['parties']['customer'], "Acme Corp")
+        self.assertIsNone(data['score'])
+        Contract.objects.filter(pk=contract.pk).update(status=Contract.STATUS_FAILED)
+        self.assertEqual(self.client.get(url, {"partial": "1"}).status_code, 409)
+
+    def test_invalidation_serves_fresh_detail(self):
+        contract = Contract.objects.create(
+            original_filename="a.pdf", status=Contract.STATUS_COMPLETED, rubric_version=scoring.RUBRIC_VERSION
+        )
+        url = reverse('contract_detail', args=[contract.pk])
+        etag = self.client.get(url)["ETag"]
+        Contract.objects.filter(pk=contract.pk).update(score=42)
+        detail_cache.invalidate(contract.pk)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)['score'], 42)
+
+
+class AnalyticsRollupTest(SimpleTestCase):
+    def test_completed_parse_increments(self):
+        increments = analytics.rollup_increments(
+            Contract.STATUS_COMPLETED, 100, ["Missing parties.vendor", "Missing old.field"]
+        )
+        self.assertEqual(
+            increments,
+            {"completed": 1, "score_total": 100, "scores.90": 1, "gaps.parties:vendor": 1},
+        )
+
+    def test_failed_parse_increments(self):
+        self.assertEqual(analytics.rollup_increments(Contract.STATUS_FAILED, 0, []), {"failed": 1})
+
+    def test_rescore_moves_score_and_gaps(self):
+        increments = analytics.rescore_increments(
+            45, ["Missing parties.vendor", "Missing sla.support"], 95, ["Missing sla.support"]
+        )
+        self.assertEqual(
+            increments,
+            {"score_total": 50, "scores.40": -1, "scores.90": 1, "gaps.parties:vendor": -1},
+        )
+
+
+class ContractAnalyticsTest(TestCase):
+    databases = {"default", "mongo"}
+
+    def test_summary_counts_statuses_and_recorded_parses(self):
+        contract = Contract.objects.create(
+            original_filename="a.pdf", status=Contract.STATUS_COMPLETED, score=55, gaps=["Missing sla.support"]
+        )
+        Contract.objects.create(original_filename="b.pdf")
+        analytics.record_parse(contract)
+        response = self.client.get(reverse('contract_analytics'), {"days": 7})
+        data = json.loads(response.content)
+        self.assertEqual(data['status_counts'], {"completed": 1, "pending": 1})
+        self.assertEqual(len(data['days']), 7)
+        self.assertEqual(data['days'][-1]['completed'], 1)
+        self.assertEqual(data['days'][-1]['average_score'], 55.0)
+        self.assertEqual(data['top_gaps'], [{"gap": "Missing sla.support", "count": 1}])
+        self.assertEqual(self.client.get(reverse('contract_analytics'), {"days": 0}).status_code, 400)
+
+
+class SearchTextTest(SimpleTestCase):
+    def test_page_text_is_normalized_and_capped(self):
+        pages = [("Master  Services\nAgreement", {}), ("\tNet 30 ", {})]
+        self.assertEqual(extraction.contract_fields(pages)[1], "Master Services Agreement Net 30")
+        text = SearchText(limit=6)
+        for page, _ in pages:
+            text.add(page)
+        self.assertEqual(text.text(), "Master")
+
+
+class ContractSearchTest(TestCase):
+    databases = {"default", "mongo"}
+
+    def test_q_ranks_matching_contracts_and_applies_filters(self):
+        hosting = Contract.objects.create(
+            original_filename="hosting.pdf",
+            status=Contract.STATUS_COMPLETED,
+            rubric_version=scoring.RUBRIC_VERSION,
+        )
+        lease = Contract.objects.create(
+            original_filename="lease.pdf",
+            status=Contract.STATUS_COMPLETED,
+            rubric_version=scoring.RUBRIC_VERSION,
+        )
+        draft = Contract.objects.create(original_filename="draft.pdf")
+        search.sync([hosting.pk, lease.pk, draft.pk])
+        search.store(hosting.pk, "Managed hosting agreement with uptime credits")
+        search.store(lease.pk, "Office lease agreement")
+        search.store(draft.pk, "hosting draft")
+        list_url = reverse('contract_list')
+        data = json.loads(self.client.get(list_url, {"q": "hosting", "status": "completed"}).content)
+        self.assertEqual([row['id'] for row in data['results']], [str(hosting.pk)])
+        self.assertIsNone(data['next'])
+        data = json.loads(self.client.get(list_url, {"q": '"lease agreement"'}).content)
+        self.assertEqual([row['original_filename'] for row in data['results']], ["lease.pdf"])
+
+    def test_q_pages_with_a_cursor(self):
+        contracts = [
+            Contract.objects.create(original_filename=f"{n}.pdf", status=Contract.STATUS_COMPLETED) for n in range(3)
+        ]
+        search.sync([contract.pk for contract in contracts])
+        search.store_texts({contract.pk: "Support agreement" for contract in contracts})
+        list_url = reverse('contract_list')
+        seen, after = [], None
+        while True:
+            params = {"q": "support", "page_size": 2, "sort": "-uploaded_at"}
+            if after:
+                params["after"] = after
+            data = json.loads(self.client.get(list_url, params).content)
+            seen += [row['id'] for row in data['results']]
+            after = data['next']
+            if after is None:
+                break
+        self.assertEqual(seen, [str(contract.pk) for contract in reversed(contracts)])
+        self.assertEqual(self.client.get(list_url, {"q": "support", "after": "x"}).status_code, 400)
+
+    def test_duplicates_are_found_through_their_owner(self):
+        owner = Contract.objects.create(original_filename="msa.pdf", status=Contract.STATUS_COMPLETED)
+        duplicate = dedup.build_duplicate(owner, "copy.pdf")
+        duplicate.save()
+        search.sync([duplicate.pk])
+        search.store(owner.pk, "Master services agreement")
+        data = json.loads(self.client.get(reverse('contract_list'), {"q": "services"}).content)
+        self.assertEqual(sorted(row['id'] for row in data['results']), sorted([str(owner.pk), str(duplicate.pk)]))
+        self.assertEqual(search.get_search_collection().count_documents({}), 1)
+
+
+class PageArtifactTest(SimpleTestCase):
+    def setUp(self):
+        self.root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.root.cleanup)
+        override = self.settings(CONTRACT_ARTIFACT_ROOT=self.root.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_pages_round_trip(self):
+        texts = ["Customer: Acme Corp", "", "Net 30 € 1,000.00"]
+        artifacts.write_pages(7, texts)
+        with artifacts.open_pages(7) as pages:
+            self.assertEqual(len(pages), 3)
+            self.assertEqual(pages.page(2), texts[2])
+            self.assertEqual(list(pages), texts)
+
+    def test_reextract_artifact_matches_fields_from_text(self):
+        artifacts.write_pages(8, ["Customer: Acme Corp\nVendor: Globex Ltd"])
+        _, sections, text = extraction.reextract_artifact(8)
+        self.assertEqual(sections["parties"]["customer"], "Acme Corp")
+        self.assertEqual(text, "Customer: Acme Corp Vendor: Globex Ltd")
+        self.assertEqual(extraction.reextract_artifact(9), (9, None, None))
+
+    def test_page_writer_only_replaces_artifact_on_commit(self):
+        artifacts.write_pages(7, ["old"])
+        with self.assertRaises(RuntimeError):
+            with artifacts.PageWriter(7, 2) as writer:
+                writer.add("new")
+                raise RuntimeError
+        writer = artifacts.PageWriter(7, 2)
+        writer.add("new")
+        with self.assertRaises(artifacts.ArtifactError):
+            writer.commit()
+        with artifacts.open_pages(7) as pages:
+            self.assertEqual(list(pages), ["old"])
+        self.assertEqual([path.name for path in artifacts.artifact_path(7).parent.iterdir()], ["7.pages"])
+
+    def test_truncated_artifact_is_rejected(self):
+        path = artifacts.write_pages(7, ["x" * 1000])
+        path.write_bytes(path.read_bytes()[:20])
+        with self.assertRaises(artifacts.ArtifactError):
+            artifacts.open_pages(7)
+
+
+class ProgressTrackerTest(SimpleTestCase):
+    class FakeContract:
+        pk = 1
+        progress = 10
+        status = Contract.STATUS_PROCESSING
+        error_message = ""
+
+    def test_progress_writes_are_coalesced(self):
+        contract = self.FakeContract()
+        tracker = progress.ProgressTracker(contract, flush_interval=3600, publish_interval=3600)
+        with mock.patch.object(progress.repository, "update") as update:
+            for value in range(11, 81):
+                tracker.update(value)
+        self.assertEqual(contract.progress, 80)
+        self.assertEqual(update.call_count, 0)
+
+    def test_flush_interval_bounds_staleness(self):
+        contract = self.FakeContract()
+        tracker = progress.ProgressTracker(contract, flush_interval=0, publish_interval=3600)
+        with mock.patch.object(progress.repository, "update") as update:
+            tracker.update(20)
+            tracker.update(20)
+        update.assert_called_once_with(1, progress=20)
+
+    def test_completed_sections_are_written_at_once(self):
+        contract = self.FakeContract()
+        tracker = progress.ProgressTracker(contract, flush_interval=3600, publish_interval=3600)
+        with mock.patch.object(progress.repository, "update") as update:
+            tracker.add_sections({"sla": {"metrics": None}})
+            self.assertEqual(update.call_count, 0)
+            tracker.add_sections({"parties": {"customer": "Acme"}}, complete=True)
+        update.assert_called_once_with(
+            1, progress=10, sla={"metrics": None}, parties={"customer": "Acme"}
+        )
+
+    def test_table_drops_expired_and_discarded_entries(self):
+        table = progress.ProgressTable(ttl=60)
+        table.put(1, {"status": Contract.STATUS_PROCESSING, "progress": 40, "error": None})
+        self.assertEqual(table.get(1)["progress"], 40)
+        table.discard(1)
+        self.assertIsNone(table.get(1))
+        expired = progress.ProgressTable(ttl=-1)
+        expired.put(2, {"status": Contract.STATUS_PROCESSING, "progress": 40, "error": None})
+        self.assertIsNone(expired.get(2))
+
+
+class SyntheticContractTest(SimpleTestCase):
+    def test_synthetic_pdf_extracts_every_scored_field(self):
+        with tempfile.NamedTemporaryFile(suffix=".pdf") as f:
+            f.write(synthetic.contract_pdf(pages=5, seed=3))
+            f.flush()
+            pages = list(extraction.iter_pages(f.name, processes=1))
+        self.assertEqual(len(pages), 5)
+        sections, _ = extraction.contract_fields(pages)
+        self.assertEqual(scoring.score_sections(sections), (100, []))
+
+    def test_streamed_pages_match_batch_extraction(self):
+        with tempfile.NamedTemporaryFile(suffix=".pdf") as f:
+            f.write(synthetic.contract_pdf(pages=6, seed=4))
+            f.flush()
+            pages = list(extraction.iter_pages(f.name, processes=1))
+            streamed = list(extraction.iter_pages(f.name, processes=2, pages_per_task=1))
+            # Over the limit from the first page, then only growing past it again on the fourth.
+            rss = mock.patch.object(extraction, "_rss_bytes", side_effect=[10, 10, 9, 12, 12, 11])
+            opened = mock.patch.object(extraction, "PdfReader", wraps=extraction.PdfReader)
+            with rss, opened as reader:
+                reopened = list(extraction.iter_page_range(f.name, 0, 6, memory_limit=5))
+        self.assertEqual(streamed, pages)
+        self.assertEqual(reopened, pages)
+        self.assertEqual(reader.call_count, 3)
+
+    def test_same_seed_same_bytes(self):
+        self.assertEqual(synthetic.contract_pdf(2, seed=1), synthetic.contract_pdf(2, seed=1))
+        self.assertNotEqual(synthetic.contract_pdf(2, seed=1), synthetic.contract_pdf(2, seed=2))
+
+
+class ContractVersionTest(SimpleTestCase):
+    def setUp(self):
+        self.root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.root.cleanup)
+        override = self.settings(CONTRACT_ARTIFACT_ROOT=self.root.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        pages = synthetic.contract_pages(6, seed=5)
+        # Page 3 amended, a page inserted before the last one and the last one dropped.
+        self.paths = []
+        for texts in (pages, pages[:2] + ["Customer: Amended Corp\n" + pages[2]] + pages[3:5] + ["Schedule B"]):
+            path = f"{self.root.name}/v{len(self.paths) + 1}.pdf"
+            with open(path, "wb") as f:
+                f.write(synthetic.build_pdf(texts))
+            self.paths.append(path)
+
+    def test_unchanged_pages_keep_their_fingerprint(self):
+        old, new = (extraction.fingerprint_pages(path) for path in self.paths)
+        self.assertEqual(len(new), 6)
+        self.assertEqual(new[:2] + new[3:5], old[:2] + old[3:5])
+        self.assertNotIn(new[2], old)
+        self.assertNotIn(new[5], old)
+
+    def test_iter_pages_extracts_only_the_given_pages(self):
+        pages = list(extraction.iter_pages(self.paths[0], processes=1))
+        subset = list(extraction.iter_pages(self.paths[0], processes=1, pages_per_task=2, numbers=[0, 2, 3, 5]))
+        self.assertEqual(subset, [pages[number] for number in (0, 2, 3, 5)])
+
+    def test_version_reuses_parent_pages(self):
+        parent_pages = list(extraction.iter_pages(self.paths[0], processes=1))
+        artifacts.write_pages(1, [text for text, _ in parent_pages])
+        fingerprints = extraction.fingerprint_pages(self.paths[1])
+        parent = versions.ParentPages(1, extraction.fingerprint_pages(self.paths[0]), artifacts.open_pages(1))
+        self.addCleanup(parent.close)
+
+        extracting = mock.patch.object(extraction, "iter_page_range", wraps=extraction.iter_page_range)
+        with extracting as extracted, self.settings(PARSE_PROCESSES=1):
+            pages = list(versions.iter_pages(self.paths[1], fingerprints, parent))
+        self.assertEqual([call.args[1:3] for call in extracted.call_args_list], [(2, 3), (5, 6)])
+        self.assertEqual(pages, list(extraction.iter_pages(self.paths[1], processes=1)))
+
+        diff = versions.page_diff(parent, fingerprints)
+        self.assertEqual((diff["parent"], diff["pages"], diff["unchanged"], diff["reused"]), ("1", 6, 4, 4))
+        self.assertEqual(diff["changes"], [
+            {"op": "replace", "parent_pages": [3, 3], "pages": [3, 3]},
+            {"op": "replace", "parent_pages": [6, 6], "pages": [6, 6]},
+        ])
+
+
+class MetricsTest(SimpleTestCase):
+    def test_histogram_renders_cumulative_buckets(self):
+        histogram = metrics.Histogram("test_seconds", "Test.", ("view",), buckets=(0.1, 1))
+        metrics.REGISTRY.remove(histogram)
+        for value in (0.05, 0.5, 5):
+            histogram.observe(value, view="a")
+        self.assertEqual(
+            histogram.render()[2:],
+            [
+                'test_seconds_bucket{view="a",le="0.1"} 1',
+                'test_seconds_bucket{view="a",le="1.0"} 2',
+                'test_seconds_bucket{view="a",le="+Inf"} 3',
+                'test_seconds_sum{view="a"} 5.55',
+                'test_seconds_count{view="a"} 3',
+            ],
+        )
+
+    def test_metrics_endpoint_reports_view_latency(self):
+        self.client.get(reverse('metrics'))
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response['Content-Type'], metrics.CONTENT_TYPE)
+        self.assertIn(
+            'contracts_http_request_duration_seconds_count{view="metrics",method="GET",status="2xx"}',
+            response.content.decode(),
+        )
+
+    def test_middleware_records_async_views(self):
+        async def view(request):
+            return HttpResponse("ok")
+
+        middleware = metrics.MetricsMiddleware(view)
+        self.assertTrue(asyncio.iscoroutinefunction(middleware))
+        response = asyncio.run(middleware(RequestFactory().get("/")))
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(metrics._current())
+
+
+class RepositoryDocumentTest(SimpleTestCase):
+    def test_document_loads_like_an_only_query(self):
+        contract = repository.from_document({"id": 7, "status": "completed", "gaps": '["Missing sla.metrics"]', "parties": "{}"})
+        self.assertEqual(contract.pk, 7)
+        self.assertEqual(contract.gaps, ["Missing sla.metrics"])
+        self.assertEqual(contract.parties, {})
+        self.assertFalse(contract._state.adding)
+        self.assertIn("sha256", contract.get_deferred_fields())
+
+    def test_json_fields_are_encoded_for_writes(self):
+        doc = repository.to_document({
+            "gaps": ["Missing sla.metrics"], "parties": {"customer": "Acme", "vendor": None, "signatories": []}, "score": 3,
+        })
+        self.assertEqual(doc["gaps"], str(scoring.gap_mask(["Missing sla.metrics"])))
+        self.assertEqual(doc["parties"], '{"customer": "Acme"}')
+        self.assertEqual(doc["score"], 3)
+        self.assertIn("updated_at", doc)
+
+    def test_gap_bitmask_round_trips_in_rubric_order(self):
+        labels = list(scoring.GAP_LABELS)
+        self.assertEqual(scoring.gap_labels(scoring.gap_mask(reversed(labels))), labels)
+        self.assertEqual(scoring.gap_labels(0), [])
+        contract = repository.from_document({"id": 7, "gaps": str(scoring.gap_mask(["Missing sla.support"]))})
+        self.assertEqual(contract.gaps, ["Missing sla.support"])
+        with self.assertRaises(ValueError):
+            scoring.gap_mask(["Missing nothing"])
+
+    def test_page_number_clamps_like_paginator(self):
+        self.assertEqual(pagination.page_number("2", 3), 2)
+        self.assertEqual(pagination.page_number("9", 3), 3)
+        self.assertEqual(pagination.page_number("x", 3), 1)
+
+
+class RepositoryTransitionTest(TestCase):
+    databases = {"default", "mongo"}
+
+    def test_transition_returns_updated_contract(self):
+        contract = Contract.objects.create(original_filename="a.pdf")
+        moved = repository.transition(contract.pk, Contract.STATUS_PROCESSING, progress=10)
+        self.assertEqual((moved.status, moved.progress), (Contract.STATUS_PROCESSING, 10))
+        self.assertEqual(Contract.objects.get(pk=contract.pk).status, Contract.STATUS_PROCESSING)
+
+    def test_guarded_transition_leaves_completed_contract(self):
+        contract = Contract.objects.create(original_filename="a.pdf", status=Contract.STATUS_COMPLETED)
+        self.assertIsNone(
+            repository.transition(contract.pk, Contract.STATUS_FAILED, from_statuses=[Contract.STATUS_PROCESSING])
+        )
+        self.assertEqual(Contract.objects.get(pk=contract.pk).status, Contract.STATUS_COMPLETED)
+
+
+class AsyncContractViewsTest(TestCase):
+    databases = {"default", "mongo"}
+
+    def test_async_detail_matches_sync_detail(self):
+        contract = Contract.objects.create(
+            original_filename="a.pdf", status=Contract.STATUS_COMPLETED, rubric_version=scoring.RUBRIC_VERSION,
+            parties={"customer": "Acme"},
+        )
+        sync_body = self.client.get(reverse('contract_detail', args=[contract.pk])).content
+        detail_cache.invalidate(contract.pk)
+        response = async_to_sync(async_views.contract_detail)(RequestFactory().get("/"), contract.pk)
+        self.assertEqual(response.content, sync_body)
+
+    def test_async_list_and_status(self):
+        contract = Contract.objects.create(original_filename="a.pdf", status=Contract.STATUS_PROCESSING, progress=40)
+        response = async_to_sync(async_views.contract_list)(RequestFactory().get("/", {"after": ""}))
+        self.assertEqual(json.loads(response.content)["results"][0]["id"], str(contract.pk))
+        response = async_to_sync(async_views.contract_status)(RequestFactory().get("/"), contract.pk)
+        self.assertEqual(json.loads(response.content)["progress"], 40)
@@ -1,13 +1,24 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+# Read endpoints that have native async versions (contracts/async_views.py).
+reads = async_views if settings.CONTRACT_ASYNC_VIEWS else views
 
 
 urlpatterns = [
     path("contracts/upload", views.contract_upload, name="contract_upload"),
-    path("contracts/<int:contract_id>/status", views.contract_status, name="contract_status"),
-    path("contracts/<int:contract_id>", views.contract_detail, name="contract_detail"),
-    path("contracts", views.contract_list, name="contract_list"),
+    path("contracts/upload/bulk", views.contract_bulk_upload, name="contract_bulk_upload"),
+    path("contracts/status", views.contract_status_batch, name="contract_status_batch"),
+    path("contracts/analytics", views.contract_analytics, name="contract_analytics"),
+    path("contracts/export", views.contract_export, name="contract_export"),
+    path("contracts/<int:contract_id>/status", reads.contract_status, name="contract_status"),
+    path("contracts/<int:contract_id>/events", views.contract_events, name="contract_events"),
+    path("contracts/<int:contract_id>/cancel", views.contract_cancel, name="contract_cancel"),
+    path("contracts/<int:contract_id>", reads.contract_detail, name="contract_detail"),
+    path("contracts", reads.contract_list, name="contract_list"),
     path("contracts/<int:contract_id>/download", views.contract_download, name="contract_download"),
+    path("metrics", views.metrics_view, name="metrics"),
 ]
 
 
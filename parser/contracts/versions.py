@@ -0,0 +1,132 @@
+"""Incremental re-parse of amended contract versions.
+
+An upload can name the ``parent`` contract it amends. The new version's pages
+are fingerprinted (:func:`contracts.extraction.fingerprint_pages`), and every
+page whose fingerprint the parent also has takes its text from the parent's
+page artifact instead of being extracted from the PDF; only the field
+extractors run over it again. For an amendment that touches a few pages, the
+parse decodes just those pages. The fingerprints are then aligned with the
+parent's into a page diff, which is stored on the version and returned by
+the detail endpoint.
+
+A parent's fingerprints are computed from its PDF the first time a version
+needs them and kept on the parent. A parent that is not completed, or whose
+artifact is missing, is ignored and the version is parsed in full.
+"""
+import difflib
+import logging
+
+from . import artifacts, extraction, repository
+from .models import Contract
+from .mongo import get_collection
+
+logger = logging.getLogger(__name__)
+
+PARENT_FIELDS = ("id", "file", "status", "duplicate_of_id", "page_fingerprints")
+
+
+class ParentPages:
+    """The pages of a parent contract, looked up by fingerprint."""
+
+    def __init__(self, contract_id: int, fingerprints: list, artifact: artifacts.PageArtifact):
+        self.contract_id = contract_id
+        self.fingerprints = fingerprints
+        self.artifact = artifact
+        self._numbers = {}
+        for number, fingerprint in enumerate(fingerprints):
+            self._numbers.setdefault(fingerprint, number)
+
+    def find(self, fingerprint: str):
+        """The parent's page number with this fingerprint, or None."""
+        return self._numbers.get(fingerprint)
+
+    def text(self, number: int) -> str:
+        return self.artifact.page(number)
+
+    def close(self) -> None:
+        self.artifact.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def open_parent(contract_id: int):
+    """:class:`ParentPages` for a parent contract, or None if it cannot be reused."""
+    parent = repository.get(contract_id, PARENT_FIELDS)
+    if parent is None or parent.status != Contract.STATUS_COMPLETED:
+        return None
+    try:
+        # Duplicates were never parsed themselves; their owner has the artifact.
+        artifact = artifacts.open_pages(parent.duplicate_of_id or parent.pk)
+    except (OSError, artifacts.ArtifactError):
+        logger.info("Parent contract %s has no page artifact; parsing in full", contract_id)
+        return None
+    fingerprints = parent.page_fingerprints
+    if not fingerprints:
+        try:
+            fingerprints = extraction.fingerprint_pages(parent.file.path)
+        except Exception:
+            logger.warning("Could not fingerprint parent contract %s", contract_id, exc_info=True)
+            artifact.close()
+            return None
+        get_collection(Contract).update_one(
+            {"id": parent.pk},
+            {"$set": {"page_fingerprints": repository.encode_field("page_fingerprints", fingerprints)}},
+        )
+    if len(fingerprints) != len(artifact):
+        # The artifact is from another parse of the parent than its fingerprints.
+        artifact.close()
+        return None
+    return ParentPages(parent.pk, fingerprints, artifact)
+
+
+def iter_pages(path: str, fingerprints: list, parent: ParentPages):
+    """Yield ``(text, fields)`` for every page of the PDF at ``path``, in page order.
+
+    Pages ``parent`` has are read from its artifact; only the others are
+    extracted from the PDF.
+    """
+    sources = [parent.find(fingerprint) for fingerprint in fingerprints]
+    changed = [number for number, source in enumerate(sources) if source is None]
+    extracted = extraction.iter_pages(path, total=len(fingerprints), numbers=changed)
+    try:
+        for source in sources:
+            if source is None:
+                yield next(extracted)
+            else:
+                text = parent.text(source)
+                yield text, extraction.extract_page_fields(text)
+    finally:
+        extracted.close()
+
+
+def _span(start: int, stop: int):
+    return [start + 1, stop] if stop > start else None
+
+
+def page_diff(parent: ParentPages, fingerprints: list) -> dict:
+    """Align a version's page fingerprints with its parent's.
+
+    ``changes`` lists the ``replace``, ``insert`` and ``delete`` edits from
+    the parent to the version, each with the 1-based, inclusive page range it
+    covers on either side (null for an empty side). ``unchanged`` counts the
+    pages in place, ``reused`` those whose text came from the parent,
+    including pages that moved.
+    """
+    matcher = difflib.SequenceMatcher(None, parent.fingerprints, fingerprints, autojunk=False)
+    opcodes = matcher.get_opcodes()
+    return {
+        "parent": str(parent.contract_id),
+        "pages": len(fingerprints),
+        "parent_pages": len(parent.fingerprints),
+        "unchanged": sum(j2 - j1 for op, _, _, j1, j2 in opcodes if op == "equal"),
+        "reused": sum(1 for fingerprint in fingerprints if parent.find(fingerprint) is not None),
+        "changes": [
+            {"op": op, "parent_pages": _span(i1, i2), "pages": _span(j1, j2)}
+            for op, i1, i2, j1, j2 in opcodes
+            if op != "equal"
+        ],
+    }
@@ -1,185 +1,591 @@
-import threading
+import json
+import logging
 import time
-from django.core.paginator import Paginator
-from django.http import JsonResponse, HttpResponse, Http404
-from django.shortcuts import get_object_or_404
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse, Http404, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.http import parse_etags
 from django.utils.text import get_valid_filename
+from . import analytics, artifacts, bulk, dedup, detail_cache, events, export, jobs, metrics, pagination, progress, repository, rescoring, scoring, search, versions
+from .downloads import serve_file
+from .extraction import FieldMerger, SearchText, count_pages, fingerprint_pages, full_section, iter_pages
 from .models import Contract
+from .mongo import get_collection
 
+logger = logging.getLogger(__name__)
 
-def _score_and_gaps(contract: Contract) -> None:
-    score = 0
-    gaps = []
-    # Financial completeness (30)
-    financial = contract.financial_details or {}
-    financial_fields = ["line_items", "total_value", "currency", "taxes"]
-    have_financial = sum(1 for f in financial_fields if financial.get(f))
-    score += int(30 * (have_financial / len(financial_fields)))
-    for f in financial_fields:
-        if not financial.get(f):
-            gaps.append(f"Missing financial_details.{f}")
-
-    # Party identification (25)
-    parties = contract.parties or {}
-    party_fields = ["customer", "vendor", "signatories"]
-    have_parties = sum(1 for f in party_fields if parties.get(f))
-    score += int(25 * (have_parties / len(party_fields)))
-    for f in party_fields:
-        if not parties.get(f):
-            gaps.append(f"Missing parties.{f}")
-
-    # Payment terms (20)
-    payment = contract.payment_structure or {}
-    payment_fields = ["terms", "schedule", "method", "banking"]
-    have_payment = sum(1 for f in payment_fields if payment.get(f))
-    score += int(20 * (have_payment / len(payment_fields)))
-    for f in payment_fields:
-        if not payment.get(f):
-            gaps.append(f"Missing payment_structure.{f}")
-
-    # SLA (15)
-    sla = contract.sla or {}
-    sla_fields = ["metrics", "penalties", "support"]
-    have_sla = sum(1 for f in sla_fields if sla.get(f))
-    score += int(15 * (have_sla / len(sla_fields)))
-    for f in sla_fields:
-        if not sla.get(f):
-            gaps.append(f"Missing sla.{f}")
-
-    # Contact info (10)
-    account = contract.account_info or {}
-    contact_fields = ["billing_contact", "technical_contact"]
-    have_contact = sum(1 for f in contact_fields if account.get(f))
-    score += int(10 * (have_contact / len(contact_fields)))
-    for f in contact_fields:
-        if not account.get(f):
-            gaps.append(f"Missing account_info.{f}")
-
-    contract.score = score
-    contract.gaps = gaps
+BATCH_STATUS_MAX_IDS = 1000
+ANALYTICS_MAX_DAYS = 366
+PARTIAL_STATUSES = {Contract.STATUS_PENDING, Contract.STATUS_PROCESSING}
+CANCELLED_ERROR = "Cancelled"
 
 
 def _background_parse(contract_id: int) -> None:
-    contract = Contract.objects.get(pk=contract_id)
+    # A contract cancelled after its job was claimed stays cancelled, and one
+    # completed under an earlier lease of the job is not parsed again.
+    contract = repository.transition(
+        contract_id, Contract.STATUS_PROCESSING,
+        from_statuses=(Contract.STATUS_PENDING, Contract.STATUS_PROCESSING, Contract.STATUS_FAILED),
+        fields=repository.PARSE_FIELDS, where={"error_message": {"$ne": CANCELLED_ERROR}},
+        progress=10, error_message="",
+    )
+    if contract is None:
+        current = repository.get(contract_id, ("id", "status"))
+        if current is None:
+            raise Contract.DoesNotExist(f"Contract {contract_id} does not exist")
+        if current.status == Contract.STATUS_COMPLETED:
+            return
+        raise jobs.JobCancelled()
     try:
-        contract.status = Contract.STATUS_PROCESSING
-        contract.progress = 10
-        contract.save(update_fields=["status", "progress"])
-
-        # Simulate parsing work
-        time.sleep(0.5)
-        contract.progress = 40
-        contract.save(update_fields=["progress"])
-
-        # Minimal dummy extraction structure
-        contract.parties = {"customer": None, "vendor": None, "signatories": None}
-        contract.account_info = {"billing_contact": None, "technical_contact": None}
-        contract.financial_details = {"line_items": None, "total_value": None, "currency": None, "taxes": None}
-        contract.payment_structure = {"terms": None, "schedule": None, "method": None, "banking": None}
-        contract.revenue_classification = {"type": None, "billing_cycle": None, "renewal": None}
-        contract.sla = {"metrics": None, "penalties": None, "support": None}
-        time.sleep(0.5)
+        events.publish(contract)
+        search.sync([contract.pk])
+        jobs.raise_if_cancelled()
+        tracker = progress.ProgressTracker(contract)
+        stage = metrics.PARSE_STAGE_SECONDS.time
+        with stage(stage="extraction"):
+            sections, text = _extract(contract, tracker)
+        for field, value in sections.items():
+            setattr(contract, field, value)
         contract.progress = 80
-        _score_and_gaps(contract)
+        with stage(stage="scoring"):
+            scoring.score_contract(contract)
         contract.status = Contract.STATUS_COMPLETED
         contract.progress = 100
-        contract.save()
+        result_fields = repository.PARSE_RESULT_FIELDS
+        if contract.parent_id:
+            result_fields += repository.VERSION_RESULT_FIELDS
+        with stage(stage="save"):
+            search.store(contract.pk, text)
+            saved = repository.update(
+                contract.pk,
+                where={"status": Contract.STATUS_PROCESSING},
+                **{field: getattr(contract, field) for field in result_fields},
+            )
+        if not saved:
+            raise jobs.JobCancelled()  # Cancelled while scoring; keep the cancellation.
+    except jobs.JobCancelled:
+        raise
     except Exception as exc:
         contract.status = Contract.STATUS_FAILED
         contract.error_message = str(exc)
-        contract.save(update_fields=["status", "error_message"])
+        failed = repository.update(
+            contract.pk, where={"status": Contract.STATUS_PROCESSING},
+            status=contract.status, error_message=contract.error_message,
+        )
+        if not failed:
+            raise jobs.JobCancelled()  # Cancelled meanwhile; keep the cancellation.
+    metrics.PARSE_RESULTS.inc(status=contract.status)
+    _finish(contract)
+
+
+def _finish(contract: Contract) -> None:
+    """Announce a parse outcome and copy it to the contract's duplicates.
+
+    A cancellation is not copied: its waiting duplicates get a parse of their
+    own instead, under the oldest of them as the new blob owner.
+    """
+    events.publish(contract)
+    progress.clear(contract.pk)
+    analytics.record_parse(contract)
+    if contract.status == Contract.STATUS_FAILED and contract.error_message == CANCELLED_ERROR:
+        heir = dedup.hand_over_duplicates(contract)
+        search.sync([contract.pk] + ([heir.pk] if heir is not None else []))
+        if heir is not None:
+            jobs.enqueue(heir.pk, cost=jobs.estimate_cost(heir.file.size))
+    else:
+        dedup.propagate_to_duplicates(contract)
+        search.sync([contract.pk])
+
+
+def _fail(contract_id: int, error: str, from_statuses):
+    """Mark a contract failed with ``error`` if it is in one of ``from_statuses``; returns it, or None."""
+    contract = repository.transition(
+        contract_id, Contract.STATUS_FAILED, from_statuses=from_statuses,
+        fields=repository.PARSE_FIELDS, error_message=error,
+    )
+    if contract is not None:
+        _finish(contract)
+    return contract
+
+
+def _extract(contract: Contract, tracker) -> tuple:
+    """Stream the contract's pages through the extractors; returns ``(sections, text)``.
+
+    Only the pages in flight are held in memory: page text goes straight to
+    the artifact and the search text, fields into a :class:`FieldMerger`, and
+    sections are handed to ``tracker`` as they fill in. A version of a parent
+    contract reuses the parent's unchanged pages and gets its
+    ``page_fingerprints`` and ``page_diff`` set (see :mod:`contracts.versions`).
+    """
+    path = contract.file.path
+    parent = None
+    if contract.parent_id:
+        contract.page_fingerprints = fingerprint_pages(path)
+        total = len(contract.page_fingerprints)
+        parent = versions.open_parent(contract.parent_id)
+    else:
+        total = count_pages(path)
+    merger = FieldMerger()
+    text = SearchText()
+    try:
+        artifact = artifacts.PageWriter(contract.pk, total)
+    except OSError:
+        # Only manage.py reextract needs it; that command reports the gap.
+        logger.warning("Could not store page artifact for contract %s", contract.pk, exc_info=True)
+        artifact = None
+    if parent is not None:
+        pages = versions.iter_pages(path, contract.page_fingerprints, parent)
+    else:
+        pages = iter_pages(path, total=total)
+    try:
+        for done, (page_text, fields) in enumerate(pages, 1):
+            jobs.raise_if_cancelled()
+            if artifact is not None:
+                artifact.add(page_text)
+            text.add(page_text)
+            changed, completed = merger.add(fields)
+            if changed:
+                tracker.add_sections({section: merger.sections[section] for section in changed}, bool(completed))
+            # Page extraction spans 10..80 of the reported progress.
+            tracker.update(10 + int(70 * done / max(total, 1)))
+    except BaseException:
+        if artifact is not None:
+            artifact.abort()
+        raise
+    finally:
+        pages.close()
+        if parent is not None:
+            parent.close()
+    if contract.parent_id:
+        contract.page_diff = versions.page_diff(parent, contract.page_fingerprints) if parent is not None else {}
+    if artifact is not None:
+        with metrics.PARSE_STAGE_SECONDS.time(stage="artifact"):
+            try:
+                artifact.commit()
+            except (OSError, artifacts.ArtifactError):
+                logger.warning("Could not store page artifact for contract %s", contract.pk, exc_info=True)
+    return merger.sections, text.text()
+
+
+def _current_status(contract_id: int) -> dict:
+    """Live progress of a running parse, else the stored status."""
+    payload = progress.current(contract_id)
+    if payload is None:
+        payload = events.status_payload(repository.get_or_404(contract_id, repository.STATUS_FIELDS))
+    return payload
+
+
+def _client_id(request) -> str:
+    """The uploader's fair-share queue key (``CONTRACT_CLIENT_HEADER``), or ""."""
+    return request.headers.get(settings.CONTRACT_CLIENT_HEADER, "").strip()[:200]
 
 
 @csrf_exempt
 def contract_upload(request):
+    """Store an uploaded PDF and queue it for parsing.
+
+    An optional ``parent`` form field names the contract this upload amends:
+    pages it shares with the parent are not parsed again, and the detail
+    shows a page diff against it.
+    """
     if request.method != "POST":
         return JsonResponse({"detail": "Method not allowed"}, status=405)
+    hasher = dedup.install_hashing(request)
     upload = request.FILES.get("file")
     if not upload:
         return JsonResponse({"detail": "No file provided"}, status=400)
-    if upload.size > 50 * 1024 * 1024:
+    if upload.size > settings.CONTRACT_MAX_UPLOAD_BYTES:
         return JsonResponse({"detail": "File too large"}, status=400)
     if not upload.name.lower().endswith(".pdf"):
         return JsonResponse({"detail": "Unsupported file type"}, status=400)
 
-    safe_name = get_valid_filename(upload.name)
-    contract = Contract.objects.create(
-        file=upload,
-        original_filename=safe_name,
-        status=Contract.STATUS_PENDING,
-        progress=0,
-    )
+    parent_id = request.POST.get("parent")
+    if parent_id:
+        try:
+            parent_id = int(parent_id)
+        except ValueError:
+            return JsonResponse({"detail": "Invalid parent"}, status=400)
+        if repository.get(parent_id, ("id",)) is None:
+            return JsonResponse({"detail": "Parent contract not found"}, status=400)
 
-    threading.Thread(target=_background_parse, args=(contract.id,), daemon=True).start()
+    dedup.attach_digests(request, hasher)
+    safe_name = get_valid_filename(upload.name)
+    contract, needs_parse = dedup.create_contract(upload, safe_name, parent_id=parent_id or None)
+    search.add_uploads([contract])
+    if needs_parse:
+        jobs.enqueue(contract.id, cost=jobs.estimate_cost(upload.size), client=_client_id(request))
 
     return JsonResponse({"contract_id": str(contract.id)})
 
 
+@csrf_exempt
+def contract_bulk_upload(request):
+    """Ingest many PDFs at once and return a per-file manifest.
+
+    Accepts repeated ``files`` parts, a ZIP in an ``archive`` part, or a raw
+    ``application/zip`` request body.
+    """
+    if request.method != "POST":
+        return JsonResponse({"detail": "Method not allowed"}, status=405)
+    try:
+        if request.content_type == "application/zip":
+            entries = bulk.entries_from_stream(request)
+        else:
+            hasher = dedup.install_hashing(request)
+            files = request.FILES.getlist("files")
+            archive = request.FILES.get("archive")
+            if not files and not archive:
+                return JsonResponse({"detail": "No files provided"}, status=400)
+            if len(files) > settings.CONTRACT_BULK_MAX_FILES:
+                return JsonResponse(
+                    {"detail": f"At most {settings.CONTRACT_BULK_MAX_FILES} files per request"}, status=400
+                )
+            dedup.attach_digests(request, hasher)
+            entries = bulk.entries_from_files(files)
+            if archive:
+                entries += bulk.entries_from_zip(archive)
+    except bulk.BulkUploadError as exc:
+        return JsonResponse({"detail": str(exc)}, status=400)
+
+    results = bulk.ingest(entries, client=_client_id(request))
+    accepted = sum(1 for row in results if "error" not in row)
+    return JsonResponse({"results": results, "accepted": accepted, "rejected": len(results) - accepted})
+
+
+@csrf_exempt
+def contract_cancel(request, contract_id: int):
+    """Cancel a pending or running parse.
+
+    The contract fails with error "Cancelled"; a worker parsing it stops at the
+    next page. Parses that already finished answer 409.
+    """
+    if request.method != "POST":
+        return JsonResponse({"detail": "Method not allowed"}, status=405)
+    jobs.cancel(contract_id)
+    contract = _fail(contract_id, CANCELLED_ERROR, from_statuses=PARTIAL_STATUSES)
+    if contract is None:
+        contract = repository.get_or_404(contract_id, repository.STATUS_FIELDS)
+        return JsonResponse({"detail": f"Contract is already {contract.status}"}, status=409)
+    return JsonResponse(events.status_payload(contract))
+
+
 def contract_status(request, contract_id: int):
-    contract = get_object_or_404(Contract, pk=contract_id)
-    return JsonResponse(
-        {
-            "status": contract.status,
-            "progress": contract.progress,
-            "error": contract.error_message or None,
+    """Return status and progress; with ``wait`` this becomes a long-poll.
+
+    ``?wait=<seconds>&status=<known>&progress=<known>`` holds the request until
+    the contract moves away from the state the client already has, or until
+    ``wait`` (capped at ``CONTRACT_LONG_POLL_MAX_WAIT``) runs out.
+    """
+    try:
+        wait = min(float(request.GET.get("wait", 0)), settings.CONTRACT_LONG_POLL_MAX_WAIT)
+    except ValueError:
+        return JsonResponse({"detail": "Invalid wait"}, status=400)
+    if wait <= 0:
+        return JsonResponse(_current_status(contract_id))
+
+    # Subscribe before reading so a transition in between is not missed.
+    with events.subscribe(contract_id) as subscription:
+        payload = _current_status(contract_id)
+        known = (request.GET.get("status"), request.GET.get("progress"))
+        deadline = time.monotonic() + wait
+        while (payload["status"], str(payload["progress"])) == known and payload["status"] not in events.TERMINAL_STATUSES:
+            remaining = deadline - time.monotonic()
+            event = subscription.get(timeout=remaining) if remaining > 0 else None
+            if event is None:
+                break
+            payload = event
+    return JsonResponse(payload)
+
+
+def contract_events(request, contract_id: int):
+    """Server-Sent Events stream of status/progress until the parse finishes."""
+    subscription = events.subscribe(contract_id)
+    try:
+        contract = repository.get_or_404(contract_id, repository.STATUS_FIELDS)
+    except Http404:
+        subscription.close()
+        raise
+
+    def stream():
+        try:
+            payload = events.status_payload(contract)
+            yield _sse(payload)
+            while payload["status"] not in events.TERMINAL_STATUSES:
+                event = subscription.get(timeout=settings.CONTRACT_SSE_HEARTBEAT_SECONDS)
+                if event is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                payload = event
+                yield _sse(payload)
+        finally:
+            subscription.close()
+
+    response = StreamingHttpResponse(stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+def _sse(payload: dict) -> str:
+    return f"event: status\ndata: {json.dumps(payload)}\n\n"
+
+
+@csrf_exempt
+def contract_status_batch(request):
+    """Status of many contracts in one projected ``$in`` query.
+
+    Takes ``ids`` (comma-separated query parameter, or a JSON body
+    ``{"ids": [...], "since": ...}`` on POST). With ``since`` (ISO 8601) only
+    contracts updated after that instant are returned; pass back ``as_of``
+    from the previous response to poll for changes.
+    """
+    if request.method == "POST":
+        try:
+            body = json.loads(request.body or b"{}")
+            raw_ids = body.get("ids") or []
+            since_param = body.get("since")
+        except (ValueError, AttributeError):
+            return JsonResponse({"detail": "Invalid JSON body"}, status=400)
+    elif request.method == "GET":
+        raw_ids = [i for value in request.GET.getlist("ids") for i in value.split(",") if i]
+        since_param = request.GET.get("since")
+    else:
+        return JsonResponse({"detail": "Method not allowed"}, status=405)
+
+    try:
+        ids = sorted({int(i) for i in raw_ids})
+    except (TypeError, ValueError):
+        return JsonResponse({"detail": "ids must be integers"}, status=400)
+    if not ids:
+        return JsonResponse({"detail": "No ids provided"}, status=400)
+    if len(ids) > BATCH_STATUS_MAX_IDS:
+        return JsonResponse({"detail": f"At most {BATCH_STATUS_MAX_IDS} ids per request"}, status=400)
+
+    query = {"id": {"$in": ids}}
+    if since_param:
+        since = parse_datetime(since_param)
+        if since is None:
+            return JsonResponse({"detail": "Invalid since timestamp"}, status=400)
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since, timezone.utc)
+        query["updated_at"] = {"$gt": since}
+
+    as_of = timezone.now()
+    docs = list(get_collection(Contract).find(
+        query, {"_id": 0, "id": 1, "status": 1, "progress": 1, "error_message": 1, "updated_at": 1}
+    ))
+    live = progress.current_many([doc["id"] for doc in docs if doc.get("status") == Contract.STATUS_PROCESSING])
+    for doc in docs:
+        if doc["id"] in live:
+            doc["progress"] = live[doc["id"]]["progress"]
+    results = {
+        str(doc["id"]): {
+            "status": doc.get("status"),
+            "progress": doc.get("progress"),
+            "error": doc.get("error_message") or None,
+            "updated_at": doc.get("updated_at"),
         }
-    )
+        for doc in docs
+    }
+    payload = {"results": results, "as_of": as_of}
+    if not since_param:
+        payload["missing"] = [str(i) for i in ids if str(i) not in results]
+    return JsonResponse(payload)
+
+
+def contract_analytics(request):
+    """Status counts, uploads/parses per day, score histogram and top gaps.
+
+    ``days`` (default 30) sets the window, ending today (UTC); ``gaps`` caps
+    the number of gaps returned (default 10).
+    """
+    try:
+        days = int(request.GET.get("days", 30))
+        top_gaps = int(request.GET.get("gaps", 10))
+    except ValueError:
+        return JsonResponse({"detail": "days and gaps must be integers"}, status=400)
+    if not 1 <= days <= ANALYTICS_MAX_DAYS:
+        return JsonResponse({"detail": f"days must be between 1 and {ANALYTICS_MAX_DAYS}"}, status=400)
+    return JsonResponse(analytics.summary(days, top_gaps=max(top_gaps, 0)))
+
+
+def _detail_payload(contract: Contract) -> dict:
+    return {
+        "id": str(contract.id),
+        "file": contract.file.url if contract.file else None,
+        "uploaded_at": contract.uploaded_at,
+        "status": contract.status,
+        "score": contract.score,
+        **{section: full_section(section, getattr(contract, section)) for section in repository.SECTION_FIELDS},
+        "gaps": contract.gaps,
+        "parent": str(contract.parent_id) if contract.parent_id else None,
+        "page_diff": contract.page_diff or None,
+    }
+
+
+def _partial_payload(contract: Contract) -> dict:
+    """Detail of a contract still being parsed: the sections extracted so far, unscored."""
+    payload = _detail_payload(contract)
+    payload.update(score=None, gaps=None, progress=contract.progress, partial=True)
+    return payload
+
+
+def _wants_partial(request, contract: Contract) -> bool:
+    return contract.status in PARTIAL_STATUSES and request.GET.get("partial") in ("1", "true")
 
 
 def contract_detail(request, contract_id: int):
-    contract = get_object_or_404(Contract, pk=contract_id)
-    if contract.status != Contract.STATUS_COMPLETED:
-        return JsonResponse({"detail": "Processing not complete"}, status=409)
-    return JsonResponse(
-        {
-            "id": str(contract.id),
-            "file": contract.file.url if contract.file else None,
-            "uploaded_at": contract.uploaded_at,
-            "status": contract.status,
-            "score": contract.score,
-            "parties": contract.parties,
-            "account_info": contract.account_info,
-            "financial_details": contract.financial_details,
-            "payment_structure": contract.payment_structure,
-            "revenue_classification": contract.revenue_classification,
-            "sla": contract.sla,
-            "gaps": contract.gaps,
-        }
-    )
+    """Extracted data of a parsed contract.
+
+    With ``?partial=1``, a contract that is still pending or processing is
+    served with the sections extracted so far (``"partial": true``) instead of
+    a 409.
+    """
+    entry = detail_cache.lookup(contract_id)
+    if entry is None:
+        generation = detail_cache.get_cache().generation()
+        contract = repository.get_or_404(contract_id, repository.DETAIL_FIELDS)
+        if contract.status != Contract.STATUS_COMPLETED:
+            if _wants_partial(request, contract):
+                return JsonResponse(_partial_payload(contract))
+            return JsonResponse({"detail": "Processing not complete"}, status=409)
+        rescoring.refresh_contract(contract)
+        body = json.dumps(_detail_payload(contract), cls=DjangoJSONEncoder).encode()
+        entry = detail_cache.store(contract.pk, body, generation)
+    etag, body = entry
+    if etag in parse_etags(request.META.get("HTTP_IF_NONE_MATCH", "")):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(body, content_type="application/json")
+    response["ETag"] = etag
+    return response
+
+
+def _list_params(request):
+    """Parse ``(page_size, sort, filters)``; raises ValueError with a client-facing message.
+
+    ``page_size`` must be at least 1 and is capped at 100.
+    """
+    try:
+        page_size = int(request.GET.get("page_size", 10))
+    except ValueError:
+        raise ValueError("Invalid page_size")
+    if page_size < 1:
+        raise ValueError("Invalid page_size")
+    page_size = min(page_size, 100)
+    sort = request.GET.get("sort") or pagination.DEFAULT_SORT
+    if sort not in pagination.SORTS:
+        raise ValueError(f"Unsupported sort; use one of: {', '.join(pagination.SORTS)}")
+    return page_size, sort, pagination.parse_filters(request.GET)
+
+
+def _list_rows(rows) -> list:
+    """Finish list rows fetched with ``rubric_version`` and ``rescoring.refresh_rows``."""
+    for row in rows:
+        row.pop("rubric_version", None)
+        if "relevance" in row:
+            row["relevance"] = round(row["relevance"], 4)
+    return [dict(row, id=str(row["id"])) for row in rows]
 
 
 def contract_list(request):
-    qs = Contract.objects.all().order_by("-uploaded_at")
-    status_param = request.GET.get("status")
-    if status_param:
-        qs = qs.filter(status=status_param)
-    page = int(request.GET.get("page", 1))
-    page_size = min(int(request.GET.get("page_size", 10)), 100)
-    paginator = Paginator(qs, page_size)
-    p = paginator.get_page(page)
-    data = [
-        {
-            "id": str(c.id),
-            "original_filename": c.original_filename,
-            "status": c.status,
-            "progress": c.progress,
-            "score": c.score,
-            "uploaded_at": c.uploaded_at,
-        }
-        for c in p.object_list
-    ]
-    return JsonResponse({"results": data, "page": p.number, "pages": paginator.num_pages, "count": paginator.count})
+    """List contracts.
 
+    Filters: ``status``, ``score_min``/``score_max`` and
+    ``uploaded_after``/``uploaded_before`` (ISO 8601). ``sort`` is one of
+    ``pagination.SORTS`` (default ``-uploaded_at``); other sort keys are
+    rejected because no index serves them. Pass ``after`` (empty for the first
+    page, then the previous response's ``next``) for keyset pagination, where
+    ``count=exact|estimated`` adds a total. Without ``after`` the response is
+    the classic page/pages/count shape. ``q`` runs a ranked full-text search
+    (see ``contracts.search``) with the same filters, ordered by relevance
+    unless ``sort`` is given and always paged by ``after``/``next`` cursors.
+    """
+    try:
+        page_size, sort, filters = _list_params(request)
+    except ValueError as exc:
+        return JsonResponse({"detail": str(exc)}, status=400)
 
-def contract_download(request, contract_id: int):
-    contract = get_object_or_404(Contract, pk=contract_id)
-    if not contract.file:
-        raise Http404("No file")
-    response = HttpResponse(contract.file.open("rb").read(), content_type="application/pdf")
-    response["Content-Disposition"] = f"attachment; filename=\"{contract.original_filename}\""
+    q = request.GET.get("q", "").strip()
+    if q:
+        try:
+            rows, next_cursor = search.search_page(
+                q,
+                pagination.build_query(**filters),
+                page_size,
+                after=request.GET.get("after"),
+                sort=request.GET.get("sort"),
+            )
+        except pagination.InvalidCursor:
+            return JsonResponse({"detail": "Invalid cursor"}, status=400)
+        rescoring.refresh_rows(rows)
+        return JsonResponse({"results": _list_rows(rows), "next": next_cursor})
+
+    if "after" in request.GET:
+        query = pagination.build_query(**filters)
+        collection = get_collection(Contract)
+        try:
+            rows, next_cursor = pagination.keyset_page(
+                collection, query, page_size, request.GET["after"], sort=sort,
+                projection=dict(pagination.LIST_PROJECTION, rubric_version=1),
+            )
+        except pagination.InvalidCursor:
+            return JsonResponse({"detail": "Invalid cursor"}, status=400)
+        rescoring.refresh_rows(rows)
+        data = _list_rows(rows)
+        payload = {"results": data, "next": next_cursor}
+        count_param = request.GET.get("count")
+        if count_param == "exact":
+            payload["count"] = collection.count_documents(query, hint=pagination.index_for(query, sort))
+        elif count_param == "estimated":
+            # The collection-metadata estimate is only meaningful unfiltered.
+            payload["count"] = collection.estimated_document_count() if not query else None
+        return JsonResponse(payload)
+
+    collection = get_collection(Contract)
+    query = pagination.build_query(**filters)
+    count = collection.count_documents(query, hint=pagination.index_for(query, sort))
+    pages = max(-(-count // page_size), 1)
+    page = pagination.page_number(request.GET.get("page", 1), pages)
+    page_query, kwargs = pagination.offset_find(
+        query, page, page_size, sort=sort, projection=dict(pagination.LIST_PROJECTION, rubric_version=1)
+    )
+    rows = list(collection.find(page_query, **kwargs))
+    rescoring.refresh_rows(rows)
+    return JsonResponse({"results": _list_rows(rows), "page": page, "pages": pages, "count": count})
+
+
+def contract_export(request):
+    """Stream every contract matching the list filters as NDJSON or CSV (``format``).
+
+    Like ``manage.py export_contracts``, only completed contracts are exported
+    unless ``status`` is given; an empty ``status`` exports all of them.
+    """
+    fmt = request.GET.get("format", "ndjson")
+    if fmt not in export.FORMATS:
+        return JsonResponse({"detail": f"Unsupported format; use one of: {', '.join(export.FORMATS)}"}, status=400)
+    params = request.GET.copy()
+    params.setdefault("status", Contract.STATUS_COMPLETED)
+    try:
+        query = pagination.build_query(**pagination.parse_filters(params))
+    except ValueError as exc:
+        return JsonResponse({"detail": str(exc)}, status=400)
+    response = StreamingHttpResponse(export.stream(query, fmt), content_type=export.CONTENT_TYPES[fmt])
+    response["Content-Disposition"] = f'attachment; filename="contracts.{fmt}"'
+    response["X-Accel-Buffering"] = "no"
     return response
 
 
+def metrics_view(request):
+    """Prometheus scrape endpoint for this process."""
+    return HttpResponse(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
 
+def contract_download(request, contract_id: int):
+    contract = repository.get_or_404(contract_id, repository.DOWNLOAD_FIELDS)
+    if not contract.file:
+        raise Http404("No file")
+    return serve_file(request, contract.file, contract.original_filename, digest=contract.sha256)
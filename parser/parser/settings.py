@@ -14,6 +14,73 @@ DEBUG = os.getenv("DEBUG", "False") == "True"
 MONGO_HOST = os.getenv("MONGO_HOST", "localhost")
 MONGO_PORT = int(os.getenv("MONGO_PORT", "27017"))
 
+# Upload limits: per file, and per bulk request (see contracts/bulk.py)
+CONTRACT_MAX_UPLOAD_BYTES = int(os.getenv("CONTRACT_MAX_UPLOAD_BYTES", str(50 * 1024 * 1024)))
+CONTRACT_BULK_MAX_FILES = int(os.getenv("CONTRACT_BULK_MAX_FILES", "500"))
+CONTRACT_BULK_MAX_BYTES = int(os.getenv("CONTRACT_BULK_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))
+
+# Documents fetched per cursor round trip by exports (see contracts/export.py)
+CONTRACT_EXPORT_BATCH_SIZE = int(os.getenv("CONTRACT_EXPORT_BATCH_SIZE", "1000"))
+
+# Parse job queue (see contracts/jobs.py)
+PARSE_JOB_LEASE_SECONDS = int(os.getenv("PARSE_JOB_LEASE_SECONDS", "60"))
+PARSE_JOB_POLL_INTERVAL = float(os.getenv("PARSE_JOB_POLL_INTERVAL", "1.0"))
+PARSE_JOB_MAX_ATTEMPTS = int(os.getenv("PARSE_JOB_MAX_ATTEMPTS", "3"))
+# How long done, failed and cancelled jobs are kept before MongoDB deletes them
+PARSE_JOB_RETENTION_SECONDS = int(os.getenv("PARSE_JOB_RETENTION_SECONDS", str(7 * 24 * 3600)))
+# Job scheduling: a job's estimated cost is its size in BYTES_PER_PAGE units
+# times SECONDS_PER_PAGE, capped at MAX_DELAY, the longest a job can be
+# overtaken by jobs queued after it.
+# Uploads sharing a CLIENT_HEADER value share one fair-share queue.
+PARSE_JOB_SECONDS_PER_PAGE = float(os.getenv("PARSE_JOB_SECONDS_PER_PAGE", "0.5"))
+PARSE_JOB_BYTES_PER_PAGE = int(os.getenv("PARSE_JOB_BYTES_PER_PAGE", str(100 * 1024)))
+PARSE_JOB_MAX_DELAY = float(os.getenv("PARSE_JOB_MAX_DELAY", "900"))
+CONTRACT_CLIENT_HEADER = os.getenv("CONTRACT_CLIENT_HEADER", "X-Client-Id")
+# Port parse workers serve Prometheus metrics on (0 disables; see contracts/metrics.py)
+PARSE_WORKER_METRICS_PORT = int(os.getenv("PARSE_WORKER_METRICS_PORT", "0"))
+
+# PDF extraction (see contracts/extraction.py)
+PARSE_PROCESSES = int(os.getenv("PARSE_PROCESSES", str(os.cpu_count() or 1)))
+PARSE_PAGES_PER_TASK = int(os.getenv("PARSE_PAGES_PER_TASK", "8"))
+# Resident memory (MB) above which a page extractor reopens its PDF reader (0 disables)
+PARSE_MEMORY_LIMIT_MB = int(os.getenv("PARSE_MEMORY_LIMIT_MB", "512"))
+# Characters of extracted text kept per contract for full-text search
+CONTRACT_SEARCH_TEXT_MAX_CHARS = int(os.getenv("CONTRACT_SEARCH_TEXT_MAX_CHARS", "200000"))
+# Best-ranked text matches a search filters, sorts and pages (see contracts/search.py)
+CONTRACT_SEARCH_MAX_CANDIDATES = int(os.getenv("CONTRACT_SEARCH_MAX_CANDIDATES", "1000"))
+
+# Parse progress (see contracts/progress.py): the contract document is written on
+# status transitions and every FLUSH_INTERVAL seconds, events at most every
+# PUBLISH_INTERVAL seconds; live entries expire after TTL seconds without news.
+# SHARED_CACHE optionally names a CACHES alias shared by workers and web processes.
+CONTRACT_PROGRESS_FLUSH_INTERVAL = float(os.getenv("CONTRACT_PROGRESS_FLUSH_INTERVAL", "5"))
+CONTRACT_PROGRESS_PUBLISH_INTERVAL = float(os.getenv("CONTRACT_PROGRESS_PUBLISH_INTERVAL", "0.5"))
+CONTRACT_PROGRESS_TTL = float(os.getenv("CONTRACT_PROGRESS_TTL", "30"))
+CONTRACT_PROGRESS_SHARED_CACHE = os.getenv("CONTRACT_PROGRESS_SHARED_CACHE", "")
+
+# Contracts rescored per second by manage.py rubric_sweeper
+RUBRIC_SWEEP_RATE = float(os.getenv("RUBRIC_SWEEP_RATE", "200"))
+
+# Status push: capped event collection, long-poll cap and SSE keep-alive (see contracts/events.py)
+CONTRACT_EVENTS_CAPPED_BYTES = int(os.getenv("CONTRACT_EVENTS_CAPPED_BYTES", str(16 * 1024 * 1024)))
+CONTRACT_LONG_POLL_MAX_WAIT = float(os.getenv("CONTRACT_LONG_POLL_MAX_WAIT", "60"))
+CONTRACT_SSE_HEARTBEAT_SECONDS = float(os.getenv("CONTRACT_SSE_HEARTBEAT_SECONDS", "15"))
+
+# Contract detail response cache: per-process LRU byte budget, optional shared
+# tier (a CACHES alias, "" to disable) and its timeout (see contracts/detail_cache.py)
+CONTRACT_DETAIL_CACHE_BYTES = int(os.getenv("CONTRACT_DETAIL_CACHE_BYTES", str(64 * 1024 * 1024)))
+CONTRACT_DETAIL_SHARED_CACHE = os.getenv("CONTRACT_DETAIL_SHARED_CACHE", "")
+CONTRACT_DETAIL_SHARED_TIMEOUT = int(os.getenv("CONTRACT_DETAIL_SHARED_TIMEOUT", str(24 * 60 * 60)))
+
+# Contract downloads: "" streams from Django, "nginx" sends X-Accel-Redirect,
+# "sendfile" sends X-Sendfile (see contracts/downloads.py)
+CONTRACT_DOWNLOAD_ACCEL = os.getenv("CONTRACT_DOWNLOAD_ACCEL", "")
+CONTRACT_DOWNLOAD_ACCEL_PREFIX = os.getenv("CONTRACT_DOWNLOAD_ACCEL_PREFIX", "/protected-media/")
+
+# Route status, list and detail to the async views; serve with an
+# ASGI server (see contracts/async_views.py)
+CONTRACT_ASYNC_VIEWS = os.getenv("CONTRACT_ASYNC_VIEWS", "False") == "True"
+
 ALLOWED_HOSTS = ["localhost", "127.0.0.1"]
 
 INSTALLED_APPS = [
@@ -28,6 +95,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "contracts.metrics.MetricsMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -110,3 +178,7 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Extracted page text kept per parsed contract for manage.py reextract (see contracts/artifacts.py)
+CONTRACT_ARTIFACT_ROOT = os.getenv("CONTRACT_ARTIFACT_ROOT", str(MEDIA_ROOT / "artifacts"))
+CONTRACT_ARTIFACT_COMPRESSION = int(os.getenv("CONTRACT_ARTIFACT_COMPRESSION", "6"))
+